@@ -0,0 +1,38 @@
+from django.conf import settings
+
+from apps.reports.conditional import report_etag
+from apps.reports.models import Report
+from core.cache import TieredCache
+from core.metrics import track_cache
+
+# Views whose rendered bodies are cached, and the renderer formats worth
+# caching. The browsable API embeds per-request state, so only JSON is stored.
+CACHED_VIEWS = ("retrieve", "details")
+CACHED_FORMATS = ("json",)
+
+rendered_reports = TieredCache(
+    "reports:rendered",
+    max_size=settings.REPORT_RESPONSE_CACHE["MAX_BYTES"],
+    shared_alias=settings.REPORT_RESPONSE_CACHE["SHARED_ALIAS"],
+    timeout=settings.REPORT_RESPONSE_CACHE["TIMEOUT"],
+    sizeof=len,
+)
+track_cache("reports_rendered", rendered_reports)
+
+
+def rendered_key(report: Report, view: str, file_format: str) -> str:
+    """Cache key for one rendering of ``report``.
+
+    The key embeds the report's ETag, so a refreshed report can never be
+    served from an entry written before the refresh.
+    """
+    etag = report_etag(report).strip('"')
+    return f"{view}:{file_format}:{etag}"
+
+
+def rendered_keys(report: Report) -> list[str]:
+    return [
+        rendered_key(report, view, file_format)
+        for view in CACHED_VIEWS
+        for file_format in CACHED_FORMATS
+    ]
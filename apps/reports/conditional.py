@@ -0,0 +1,60 @@
+from datetime import date, datetime
+
+from django.conf import settings
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.reports.models import Report
+
+
+def report_last_modified(report: Report) -> datetime:
+    return report.refreshed_at or report.created_at
+
+
+def report_etag(report: Report) -> str:
+    """Strong ETag for a report's representations.
+
+    A report's balances only change when it is refreshed, which moves its
+    last-modified time and, if any balance changed, its content hash. Deleting
+    the consolidated report it feeds clears ``consolidated_into``.
+    """
+    last_modified = report_last_modified(report)
+    return quote_etag(
+        f"{report.id}-{int(last_modified.timestamp() * 1000)}"
+        f"-{report.content_hash[:16]}-{report.consolidated_into_id or 0}"
+    )
+
+
+def is_not_modified(request, report: Report) -> bool:
+    """Whether the client's cached copy of ``report`` is still current."""
+    if if_none_match := request.headers.get("If-None-Match"):
+        # Weak comparison: compressed responses carry a weakened ETag
+        etags = {etag.removeprefix("W/") for etag in parse_etags(if_none_match)}
+        return "*" in etags or report_etag(report) in etags
+
+    if if_modified_since := request.headers.get("If-Modified-Since"):
+        since = parse_http_date_safe(if_modified_since)
+        last_modified = report_last_modified(report).timestamp()
+        return since is not None and int(last_modified) <= since
+
+    return False
+
+
+def with_cache_headers(response, report: Report):
+    """Set ``ETag``, ``Last-Modified`` and ``Cache-Control`` for ``report``."""
+    response["ETag"] = report_etag(report)
+    response["Last-Modified"] = http_date(report_last_modified(report).timestamp())
+
+    # Closed periods only change if explicitly refreshed, so let clients reuse
+    # them for a while; the current period must always be revalidated.
+    if report.period < date.today().replace(day=1):
+        max_age = settings.REPORT_CLOSED_PERIOD_MAX_AGE
+        response["Cache-Control"] = f"private, max-age={max_age}"
+    else:
+        response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified_response(report: Report) -> Response:
+    return with_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), report)
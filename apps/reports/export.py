@@ -0,0 +1,161 @@
+import csv
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from django.db.models import QuerySet
+
+EXPORT_COLUMNS = [
+    "report_id",
+    "period",
+    "account_type",
+    "xero_account_id",
+    "account_name",
+    "account_balance",
+]
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+
+# Rows fetched per database round trip and rows per Parquet row group / Arrow
+# record batch. Together they bound how much of an export is held in memory.
+FETCH_CHUNK_SIZE = 2000
+ROW_GROUP_SIZE = 10_000
+CSV_FLUSH_BYTES = 64 * 1024
+
+
+async def iter_rows(queryset: QuerySet) -> AsyncIterator[tuple]:
+    """Yield export rows for an ``AccountValue`` queryset without loading it all."""
+    # values() rather than values_list(): the latter's iterable runs its query
+    # eagerly, which aiterator() then does from the event loop thread.
+    fields = [
+        "report_id",
+        "report__period",
+        "report__account_type",
+        "xero_account_id",
+        "account_name",
+        "account_balance",
+    ]
+    rows = queryset.order_by("report_id", "xero_account_id").values(*fields)
+    async for row in rows.aiterator(chunk_size=FETCH_CHUNK_SIZE):
+        yield tuple(row[field] for field in fields)
+
+
+async def stream_csv(rows: AsyncIterator[tuple]) -> AsyncIterator[bytes]:
+    """Encode rows as CSV, yielding roughly ``CSV_FLUSH_BYTES`` at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+class _DrainableSink:
+    """Write-only file object whose buffered bytes can be handed off.
+
+    Parquet records absolute offsets in its footer, so ``tell`` keeps counting
+    across drains even though the bytes themselves are released.
+    """
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _export_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("report_id", pa.int64()),
+            ("period", pa.date32()),
+            ("account_type", pa.string()),
+            ("xero_account_id", pa.string()),
+            ("account_name", pa.string()),
+            ("account_balance", pa.decimal128(12, 2)),
+        ]
+    )
+
+
+def _record_batch(schema, rows: Sequence[tuple]):
+    import pyarrow as pa
+
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+async def stream_columnar(
+    rows: AsyncIterator[tuple], file_format: str
+) -> AsyncIterator[bytes]:
+    """Encode rows as Parquet or an Arrow IPC stream, one row group at a time.
+
+    pyarrow is imported here rather than at module level as only exports need it.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _export_schema()
+    sink = _DrainableSink()
+    output = pa.PythonFile(sink, mode="w")
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(output, schema)
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= ROW_GROUP_SIZE:
+            writer.write_batch(_record_batch(schema, batch))
+            batch = []
+            yield sink.drain()
+
+    if batch:
+        writer.write_batch(_record_batch(schema, batch))
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(queryset: QuerySet, file_format: str) -> AsyncIterator[bytes]:
+    """Return an async byte stream of ``queryset`` in the requested format."""
+    rows = iter_rows(queryset)
+    if file_format == "csv":
+        return stream_csv(rows)
+    return stream_columnar(rows, file_format)
@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Q, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+
+from apps.reports.models import REPORT_AGGREGATE_FIELDS, Report
+
+
+class Command(BaseCommand):
+    help = "Compute the stored balance aggregates for existing reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every report, not only those without aggregates.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        zero = Value(Decimal(0))
+        balance = "account_balances__account_balance"
+
+        queryset = Report.objects.order_by("id")
+        if not options["all"]:
+            queryset = queryset.filter(account_count=0)
+
+        queryset = queryset.annotate(
+            computed_account_count=Count("account_balances"),
+            computed_total_balance=Coalesce(Sum(balance), zero),
+            computed_debit_total=Coalesce(
+                Sum(balance, filter=Q(account_balances__account_balance__gt=0)), zero
+            ),
+            computed_credit_total=Abs(
+                Coalesce(
+                    Sum(balance, filter=Q(account_balances__account_balance__lt=0)),
+                    zero,
+                )
+            ),
+            computed_max_abs_balance=Coalesce(Max(Abs(balance)), zero),
+        )
+
+        updated = 0
+        batch = []
+        for report in queryset.iterator(chunk_size=options["batch_size"]):
+            for field in REPORT_AGGREGATE_FIELDS:
+                setattr(report, field, getattr(report, f"computed_{field}"))
+            batch.append(report)
+
+            if len(batch) >= options["batch_size"]:
+                updated += Report.objects.bulk_update(batch, REPORT_AGGREGATE_FIELDS)
+                batch = []
+
+        if batch:
+            updated += Report.objects.bulk_update(batch, REPORT_AGGREGATE_FIELDS)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Backfilled aggregates for {updated} reports")
+        )
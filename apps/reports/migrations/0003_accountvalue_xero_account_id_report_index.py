@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0002_alter_report_options_alter_report_account_type_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="accountvalue",
+            index=models.Index(
+                fields=["xero_account_id", "report"],
+                name="reports_acc_xero_ac_79a511_idx",
+            ),
+        ),
+    ]
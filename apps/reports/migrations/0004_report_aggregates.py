@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0003_accountvalue_xero_account_id_report_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="account_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of accounts in the report"
+            ),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="credit_total",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Sum of the credit (negative) balances, as a positive amount",
+                max_digits=14,
+            ),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="debit_total",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Sum of the debit (positive) balances",
+                max_digits=14,
+            ),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="max_abs_balance",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Largest absolute account balance",
+                max_digits=12,
+            ),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="total_balance",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Sum of all account balances",
+                max_digits=14,
+            ),
+        ),
+    ]
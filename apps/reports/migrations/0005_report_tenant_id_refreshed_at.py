@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0004_report_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="refreshed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Timestamp of the last refresh from Xero",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="tenant_id",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Xero tenant the report was generated from",
+                max_length=128,
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0005_report_tenant_id_refreshed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="consolidated_by",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Account attribute consolidated balances are combined on",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="consolidated_into",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Consolidated report this tenant's report is part of",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="sources",
+                to="reports.report",
+            ),
+        ),
+    ]
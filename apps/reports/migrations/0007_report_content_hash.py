@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0006_report_consolidation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="SHA-256 of the report's account balances",
+                max_length=64,
+            ),
+        ),
+    ]
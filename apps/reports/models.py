@@ -1,6 +1,19 @@
+import hashlib
+from collections.abc import Iterable
+from decimal import Decimal
+
 from django.contrib.auth.models import User
 from django.db import models
 
+# Denormalised balance summaries stored on each Report
+REPORT_AGGREGATE_FIELDS = [
+    "account_count",
+    "total_balance",
+    "debit_total",
+    "credit_total",
+    "max_abs_balance",
+]
+
 
 class Report(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -14,6 +27,62 @@ class Report(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, help_text="Timestamp when the report was created"
     )
+    tenant_id = models.CharField(
+        max_length=128,
+        blank=True,
+        default="",
+        help_text="Xero tenant the report was generated from",
+    )
+    refreshed_at = models.DateTimeField(
+        null=True, blank=True, help_text="Timestamp of the last refresh from Xero"
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="SHA-256 of the report's account balances",
+    )
+    consolidated_by = models.CharField(
+        max_length=10,
+        blank=True,
+        default="",
+        help_text="Account attribute consolidated balances are combined on",
+    )
+    consolidated_into = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="sources",
+        help_text="Consolidated report this tenant's report is part of",
+    )
+    account_count = models.PositiveIntegerField(
+        default=0, help_text="Number of accounts in the report"
+    )
+    total_balance = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of all account balances",
+    )
+    debit_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the debit (positive) balances",
+    )
+    credit_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the credit (negative) balances, as a positive amount",
+    )
+    max_abs_balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Largest absolute account balance",
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -21,6 +90,34 @@ class Report(models.Model):
             models.Index(fields=["user", "-created_at"]),
         ]
 
+    @staticmethod
+    def summarise_balances(balances: Iterable[Decimal]) -> dict[str, Decimal | int]:
+        """Return the aggregate field values for a report with these balances."""
+        summary = {
+            "account_count": 0,
+            "total_balance": Decimal(0),
+            "debit_total": Decimal(0),
+            "credit_total": Decimal(0),
+            "max_abs_balance": Decimal(0),
+        }
+        for balance in balances:
+            summary["account_count"] += 1
+            summary["total_balance"] += balance
+            if balance > 0:
+                summary["debit_total"] += balance
+            else:
+                summary["credit_total"] -= balance
+            summary["max_abs_balance"] = max(summary["max_abs_balance"], abs(balance))
+        return summary
+
+    @staticmethod
+    def hash_balances(rows: Iterable[tuple[str, str, Decimal]]) -> str:
+        """Return a content hash of ``(xero_account_id, name, balance)`` rows."""
+        digest = hashlib.sha256()
+        for account_id, name, balance in sorted(rows):
+            digest.update(f"{account_id}\x1f{name}\x1f{balance:.2f}\n".encode())
+        return digest.hexdigest()
+
 
 class AccountValue(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -28,6 +125,9 @@ class AccountValue(models.Model):
         Report, related_name="account_balances", on_delete=models.CASCADE
     )
     account_name = models.CharField(max_length=255)
+    # Xero's AccountID. Consolidated reports have no single Xero account per
+    # row and hold the account name or code balances were combined on instead
+    # (see Report.consolidated_by).
     xero_account_id = models.CharField(max_length=255)
     account_balance = models.DecimalField(
         max_digits=12,
@@ -38,4 +138,5 @@ class AccountValue(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["report", "xero_account_id"]),
+            models.Index(fields=["xero_account_id", "report"]),
         ]
@@ -1,10 +1,11 @@
 import logging
+from datetime import date
 
 from asgiref.sync import sync_to_async
 from rest_framework import serializers
 
 from adrf.serializers import ModelSerializer, Serializer
-from apps.reports.models import AccountValue, Report
+from apps.reports.models import REPORT_AGGREGATE_FIELDS, AccountValue, Report
 from apps.xero_api.account_type import AccountType
 
 logger = logging.getLogger(__name__)
@@ -29,27 +30,172 @@ class ReportGenerationSerializer(Serializer):
     account_type = serializers.ChoiceField(
         choices=[(t.value, t.value) for t in AccountType]
     )
+    snapshot = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs["snapshot"] and attrs["period"] >= date.today().replace(day=1):
+            raise serializers.ValidationError(
+                {"snapshot": "Only closed periods can be snapshotted."}
+            )
+        return attrs
+
+
+class ReportConsolidationSerializer(Serializer):
+    tenant_names = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_empty=True
+    )
+    period = serializers.DateField(
+        input_formats=["%b-%Y", "%B-%Y"],
+        format="%Y-%m-%d",
+    )
+    account_type = serializers.ChoiceField(
+        choices=[(t.value, t.value) for t in AccountType]
+    )
+    consolidate_by = serializers.ChoiceField(choices=["name", "code"], default="name")
+
+
+class ReportRefreshSerializer(Serializer):
+    tenant_name = serializers.CharField(required=False)
+
+
+class ReportCompareSerializer(Serializer):
+    SORT_CHOICES = [
+        "delta",
+        "-delta",
+        "abs_delta",
+        "-abs_delta",
+        "pct_change",
+        "-pct_change",
+        "account_name",
+        "-account_name",
+    ]
+
+    # Each report adds a column to the pivot query, so keep it to a year's worth
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=2, max_length=12
+    )
+    sort = serializers.ChoiceField(choices=SORT_CHOICES, default="-abs_delta")
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_ids(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Report ids must be unique.")
+        return value
+
+
+class AccountComparisonSerializer(Serializer):
+    xero_account_id = serializers.CharField()
+    account_name = serializers.CharField()
+    balances = serializers.ListField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
+    )
+    delta = serializers.DecimalField(max_digits=14, decimal_places=2)
+    pct_change = serializers.DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True
+    )
+
+
+class AccountTimeSeriesQuerySerializer(Serializer):
+    accounts = serializers.ListField(
+        child=serializers.CharField(max_length=255), min_length=1, max_length=50
+    )
+    period_from = serializers.DateField(
+        input_formats=["%b-%Y", "%B-%Y"], required=False
+    )
+    period_to = serializers.DateField(input_formats=["%b-%Y", "%B-%Y"], required=False)
+
+    def validate(self, attrs):
+        period_from, period_to = attrs.get("period_from"), attrs.get("period_to")
+        if period_from and period_to and period_from > period_to:
+            raise serializers.ValidationError(
+                "period_from must not be after period_to."
+            )
+        return attrs
+
+
+class ReportBulkDetailsQuerySerializer(Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=100
+    )
+
+
+class ReportExportQuerySerializer(Serializer):
+    file_format = serializers.ChoiceField(
+        choices=["csv", "parquet", "arrow"], default="csv"
+    )
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False
+    )
+    account_type = serializers.ChoiceField(
+        choices=[(t.value, t.value) for t in AccountType], required=False
+    )
+    period_from = serializers.DateField(
+        input_formats=["%b-%Y", "%B-%Y"], required=False
+    )
+    period_to = serializers.DateField(input_formats=["%b-%Y", "%B-%Y"], required=False)
+
+
+class BalancePointSerializer(Serializer):
+    period = serializers.DateField()
+    report_id = serializers.IntegerField()
+    account_balance = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class AccountTimeSeriesSerializer(Serializer):
+    xero_account_id = serializers.CharField()
+    account_name = serializers.CharField()
+    points = BalancePointSerializer(many=True)
 
 
 class ReportSerializer(ModelSerializer):
     class Meta:
         model = Report
-        fields = ["id", "user", "period", "account_type", "created_at"]
-        read_only_fields = ["user", "created_at"]
+        fields = [
+            "id",
+            "user",
+            "period",
+            "account_type",
+            "created_at",
+            "refreshed_at",
+            "tenant_id",
+            "consolidated_by",
+            "consolidated_into",
+            *REPORT_AGGREGATE_FIELDS,
+        ]
+        read_only_fields = [
+            "user",
+            "created_at",
+            "refreshed_at",
+            "tenant_id",
+            "consolidated_by",
+            "consolidated_into",
+            *REPORT_AGGREGATE_FIELDS,
+        ]
 
 
 class ReportDetailsSerializer(ModelSerializer):
     class Meta:
         model = Report
-        fields = ["id", "user", "period", "account_type", "created_at"]
+        fields = [
+            "id",
+            "user",
+            "period",
+            "account_type",
+            "created_at",
+            "refreshed_at",
+            *REPORT_AGGREGATE_FIELDS,
+        ]
 
     # I am doing it this way after reading the discussion here:
     # https://github.com/em1208/adrf/issues/27
     async def ato_representation(self, instance):
         representation = super().to_representation(instance)
-        accounts = await sync_to_async(list)(
-            AccountValue.objects.filter(report=instance).all()
-        )
+        if "account_balances" in getattr(instance, "_prefetched_objects_cache", {}):
+            accounts = list(instance.account_balances.all())
+        else:
+            accounts = await sync_to_async(list)(
+                AccountValue.objects.filter(report=instance).all()
+            )
         account_balances = await AccountValueSerializer(accounts, many=True).adata
         representation["account_balances"] = account_balances
         return representation
@@ -1,11 +1,25 @@
 import asyncio
 import logging
+import weakref
+from collections.abc import Sequence
 from datetime import date
 from typing import Any
 
 import httpx
-
+from django.conf import settings
+from django.utils import timezone
+
+from apps.xero_api.cache import tenant_key, ttl, xero_cache
+from apps.xero_api.circuit import CircuitOpenError
+from apps.xero_api.http import (
+    RETRY_STATUSES,
+    get_with_retry,
+    request_deadline,
+    xero_client,
+)
+from apps.xero_api.models import XeroSnapshot
 from apps.xero_api.service import AsyncXeroAuthService
+from core.metrics import span, xero_token_expired_retries
 
 logger = logging.getLogger(__name__)
 
@@ -22,55 +36,308 @@ class TokenExpiredError(XeroApiError):
     pass
 
 
+class XeroUnavailableError(XeroApiError):
+    """Raised when Xero keeps failing or timing out after all retries."""
+
+    pass
+
+
+class XeroTimeoutError(XeroUnavailableError):
+    """Raised when generating from Xero overruns ``XERO_GENERATE_TIMEOUT``."""
+
+    pass
+
+
+async def gather_or_cancel(*aws):
+    """Run awaitables concurrently, cancelling the rest as soon as one fails.
+
+    Unlike ``asyncio.gather``, nothing is left running after a failure. The
+    first error is raised as-is rather than wrapped in an ``ExceptionGroup``.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(aw) for aw in aws]
+    except BaseExceptionGroup as errors:
+        error = errors.exceptions[0]
+        while isinstance(error, BaseExceptionGroup):
+            error = error.exceptions[0]
+        raise error
+    return [task.result() for task in tasks]
+
+
+class TenantConcurrencyLimiter:
+    """Caps in-flight Xero requests per tenant within this process.
+
+    Xero rejects more than a few concurrent calls per organisation with a 429,
+    so requests beyond ``XERO_TENANT_CONCURRENCY`` wait here instead.
+    """
+
+    def __init__(self) -> None:
+        # asyncio primitives belong to one event loop, so keep a set per loop
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def __call__(self, tenant_id: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if tenant_id not in semaphores:
+            semaphores[tenant_id] = asyncio.Semaphore(settings.XERO_TENANT_CONCURRENCY)
+        return semaphores[tenant_id]
+
+
+tenant_limiter = TenantConcurrencyLimiter()
+
+
 class XeroReportService:
     """Service for generating financial reports from Xero API data."""
 
     def __init__(self, request: Any) -> None:
         self.xero_service = AsyncXeroAuthService()
         self.user = request.user
+        self._api_url = f"{settings.XERO_API_CONFIG['BASE_URL']}/api.xro/2.0"
 
     async def generate_report(
-        self, tenant_id: str, to_date: date, account_type: str
+        self, tenant_id: str, to_date: date, account_type: str, fresh: bool = False
     ) -> dict:
-        """Generate a new report based on the provided parameters."""
+        """Generate a new report based on the provided parameters.
+
+        When a snapshot exists for the tenant and date the report is derived
+        from it without calling Xero. Otherwise accounts and trial balances are
+        read through ``xero_cache``. ``fresh`` refetches them from Xero, and
+        captures the snapshot again if there is one, so later reports for the
+        date see the refetched data too.
+        """
+        snapshot = await XeroSnapshot.objects.filter(
+            tenant_id=tenant_id, date=to_date
+        ).afirst()
+        if snapshot is not None:
+            if fresh:
+                snapshot = await self.capture_snapshot(tenant_id, to_date)
+            return self._build_from_snapshot(snapshot, account_type)
+
+        return await self._with_deadline(
+            self._generate_report, tenant_id, to_date, account_type, fresh
+        )
+
+    async def generate_reports(
+        self, tenant_ids: Sequence[str], to_date: date, account_type: str
+    ) -> dict[str, dict]:
+        """Generate the same report for several tenants concurrently.
+
+        Tenants with a snapshot for the date are built locally; the rest are
+        fetched from Xero at the same time, subject to ``tenant_limiter``.
+        Returns the reports keyed by tenant id.
+        """
+        reports = {}
+        async for snapshot in XeroSnapshot.objects.filter(
+            tenant_id__in=tenant_ids, date=to_date
+        ):
+            reports[snapshot.tenant_id] = self._build_from_snapshot(
+                snapshot, account_type
+            )
+
+        live_tenant_ids = [t for t in tenant_ids if t not in reports]
+        if live_tenant_ids:
+            reports.update(
+                await self._with_deadline(
+                    self._generate_reports, live_tenant_ids, to_date, account_type
+                )
+            )
+
+        return {tenant_id: reports[tenant_id] for tenant_id in tenant_ids}
+
+    async def capture_snapshot(self, tenant_id: str, to_date: date) -> XeroSnapshot:
+        """Store the tenant's full chart of accounts and trial balance at a date."""
+        return await self._with_deadline(self._capture_snapshot, tenant_id, to_date)
+
+    async def _with_deadline(self, func, *args):
+        """Run ``func`` within ``XERO_GENERATE_TIMEOUT``, token refresh included.
+
+        Overrunning cancels every request still in flight. Retries also stop
+        short of the deadline rather than being cut off by it.
+        """
+        seconds = settings.XERO_GENERATE_TIMEOUT
+        try:
+            async with asyncio.timeout(seconds):
+                with request_deadline(seconds):
+                    return await self._with_token_refresh(func, *args)
+        except TimeoutError:
+            logger.warning("Xero did not respond within %ss", seconds)
+            raise XeroTimeoutError(f"Xero did not respond within {seconds}s")
+
+    async def _with_token_refresh(self, func, *args):
         try:
-            return await self._generate_report(tenant_id, to_date, account_type)
+            return await func(*args)
         except TokenExpiredError:
             logger.info("Access token expired, refreshing token...")
-            await self.xero_service.refresh_token(self.user)
+            xero_token_expired_retries.inc()
+            with span("token-refresh"):
+                await self.xero_service.refresh_token(self.user)
             try:
-                return await self._generate_report(tenant_id, to_date, account_type)
+                return await func(*args)
+            except (XeroUnavailableError, CircuitOpenError):
+                raise
             except Exception as e:
-                logger.error(f"Error generating report after token refresh: {e}")
+                logger.error("Error generating report after token refresh: %s", e)
                 raise ValueError("Error generating report after token refresh")
+        except (XeroUnavailableError, CircuitOpenError):
+            raise
         except Exception as e:
-            logger.error(f"Error generating report: {e}")
+            logger.error("Error generating report: %s", e)
             raise ValueError("Error generating report")
 
     async def _generate_report(
-        self, tenant_id: str, to_date: date, account_type: str
+        self, tenant_id: str, to_date: date, account_type: str, fresh: bool
     ) -> dict:
         """Generate report using parallel API requests"""
-        token = await self.xero_service.get_token(self.user)
+        with span("token"):
+            token = await self.xero_service.get_token(self.user)
 
-        async with httpx.AsyncClient() as client:
-            accounts_task = self._get_accounts(client, tenant_id, account_type, token)
-            trial_balance_task = self._get_trial_balance(
-                client, tenant_id, to_date, token
+        async with xero_client() as client:
+            return await self._fetch_report(
+                client, tenant_id, to_date, account_type, token, fresh=fresh
             )
-            accounts_data, trial_balance_data = await asyncio.gather(
-                accounts_task, trial_balance_task
+
+    async def _generate_reports(
+        self, tenant_ids: Sequence[str], to_date: date, account_type: str
+    ) -> dict[str, dict]:
+        with span("token"):
+            token = await self.xero_service.get_token(self.user)
+
+        async with xero_client() as client:
+            reports = await gather_or_cancel(
+                *(
+                    self._fetch_report(client, tenant_id, to_date, account_type, token)
+                    for tenant_id in tenant_ids
+                )
             )
 
+        return dict(zip(tenant_ids, reports))
+
+    async def _fetch_report(
+        self,
+        client: httpx.AsyncClient,
+        tenant_id: str,
+        to_date: date,
+        account_type: str,
+        token: dict[str, Any],
+        *,
+        fresh: bool = False,
+    ) -> dict:
+        with request_deadline(settings.XERO_RETRY["DEADLINE"]):
+            return await self._fetch_report_data(
+                client, tenant_id, to_date, account_type, token, fresh
+            )
+
+    async def _fetch_report_data(
+        self,
+        client: httpx.AsyncClient,
+        tenant_id: str,
+        to_date: date,
+        account_type: str,
+        token: dict[str, Any],
+        fresh: bool,
+    ) -> dict:
+        accounts_task = xero_cache.aget_or_set(
+            tenant_key(tenant_id, "accounts", account_type),
+            lambda: self._get_accounts(client, tenant_id, account_type, token),
+            ttl("accounts"),
+            refresh=fresh,
+        )
+        trial_balance_task = xero_cache.aget_or_set(
+            tenant_key(tenant_id, "trial_balance", to_date),
+            lambda: self._get_trial_balance(client, tenant_id, to_date, token),
+            self._trial_balance_ttl(to_date),
+            refresh=fresh,
+        )
+        accounts_data, trial_balance_data = await gather_or_cancel(
+            accounts_task, trial_balance_task
+        )
+
+        with span("build"):
+            return self._build_report(accounts_data, trial_balance_data)
+
+    @staticmethod
+    def _trial_balance_ttl(to_date: date) -> int:
+        if to_date < timezone.localdate().replace(day=1):
+            return ttl("closed_trial_balance")
+        return ttl("trial_balance")
+
+    async def _capture_snapshot(self, tenant_id: str, to_date: date) -> XeroSnapshot:
+        with span("token"):
+            token = await self.xero_service.get_token(self.user)
+
+        async with xero_client() as client:
+            accounts_data, trial_balance_data = await gather_or_cancel(
+                self._get_accounts(client, tenant_id, None, token),
+                self._fetch_trial_balance(client, tenant_id, to_date, token),
+            )
+
+        snapshot, _ = await XeroSnapshot.objects.aupdate_or_create(
+            tenant_id=tenant_id,
+            date=to_date,
+            defaults={
+                "accounts": XeroSnapshot.compress(accounts_data),
+                "trial_balance": XeroSnapshot.compress(trial_balance_data),
+                "fetched_at": timezone.now(),
+            },
+        )
+        logger.info("Stored snapshot for tenant %s at %s", tenant_id, to_date)
+        return snapshot
+
+    def _build_from_snapshot(self, snapshot: XeroSnapshot, account_type: str) -> dict:
+        logger.info("Building report for tenant %s from snapshot", snapshot.tenant_id)
+        with span("snapshot-build"):
+            return self._build_report(
+                snapshot.get_accounts(),
+                self._parse_trial_balance(snapshot.get_trial_balance()),
+                account_type=account_type,
+            )
+
+    @staticmethod
+    def _build_report(
+        accounts_data: dict,
+        trial_balances: dict[str, float],
+        account_type: str | None = None,
+    ) -> dict:
+        """Join accounts to their balances, optionally keeping one account type."""
         report = {}
         for account in accounts_data.get("Accounts", []):
+            if account_type is not None and account.get("Type") != account_type:
+                continue
             report[account["AccountID"]] = {
                 "name": account["Name"],
-                "balance": trial_balance_data.get(account["AccountID"], 0),
+                "code": account.get("Code", ""),
+                "balance": trial_balances.get(account["AccountID"], 0),
             }
 
         return report
 
+    @staticmethod
+    def _parse_trial_balance(data: dict) -> dict[str, float]:
+        """Map account IDs to their YTD debit minus credit balance."""
+        trial_balances = {}
+
+        rows = data["Reports"][0]["Rows"]
+
+        ytd_debit_value_index, ytd_credit_value_index = 3, 4
+
+        # Skip the first row (header). Each section holds one row per account,
+        # followed by a summary row without account attributes.
+        for section in rows[1:]:
+            for row in section.get("Rows", []):
+                if row["RowType"] != "Row":
+                    continue
+
+                cells = row["Cells"]
+                if not cells[0].get("Attributes"):
+                    continue
+                account_id = cells[0]["Attributes"][0]["Value"]
+
+                debit_value = float(cells[ytd_debit_value_index].get("Value") or 0)
+                credit_value = float(cells[ytd_credit_value_index].get("Value") or 0)
+                trial_balances[account_id] = debit_value - credit_value
+
+        return trial_balances
+
     async def _get_trial_balance(
         self,
         client: httpx.AsyncClient,
@@ -94,16 +361,35 @@ class XeroReportService:
             TokenExpiredError: If the API token has expired
             ValueError: If the API request fails
         """
-        logger.info(f"Getting trial balance for tenant {tenant_id}...")
+        data = await self._fetch_trial_balance(client, tenant_id, date, token)
+        with span("parse"):
+            return self._parse_trial_balance(data)
+
+    async def _fetch_trial_balance(
+        self,
+        client: httpx.AsyncClient,
+        tenant_id: str,
+        date: date,
+        token: dict[str, Any],
+    ) -> dict:
+        """Fetch the raw TrialBalance report from Xero API."""
+        logger.info("Getting trial balance for tenant %s...", tenant_id)
+        url = f"{self._api_url}/Reports/TrialBalance?date={date}"
+        response = None
         try:
-            response = await client.get(
-                f"https://api.xero.com/api.xro/2.0/Reports/TrialBalance?date={date}",
-                headers={
-                    "Authorization": f"Bearer {token['access_token']}",
-                    "Xero-tenant-id": tenant_id,
-                    "Accept": "application/json",
-                },
-            )
+            with span("xero-trial-balance"):
+                response = await get_with_retry(
+                    client,
+                    url,
+                    endpoint="trial_balance",
+                    headers={
+                        "Authorization": f"Bearer {token['access_token']}",
+                        "Xero-tenant-id": tenant_id,
+                        "Accept": "application/json",
+                    },
+                    scope=tenant_id,
+                    semaphore=tenant_limiter(tenant_id),
+                )
             response.raise_for_status()
 
             if response.status_code == 401:
@@ -111,54 +397,45 @@ class XeroReportService:
                     "Access token expired while fetching trial balance."
                 )
 
-            data = response.json()
-            trial_balances = {}
-
-            rows = data["Reports"][0]["Rows"]
-
-            ytd_debit_value_index, ytd_credit_value_index = 3, 4
-
-            # Skip the first row (header)
-            for row in rows[1:]:
-                rowType = row["Rows"][0]["RowType"]
-                if rowType == "SummaryRow":
-                    continue
-
-                cells = row["Rows"][0]["Cells"]
-                account_id = cells[0]["Attributes"][0]["Value"]
-
-                debit_value = float(cells[ytd_debit_value_index].get("Value") or 0)
-                credit_value = float(cells[ytd_credit_value_index].get("Value") or 0)
-                trial_balances[account_id] = debit_value - credit_value
-
-            return trial_balances
+            return response.json()
 
         except httpx.HTTPError:
-            if response.status_code == 401:
+            if response is not None and response.status_code == 401:
                 raise TokenExpiredError(
                     "Access token expired while fetching trial balance."
                 )
+            if response is None or response.status_code in RETRY_STATUSES:
+                raise XeroUnavailableError("Xero API unavailable for trial balance")
             raise ValueError("Error fetching trial balance from Xero API")
 
     async def _get_accounts(
         self,
         client: httpx.AsyncClient,
         tenant_id: str,
-        account_type: str,
+        account_type: str | None,
         token: dict,
     ):
-        """Get accounts using async request"""
+        """Get accounts using async request, all of them if no type is given"""
 
-        logger.debug(f"Getting accounts for tenant {tenant_id}...")
+        logger.debug("Getting accounts for tenant %s...", tenant_id)
+        url = f"{self._api_url}/Accounts"
+        if account_type is not None:
+            url += f"?where=Type%3D%3D%22{account_type}%22"
+        response = None
         try:
-            response = await client.get(
-                f"https://api.xero.com/api.xro/2.0/Accounts?where=Type%3D%3D%22{account_type}%22",  # noqa
-                headers={
-                    "Authorization": f"Bearer {token['access_token']}",
-                    "Xero-tenant-id": tenant_id,
-                    "Accept": "application/json",
-                },
-            )
+            with span("xero-accounts"):
+                response = await get_with_retry(
+                    client,
+                    url,
+                    endpoint="accounts",
+                    headers={
+                        "Authorization": f"Bearer {token['access_token']}",
+                        "Xero-tenant-id": tenant_id,
+                        "Accept": "application/json",
+                    },
+                    scope=tenant_id,
+                    semaphore=tenant_limiter(tenant_id),
+                )
             response.raise_for_status()
 
             if response.status_code == 401:
@@ -167,6 +444,8 @@ class XeroReportService:
             return response.json()
 
         except httpx.HTTPError:
-            if response.status_code == 401:
+            if response is not None and response.status_code == 401:
                 raise TokenExpiredError("Access token expired while fetching accounts.")
+            if response is None or response.status_code in RETRY_STATUSES:
+                raise XeroUnavailableError("Xero API unavailable for accounts")
             raise ValueError("Error fetching accounts from Xero API")
@@ -1,23 +1,59 @@
 import logging
+from collections.abc import Sequence
 from datetime import date, timedelta
+from decimal import Decimal
 from typing import Any
 
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Max, Q, QuerySet, Sum, Value
+from django.db.models.functions import Abs, Coalesce, NullIf
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from adrf.viewsets import ModelViewSet
+from apps.reports.cache import (
+    CACHED_FORMATS,
+    rendered_key,
+    rendered_keys,
+    rendered_reports,
+)
+from apps.reports.conditional import (
+    is_not_modified,
+    not_modified_response,
+    with_cache_headers,
+)
+from apps.reports.export import CONTENT_TYPES, FILE_EXTENSIONS, stream_export
 from apps.reports.models import AccountValue, Report
 from apps.reports.serializers import (
+    AccountComparisonSerializer,
+    AccountTimeSeriesQuerySerializer,
+    AccountTimeSeriesSerializer,
+    ReportBulkDetailsQuerySerializer,
+    ReportCompareSerializer,
+    ReportConsolidationSerializer,
     ReportDetailsSerializer,
+    ReportExportQuerySerializer,
     ReportGenerationSerializer,
+    ReportRefreshSerializer,
     ReportSerializer,
 )
-from apps.reports.service import XeroApiError, XeroReportService
+from apps.reports.service import (
+    XeroApiError,
+    XeroReportService,
+    XeroTimeoutError,
+    XeroUnavailableError,
+)
+from apps.xero_api.cache import xero_cache
+from apps.xero_api.circuit import CircuitOpenError
 from apps.xero_api.service import AsyncXeroAuthService, TokenRefreshError
 from core.authentication import AsyncJWTAuthentication
+from core.metrics import span
 
 logger = logging.getLogger(__name__)
 
@@ -46,25 +82,234 @@ class ReportViewSet(ModelViewSet):
 
     async def retrieve(self, request, pk=None):
         report = await self.aget_object()
+        if is_not_modified(request, report):
+            return not_modified_response(report)
 
         serializer = self.get_serializer(report)
-        data = await serializer.adata
-        return Response(data)
+        return await self._rendered_response(request, report, "retrieve", serializer)
 
     @action(detail=True, methods=["get"])
     async def details(self, request, pk=None):
         report = await self.aget_object()
+        if is_not_modified(request, report):
+            return not_modified_response(report)
 
         serializer = ReportDetailsSerializer(report)
-        data = await serializer.adata
+        return await self._rendered_response(request, report, "details", serializer)
 
-        return Response(data)
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="cache-stats",
+        permission_classes=[IsAdminUser],
+    )
+    async def cache_stats(self, request: Any) -> Response:
+        """Hit ratios and sizes of this process's caches."""
+        return Response(
+            {"rendered_reports": rendered_reports.stats(), "xero": xero_cache.stats()}
+        )
+
+    @action(detail=False, methods=["get"], url_path="bulk-details")
+    async def bulk_details(self, request: Any) -> Response:
+        """
+        Return the details of several of the user's reports at once.
+
+        Ownership is checked and every balance loaded in two queries however
+        many reports are requested. Reports are returned in the order given.
+        """
+        params = ReportBulkDetailsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        report_ids = list(dict.fromkeys(params.validated_data["ids"]))
+        reports = {
+            report.id: report
+            async for report in Report.objects.filter(
+                user=request.user, id__in=report_ids
+            ).prefetch_related("account_balances")
+        }
+        if len(reports) != len(report_ids):
+            return Response(
+                {"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = ReportDetailsSerializer(
+            [reports[report_id] for report_id in report_ids], many=True
+        )
+        return Response(await serializer.adata)
+
+    @action(detail=True, methods=["get"])
+    async def export(self, request, pk=None):
+        """Stream a report's balances as CSV, Parquet or an Arrow IPC stream."""
+        params = ReportExportQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        report = await Report.objects.filter(user=request.user, pk=pk).afirst()
+        if report is None:
+            return Response(
+                {"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return self._export_response(
+            AccountValue.objects.filter(report=report),
+            params.validated_data["file_format"],
+            filename=f"report-{report.id}",
+        )
+
+    @action(detail=False, methods=["get"], url_path="export", url_name="export-list")
+    async def export_reports(self, request: Any):
+        """
+        Stream the balances of several of the user's reports in one file.
+
+        Reports can be narrowed by ``ids``, ``account_type`` and a
+        ``period_from``/``period_to`` range; with no filters every report is
+        exported. Consolidated reports are left out: their rows are keyed by
+        account name or code and repeat their tenant reports' balances.
+        """
+        params = ReportExportQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {"report__user": request.user, "report__consolidated_by": ""}
+        if report_ids := params.validated_data.get("ids"):
+            filters["report_id__in"] = report_ids
+        if account_type := params.validated_data.get("account_type"):
+            filters["report__account_type"] = account_type
+        if period_from := params.validated_data.get("period_from"):
+            filters["report__period__gte"] = period_from.replace(day=1)
+        if period_to := params.validated_data.get("period_to"):
+            filters["report__period__lte"] = await self._last_day_of_month(period_to)
+
+        return self._export_response(
+            AccountValue.objects.filter(**filters),
+            params.validated_data["file_format"],
+            filename="reports",
+        )
+
+    @action(detail=False, methods=["get"])
+    async def compare(self, request: Any) -> Response:
+        """
+        Compare account balances across two or more of the user's reports.
+
+        Balances are joined on ``xero_account_id`` in the database. The first
+        report id given is the baseline for ``delta`` and ``pct_change``, which
+        compare it against the last one. Consolidated reports, keyed by account
+        name or code, can only be compared with reports consolidated the same way.
+        """
+        params = ReportCompareSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        report_ids = params.validated_data["ids"]
+        reports = {
+            report.id: report
+            async for report in Report.objects.filter(
+                user=request.user, id__in=report_ids
+            )
+        }
+        if len(reports) != len(report_ids):
+            return Response(
+                {"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if len({report.consolidated_by for report in reports.values()}) > 1:
+            return Response(
+                {"error": "Reports consolidated differently cannot be compared"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self._comparison_queryset(
+            report_ids,
+            sort=params.validated_data["sort"],
+            limit=params.validated_data.get("limit"),
+        )
+        accounts = [
+            {
+                "xero_account_id": row["xero_account_id"],
+                "account_name": row["name"],
+                "balances": [row[f"balance_{i}"] for i in range(len(report_ids))],
+                "delta": row["delta"],
+                "pct_change": row["pct_change"],
+            }
+            async for row in queryset
+        ]
+
+        return Response(
+            {
+                "reports": await ReportSerializer(
+                    [reports[report_id] for report_id in report_ids], many=True
+                ).adata,
+                "accounts": await AccountComparisonSerializer(
+                    accounts, many=True
+                ).adata,
+            }
+        )
+
+    @action(detail=False, methods=["get"])
+    async def timeseries(self, request: Any) -> Response:
+        """
+        Return the balance of one or more accounts across the user's reports.
+
+        Points are ordered by period. When a period was generated more than
+        once only the most recent report's balance is used. Consolidated
+        reports, which aren't keyed by Xero account id, are left out.
+        """
+        params = AccountTimeSeriesQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {
+            "xero_account_id__in": params.validated_data["accounts"],
+            "report__user": request.user,
+            "report__consolidated_by": "",
+        }
+        if period_from := params.validated_data.get("period_from"):
+            filters["report__period__gte"] = period_from.replace(day=1)
+        if period_to := params.validated_data.get("period_to"):
+            filters["report__period__lte"] = await self._last_day_of_month(period_to)
+
+        rows = (
+            AccountValue.objects.filter(**filters)
+            .order_by("xero_account_id", "report__period", "-report__created_at")
+            .values(
+                "xero_account_id",
+                "account_name",
+                "account_balance",
+                "report_id",
+                "report__period",
+            )
+        )
+
+        series: dict[str, dict] = {}
+        async for row in rows:
+            account = series.setdefault(
+                row["xero_account_id"],
+                {"xero_account_id": row["xero_account_id"], "points": []},
+            )
+            account["account_name"] = row["account_name"]
+            points = account["points"]
+            if points and points[-1]["period"] == row["report__period"]:
+                continue
+            points.append(
+                {
+                    "period": row["report__period"],
+                    "report_id": row["report_id"],
+                    "account_balance": row["account_balance"],
+                }
+            )
+
+        return Response(
+            await AccountTimeSeriesSerializer(list(series.values()), many=True).adata
+        )
 
     @action(detail=False, methods=["post"])
     async def generate(self, request: Any) -> Response:
         """
         Generate a new financial report based on provided parameters.
 
+        With ``snapshot`` set, Xero's data for the (closed) period is stored
+        first so later reports for that date are built without calling Xero.
+
         Returns:
             Response with generated report data or error details
         """
@@ -77,41 +322,221 @@ class ReportViewSet(ModelViewSet):
         )
 
         try:
-            tenant = await self._validate_and_get_tenant(
-                request.user, serializer.validated_data["tenant_name"]
-            )
+            with span("tenant"):
+                tenant = await self._validate_and_get_tenant(
+                    request.user, serializer.validated_data["tenant_name"]
+                )
             service = XeroReportService(request)
+            if serializer.validated_data["snapshot"]:
+                with span("snapshot"):
+                    await service.capture_snapshot(
+                        tenant.tenant_id, serializer.validated_data["period"]
+                    )
             report_data = await service.generate_report(
                 tenant_id=tenant.tenant_id,
                 to_date=serializer.validated_data["period"],
                 account_type=serializer.validated_data["account_type"],
             )
 
-            report = await self._create_report_from_data(
-                request.user, serializer.validated_data, report_data
+            with span("insert"):
+                report = await self._create_report_from_data(
+                    request.user,
+                    serializer.validated_data,
+                    report_data,
+                    tenant_id=tenant.tenant_id,
+                )
+            with span("serialize"):
+                data = await ReportSerializer(report).adata
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return self._generation_error_response(e, "generation")
+
+    @action(detail=True, methods=["post"])
+    async def refresh(self, request: Any, pk=None) -> Response:
+        """
+        Refetch a report from Xero and write only the balances that changed.
+
+        Reports generated before tenants were recorded on them need the
+        ``tenant_name`` to refresh from. Consolidations are regenerated with
+        ``consolidate`` rather than refreshed.
+        """
+        serializer = ReportRefreshSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        report = await self.aget_object()
+        if report.user_id != request.user.id:
+            return Response(
+                {"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND
             )
+
+        if report.consolidated_by or report.consolidated_into_id:
+            # A consolidation is built from its tenant reports as fetched
+            # together; refreshing one would leave the sums stale
             return Response(
-                await ReportSerializer(report).adata, status=status.HTTP_201_CREATED
+                {
+                    "error": "Consolidated reports and their tenant reports cannot "
+                    "be refreshed; consolidate again instead"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        stale_keys = rendered_keys(report)
+
+        try:
+            tenant_id = report.tenant_id
+            if tenant_name := serializer.validated_data.get("tenant_name"):
+                tenant = await self._validate_and_get_tenant(request.user, tenant_name)
+                tenant_id = tenant.tenant_id
+            if not tenant_id:
+                raise ValueError("tenant_name is required to refresh this report")
+
+            service = XeroReportService(request)
+            report_data = await service.generate_report(
+                tenant_id=tenant_id,
+                to_date=report.period,
+                account_type=report.account_type,
+                fresh=True,
+            )
+
+            if report.tenant_id != tenant_id:
+                report.tenant_id = tenant_id
+                await report.asave(update_fields=["tenant_id"])
+            changes = await sync_to_async(self._apply_refresh)(report, report_data)
+            await rendered_reports.adelete_many(stale_keys)
+
+        except Exception as e:
+            return self._generation_error_response(e, "refresh")
+
+        return Response(
+            {"report": await ReportSerializer(report).adata, "changes": changes}
+        )
 
-        except TokenRefreshError as e:
+    @action(detail=False, methods=["post"])
+    async def consolidate(self, request: Any) -> Response:
+        """
+        Generate one account type for several tenants and combine the results.
+
+        Omitting ``tenant_names`` includes every tenant the user has connected.
+        Tenants are fetched from Xero concurrently. A report is stored per
+        tenant, plus a consolidated report whose balances are summed across
+        tenants by account name or code. The consolidated report's rows keep
+        that name or code in ``xero_account_id``.
+        """
+        serializer = ReportConsolidationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer.validated_data["period"] = await self._last_day_of_month(
+            serializer.validated_data["period"]
+        )
+
+        try:
+            tenants = await self._get_tenants(
+                request.user, serializer.validated_data.get("tenant_names")
+            )
+            service = XeroReportService(request)
+            tenant_reports = await service.generate_reports(
+                [tenant.tenant_id for tenant in tenants],
+                to_date=serializer.validated_data["period"],
+                account_type=serializer.validated_data["account_type"],
+            )
+
+            consolidated, reports = await sync_to_async(
+                self._create_consolidated_reports
+            )(request.user, serializer.validated_data, tenant_reports)
+        except Exception as e:
+            return self._generation_error_response(e, "consolidation")
+
+        return Response(
+            {
+                "report": await ReportSerializer(consolidated).adata,
+                "tenant_reports": await ReportSerializer(reports, many=True).adata,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_destroy(self, instance: Report) -> None:
+        # Deleting a consolidated report also detaches the reports it was
+        # built from, so their cached renderings go stale too.
+        stale_keys = rendered_keys(instance)
+        for source in instance.sources.all():
+            stale_keys += rendered_keys(source)
+        super().perform_destroy(instance)
+        rendered_reports.delete_many(stale_keys)
+
+    async def _rendered_response(
+        self, request: Any, report: Report, view_name: str, serializer
+    ):
+        """
+        Serve a report's rendered body from the response cache, rendering and
+        storing it on a miss.
+        """
+        renderer = request.accepted_renderer
+        if renderer.format not in CACHED_FORMATS:
+            return with_cache_headers(Response(await serializer.adata), report)
+
+        key = rendered_key(report, view_name, renderer.format)
+        if (content := await rendered_reports.aget(key)) is not None:
+            response = HttpResponse(content, content_type=renderer.media_type)
+            return with_cache_headers(response, report)
+
+        response = self.finalize_response(request, Response(await serializer.adata))
+        await rendered_reports.aset(key, response.render().content)
+        return with_cache_headers(response, report)
+
+    @staticmethod
+    def _generation_error_response(error: Exception, operation: str) -> Response:
+        """Map an error raised while fetching from Xero to an API response."""
+        if isinstance(error, TokenRefreshError):
             logger.warning("Token refresh failed, reauthorization required")
             return Response(
                 {
                     "error": "Token refresh failed",
-                    "authorization_url": e.authorization_url,
+                    "authorization_url": error.authorization_url,
                 },
                 status=status.HTTP_401_UNAUTHORIZED,
             )
-        except (ValidationError, ValueError, XeroApiError) as e:
-            logger.warning(f"Report generation failed: {str(e)}")
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            logger.error(f"Unexpected error in report generation: {str(e)}")
+        if isinstance(error, CircuitOpenError):
+            logger.warning("Report %s failed fast: %s", operation, error)
             return Response(
-                {"error": "An unexpected error occurred"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"error": str(error)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(error.retry_after)},
             )
+        if isinstance(error, XeroTimeoutError):
+            logger.warning("Report %s failed: %s", operation, error)
+            return Response(
+                {"error": str(error)}, status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        if isinstance(error, XeroUnavailableError):
+            logger.warning("Report %s failed: %s", operation, error)
+            return Response(
+                {"error": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        if isinstance(error, (ValidationError, ValueError, XeroApiError)):
+            logger.warning("Report %s failed: %s", operation, error)
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.error("Unexpected error in report %s: %s", operation, error)
+        return Response(
+            {"error": "An unexpected error occurred"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    async def _get_tenants(self, user, tenant_names: Sequence[str] | None = None):
+        """Resolve tenant names to tenants, or all the user's tenants if none."""
+        if not tenant_names:
+            tenants = await AsyncXeroAuthService().get_tenants(user.id)
+            if not tenants:
+                raise ValueError("No Xero tenants found")
+            return tenants
+
+        tenants = {}
+        for tenant_name in tenant_names:
+            tenant = await self._validate_and_get_tenant(user, tenant_name)
+            tenants[tenant.tenant_id] = tenant
+        return list(tenants.values())
 
     async def _validate_and_get_tenant(self, user, tenant_name: str | None = None):
         xero_service = AsyncXeroAuthService()
@@ -121,29 +546,224 @@ class ReportViewSet(ModelViewSet):
             raise ValueError("No Xero tenants found")
         return tenant
 
-    async def _create_report_from_data(self, user, validated_data, report_data):
+    async def _create_report_from_data(
+        self, user, validated_data, report_data, tenant_id: str = ""
+    ):
         logger.info(
             "Creating report from generated data... \nPeriod: %s",
             validated_data["period"],
         )
+        balances = self._normalise_balances(report_data)
         report = await Report.objects.acreate(
             user=user,
             period=validated_data["period"],
             account_type=validated_data["account_type"],
+            tenant_id=tenant_id,
+            **self._summary_fields(report_data, balances),
         )
 
-        account_values = [
+        await AccountValue.objects.abulk_create(
+            self._account_values(report, report_data, balances)
+        )
+
+        return report
+
+    @classmethod
+    def _create_consolidated_reports(
+        cls, user, validated_data, tenant_reports: dict[str, dict]
+    ) -> tuple[Report, Sequence[Report]]:
+        """
+        Store each tenant's report and their consolidation in one transaction.
+
+        Balances are summed as-is; tenants are assumed to share a base currency.
+        """
+        consolidate_by = validated_data["consolidate_by"]
+        consolidated_data: dict[str, dict] = {}
+        for report_data in tenant_reports.values():
+            balances = cls._normalise_balances(report_data)
+            for account_id, data in report_data.items():
+                key = data["name"]
+                if consolidate_by == "code" and data.get("code"):
+                    key = data["code"]
+                account = consolidated_data.setdefault(
+                    key, {"name": data["name"], "balance": Decimal(0)}
+                )
+                account["balance"] += balances[account_id]
+
+        report_fields = {
+            "user": user,
+            "period": validated_data["period"],
+            "account_type": validated_data["account_type"],
+        }
+
+        with transaction.atomic():
+            balances = cls._normalise_balances(consolidated_data)
+            consolidated = Report.objects.create(
+                **report_fields,
+                consolidated_by=consolidate_by,
+                **cls._summary_fields(consolidated_data, balances),
+            )
+            account_values = cls._account_values(
+                consolidated, consolidated_data, balances
+            )
+
+            reports = []
+            for tenant_id, report_data in tenant_reports.items():
+                balances = cls._normalise_balances(report_data)
+                report = Report.objects.create(
+                    **report_fields,
+                    tenant_id=tenant_id,
+                    consolidated_into=consolidated,
+                    **cls._summary_fields(report_data, balances),
+                )
+                account_values += cls._account_values(report, report_data, balances)
+                reports.append(report)
+
+            AccountValue.objects.bulk_create(account_values)
+
+        return consolidated, reports
+
+    @staticmethod
+    def _account_values(
+        report: Report, report_data: dict, balances: dict[str, Decimal]
+    ) -> Sequence[AccountValue]:
+        return [
             AccountValue(
                 report=report,
                 xero_account_id=account_id,
                 account_name=data["name"],
-                account_balance=data["balance"],
+                account_balance=balances[account_id],
             )
             for account_id, data in report_data.items()
         ]
-        await AccountValue.objects.abulk_create(account_values)
 
-        return report
+    @classmethod
+    def _apply_refresh(cls, report: Report, report_data: dict) -> dict[str, list]:
+        """
+        Bring a report's stored balances in line with freshly generated data.
+
+        Only rows whose name or balance changed are written. Runs in a single
+        transaction and returns the affected ``xero_account_id`` values.
+        """
+        balances = cls._normalise_balances(report_data)
+        changes = {"created": [], "updated": [], "deleted": []}
+
+        with transaction.atomic():
+            existing = {
+                account.xero_account_id: account
+                for account in AccountValue.objects.select_for_update().filter(
+                    report=report
+                )
+            }
+
+            to_create, to_update = [], []
+            for account_id, data in report_data.items():
+                account = existing.pop(account_id, None)
+                if account is None:
+                    to_create += cls._account_values(
+                        report, {account_id: data}, balances
+                    )
+                    changes["created"].append(account_id)
+                elif (
+                    account.account_name != data["name"]
+                    or account.account_balance != balances[account_id]
+                ):
+                    account.account_name = data["name"]
+                    account.account_balance = balances[account_id]
+                    to_update.append(account)
+                    changes["updated"].append(account_id)
+
+            AccountValue.objects.bulk_create(to_create)
+            AccountValue.objects.bulk_update(
+                to_update, ["account_name", "account_balance"]
+            )
+            if existing:
+                AccountValue.objects.filter(
+                    id__in=[account.id for account in existing.values()]
+                ).delete()
+                changes["deleted"] = sorted(existing)
+
+            summary = cls._summary_fields(report_data, balances)
+            for field, value in summary.items():
+                setattr(report, field, value)
+            report.refreshed_at = timezone.now()
+            report.save(update_fields=[*summary, "refreshed_at"])
+
+        return changes
+
+    @staticmethod
+    def _summary_fields(report_data: dict, balances: dict[str, Decimal]) -> dict:
+        """Aggregate and content hash field values for a report's balances."""
+        return {
+            **Report.summarise_balances(balances.values()),
+            "content_hash": Report.hash_balances(
+                (account_id, data["name"], balances[account_id])
+                for account_id, data in report_data.items()
+            ),
+        }
+
+    @staticmethod
+    def _normalise_balances(report_data: dict) -> dict[str, Decimal]:
+        """Round generated balances the way ``AccountValue`` stores them."""
+        return {
+            account_id: round(Decimal(str(data["balance"])), 2)
+            for account_id, data in report_data.items()
+        }
+
+    @staticmethod
+    def _export_response(
+        queryset: QuerySet, file_format: str, filename: str
+    ) -> StreamingHttpResponse:
+        response = StreamingHttpResponse(
+            stream_export(queryset, file_format),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        disposition = (
+            f'attachment; filename="{filename}.{FILE_EXTENSIONS[file_format]}"'
+        )
+        response["Content-Disposition"] = disposition
+        return response
+
+    @staticmethod
+    def _comparison_queryset(
+        report_ids: Sequence[int], sort: str, limit: int | None = None
+    ) -> QuerySet:
+        """
+        Pivot the reports' balances into one row per ``xero_account_id``.
+
+        Each report's balance is a filtered ``SUM`` so the whole join happens in
+        a single grouped query over the ``(report, xero_account_id)`` index.
+        """
+        zero = Value(Decimal(0))
+        balance_fields = [f"balance_{i}" for i in range(len(report_ids))]
+        baseline, latest = F(balance_fields[0]), F(balance_fields[-1])
+
+        queryset = (
+            AccountValue.objects.filter(report_id__in=report_ids)
+            .values("xero_account_id")
+            .annotate(
+                name=Max("account_name"),
+                **{
+                    field: Sum("account_balance", filter=Q(report_id=report_id))
+                    for field, report_id in zip(balance_fields, report_ids)
+                },
+            )
+            .annotate(delta=Coalesce(latest, zero) - Coalesce(baseline, zero))
+            .annotate(
+                abs_delta=Abs("delta"),
+                pct_change=F("delta") * 100 / Abs(NullIf(baseline, zero)),
+            )
+        )
+
+        sort_field = sort.lstrip("-").replace("account_name", "name")
+        ordering = (
+            F(sort_field).desc(nulls_last=True)
+            if sort.startswith("-")
+            else F(sort_field).asc(nulls_last=True)
+        )
+        queryset = queryset.order_by(ordering, "xero_account_id")
+
+        return queryset[:limit] if limit else queryset
 
     @staticmethod
     async def _last_day_of_month(period: date) -> date:
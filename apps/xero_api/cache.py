@@ -0,0 +1,26 @@
+from django.conf import settings
+
+from core.cache import TieredCache
+from core.metrics import track_cache
+
+# Data read from Xero or derived from it, shared by the auth and report
+# services. Keys are namespaced by the tenant or user they belong to.
+xero_cache = TieredCache(
+    "xero",
+    max_size=settings.XERO_CACHE["MAX_ENTRIES"],
+    shared_alias="shared",
+    timeout=settings.XERO_CACHE["TTL"]["default"],
+)
+track_cache("xero", xero_cache)
+
+
+def tenant_key(tenant_id: str, *parts) -> str:
+    return ":".join(["tenant", tenant_id, *map(str, parts)])
+
+
+def user_key(user_id: int, *parts) -> str:
+    return ":".join(["user", str(user_id), *map(str, parts)])
+
+
+def ttl(kind: str) -> int:
+    return settings.XERO_CACHE["TTL"][kind]
@@ -0,0 +1,110 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a Xero endpoint that is currently failing."""
+
+    def __init__(self, endpoint: str, scope: str, retry_after: float):
+        self.endpoint = endpoint
+        self.scope = scope
+        self.retry_after = max(1, round(retry_after))
+        super().__init__(
+            f"Xero {endpoint} is unavailable, try again in {self.retry_after}s"
+        )
+
+
+class CircuitBreaker:
+    """Circuit breaker for one Xero endpoint and tenant (``scope``).
+
+    ``FAILURE_THRESHOLD`` failures within ``WINDOW`` seconds open the circuit.
+    Calls then fail fast with ``CircuitOpenError`` for ``RESET_TIMEOUT``
+    seconds. After that, the circuit is half-open: a single probe call is let
+    through, and the rest keep failing fast. A successful probe closes the
+    circuit; a failed one opens it again.
+
+    State lives in a Django cache (the shared one when configured), so every
+    worker sees the same circuits. Counting is approximate under contention,
+    which is fine for deciding when to back off.
+    """
+
+    def __init__(self, endpoint: str, scope: str = "global"):
+        self.endpoint = endpoint
+        self.scope = scope
+        self.config = settings.XERO_CIRCUIT_BREAKER
+        prefix = f"circuit:{endpoint}:{scope}"
+        self.open_key = f"{prefix}:open"
+        self.tripped_key = f"{prefix}:tripped"
+        self.probe_key = f"{prefix}:probe"
+        self.failures_key = f"{prefix}:failures"
+        self.probing = False
+
+    @property
+    def cache(self):
+        alias = self.config["CACHE_ALIAS"]
+        return caches[alias if alias in settings.CACHES else "default"]
+
+    async def acheck(self) -> None:
+        """Raise ``CircuitOpenError`` unless a call may go ahead."""
+        state = await self.cache.aget_many([self.open_key, self.tripped_key])
+        if (open_until := state.get(self.open_key)) is not None:
+            raise CircuitOpenError(self.endpoint, self.scope, open_until - time.time())
+        if self.tripped_key in state:
+            self.probing = await self.cache.aadd(
+                self.probe_key, 1, self.config["PROBE_TIMEOUT"]
+            )
+            if not self.probing:
+                raise CircuitOpenError(
+                    self.endpoint, self.scope, self.config["PROBE_TIMEOUT"]
+                )
+            logger.info("Probing Xero %s for %s", self.endpoint, self.scope)
+
+    async def arecord_response(self, status_code: int) -> None:
+        """Record a response; rate limiting and server errors count as failures."""
+        if status_code == 429 or status_code >= 500:
+            await self.arecord_failure()
+        else:
+            await self.arecord_success()
+
+    async def arecord_success(self) -> None:
+        if self.probing:
+            self.probing = False
+            await self.cache.adelete_many(
+                [self.tripped_key, self.probe_key, self.failures_key]
+            )
+            logger.info("Closed circuit for Xero %s (%s)", self.endpoint, self.scope)
+
+    async def arecord_failure(self) -> None:
+        if self.probing:
+            self.probing = False
+            await self._open()
+            await self.cache.adelete(self.probe_key)
+            return
+
+        await self.cache.aadd(self.failures_key, 0, self.config["WINDOW"])
+        try:
+            failures = await self.cache.aincr(self.failures_key)
+        except ValueError:
+            # The window expired between add and incr
+            failures = 1
+            await self.cache.aset(self.failures_key, failures, self.config["WINDOW"])
+        if failures >= self.config["FAILURE_THRESHOLD"]:
+            await self._open()
+
+    async def _open(self) -> None:
+        reset_timeout = self.config["RESET_TIMEOUT"]
+        # Only the open marker expires, which is what lets a probe through
+        await self.cache.aset(self.tripped_key, 1, None)
+        await self.cache.aset(self.open_key, time.time() + reset_timeout, reset_timeout)
+        await self.cache.adelete(self.failures_key)
+        logger.warning(
+            "Opened circuit for Xero %s (%s) for %ss",
+            self.endpoint,
+            self.scope,
+            reset_timeout,
+        )
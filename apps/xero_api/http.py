@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+import httpx
+from django.conf import settings
+from django.utils.http import parse_http_date_safe
+
+from core.metrics import Counter as CounterMetric
+from core.metrics import registry, xero_request_duration
+
+from .circuit import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Retries made since start-up, by endpoint and reason ("429", "timeout", ...),
+# plus "exhausted" for requests that failed after their last allowed attempt.
+retry_counts: Counter = Counter()
+
+
+def _collect_retries():
+    retries = CounterMetric(
+        "xero_retries",
+        "Retried Xero requests by endpoint and reason, and exhausted retries",
+        ("endpoint", "reason"),
+    )
+    for (endpoint, reason), count in list(retry_counts.items()):
+        retries.inc(count, endpoint=endpoint, reason=reason)
+    return (retries,)
+
+
+registry.register_collector(_collect_retries)
+
+_deadline: ContextVar[float | None] = ContextVar("xero_deadline", default=None)
+
+# Connection pool shared by every Xero call in this worker, while the server
+# keeps one open (see core.asgi)
+_shared_client: httpx.AsyncClient | None = None
+
+
+async def open_client() -> None:
+    """Open the worker's shared connection pool to Xero."""
+    global _shared_client
+    if _shared_client is None:
+        config = settings.XERO_HTTP_POOL
+        _shared_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config["MAX_CONNECTIONS"],
+                max_keepalive_connections=config["MAX_KEEPALIVE_CONNECTIONS"],
+                keepalive_expiry=config["KEEPALIVE_EXPIRY"],
+            )
+        )
+
+
+async def close_client() -> None:
+    """Close the shared pool, waiting for its connections to shut down."""
+    global _shared_client
+    client, _shared_client = _shared_client, None
+    if client is not None:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def xero_client():
+    """The shared pool if one is open, otherwise a client for this block only.
+
+    Without a server (tests, management commands) there is no shared pool,
+    and connections last as long as the block.
+    """
+    if _shared_client is not None:
+        yield _shared_client
+        return
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """Bound the retries of every Xero call made in this context.
+
+    Nested deadlines can only shorten the one already in effect.
+    """
+    deadline = time.monotonic() + seconds
+    if (current := _deadline.get()) is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Seconds the ``Retry-After`` header asks us to wait, if present."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    if (timestamp := parse_http_date_safe(value)) is not None:
+        return max(0.0, timestamp - time.time())
+    return None
+
+
+def endpoint_timeout(endpoint: str) -> httpx.Timeout:
+    """httpx timeouts for ``endpoint``, clipped to the deadline in effect.
+
+    ``XERO_TIMEOUTS[endpoint]`` overrides individual phases of
+    ``XERO_TIMEOUTS["default"]``.
+    """
+    config = settings.XERO_TIMEOUTS
+    timeouts = {**config["default"], **config.get(endpoint, {})}
+    if (deadline := _deadline.get()) is not None:
+        remaining = max(deadline - time.monotonic(), 0.001)
+        timeouts = {phase: min(value, remaining) for phase, value in timeouts.items()}
+    return httpx.Timeout(**timeouts)
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt``."""
+    config = settings.XERO_RETRY
+    ceiling = min(config["MAX_DELAY"], config["BASE_DELAY"] * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+async def get_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    endpoint: str,
+    headers: dict[str, str],
+    scope: str = "global",
+    semaphore: asyncio.Semaphore | None = None,
+) -> httpx.Response:
+    """GET ``url``, retrying timeouts, transport errors, 429s and 5xx responses.
+
+    Waits grow exponentially with jitter, or follow ``Retry-After`` when Xero
+    sends one. Retries stop after ``XERO_RETRY["MAX_ATTEMPTS"]`` attempts or
+    when the next wait would overrun the deadline set by ``request_deadline``
+    (``XERO_RETRY["DEADLINE"]`` seconds if none is set). The last response is
+    then returned, or the last transport error raised. Each attempt uses the
+    endpoint's ``XERO_TIMEOUTS``. ``semaphore`` is held for each attempt, but
+    not while waiting between them.
+
+    Attempts go through the circuit breaker for ``endpoint`` and ``scope``
+    (usually the tenant id), raising ``CircuitOpenError`` while it is open.
+    """
+    breaker = CircuitBreaker(endpoint, scope)
+    deadline = _deadline.get() or time.monotonic() + settings.XERO_RETRY["DEADLINE"]
+    max_attempts = settings.XERO_RETRY["MAX_ATTEMPTS"]
+
+    for attempt in range(1, max_attempts + 1):
+        error = None
+        await breaker.acheck()
+        start = time.monotonic()
+        try:
+            if semaphore is None:
+                response = await client.get(
+                    url, headers=headers, timeout=endpoint_timeout(endpoint)
+                )
+            else:
+                async with semaphore:
+                    response = await client.get(
+                        url, headers=headers, timeout=endpoint_timeout(endpoint)
+                    )
+        except httpx.TransportError as e:
+            xero_request_duration.observe(
+                time.monotonic() - start,
+                endpoint=endpoint,
+                status="timeout" if isinstance(e, httpx.TimeoutException) else "error",
+            )
+            await breaker.arecord_failure()
+            if attempt == max_attempts:
+                retry_counts[endpoint, "exhausted"] += 1
+                raise
+            error = e
+            reason = "timeout" if isinstance(e, httpx.TimeoutException) else "transport"
+            delay = backoff(attempt)
+        else:
+            xero_request_duration.observe(
+                time.monotonic() - start,
+                endpoint=endpoint,
+                status=response.status_code,
+            )
+            await breaker.arecord_response(response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt == max_attempts:
+                if response.status_code in RETRY_STATUSES:
+                    retry_counts[endpoint, "exhausted"] += 1
+                return response
+            reason = str(response.status_code)
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff(attempt)
+
+        if time.monotonic() + delay > deadline:
+            logger.warning(
+                "Not retrying Xero %s after %s: %.2fs wait would pass the deadline",
+                endpoint,
+                reason,
+                delay,
+            )
+            retry_counts[endpoint, "exhausted"] += 1
+            if error is not None:
+                raise error
+            return response
+
+        retry_counts[endpoint, reason] += 1
+        logger.warning(
+            "Retrying Xero %s after %s in %.2fs (attempt %d of %d)",
+            endpoint,
+            reason,
+            delay,
+            attempt + 1,
+            max_attempts,
+        )
+        await asyncio.sleep(delay)
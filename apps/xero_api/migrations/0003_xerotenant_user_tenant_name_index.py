@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("xero_api", "0002_xerotenant_unique_tenant_user"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="xerotenant",
+            index=models.Index(
+                fields=["user", "tenant_name"], name="xero_api_xe_user_id_8c6e10_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("xero_api", "0003_xerotenant_user_tenant_name_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="XeroSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tenant_id", models.CharField(max_length=128)),
+                ("date", models.DateField()),
+                (
+                    "trial_balance",
+                    models.BinaryField(help_text="Compressed TrialBalance response"),
+                ),
+                (
+                    "accounts",
+                    models.BinaryField(help_text="Compressed Accounts response"),
+                ),
+                (
+                    "fetched_at",
+                    models.DateTimeField(
+                        help_text="When the data was fetched from Xero"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="xerosnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("tenant_id", "date"), name="unique_snapshot_tenant_date"
+            ),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import json
+import zlib
+from typing import Any
+
 from django.contrib.auth.models import User
 from django.db import models
 
@@ -23,9 +27,47 @@ class XeroTenant(models.Model):
                 fields=["tenant_id", "user"], name="unique_tenant_user"
             )
         ]
+        indexes = [
+            models.Index(fields=["user", "tenant_name"]),
+        ]
 
 
 class XeroAuthState(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     state = models.CharField(max_length=128)
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+class XeroSnapshot(models.Model):
+    """Raw Xero responses for a tenant as at a date, stored zlib-compressed.
+
+    Holds the full chart of accounts so a report for any account type can be
+    derived from it without calling Xero.
+    """
+
+    tenant_id = models.CharField(max_length=128)
+    date = models.DateField()
+    trial_balance = models.BinaryField(help_text="Compressed TrialBalance response")
+    accounts = models.BinaryField(help_text="Compressed Accounts response")
+    fetched_at = models.DateTimeField(help_text="When the data was fetched from Xero")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant_id", "date"], name="unique_snapshot_tenant_date"
+            )
+        ]
+
+    @staticmethod
+    def compress(data: dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(data, separators=(",", ":")).encode())
+
+    @staticmethod
+    def decompress(data: bytes | memoryview) -> dict[str, Any]:
+        return json.loads(zlib.decompress(data))
+
+    def get_trial_balance(self) -> dict[str, Any]:
+        return self.decompress(self.trial_balance)
+
+    def get_accounts(self) -> dict[str, Any]:
+        return self.decompress(self.accounts)
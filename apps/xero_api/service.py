@@ -1,12 +1,18 @@
 import base64
 import logging
 import secrets
+import time
 from typing import Any
 
 import httpx
 from django.conf import settings
 from django.contrib.auth.models import User
 
+from core.metrics import xero_request_duration, xero_token_refreshes
+
+from .cache import ttl, user_key, xero_cache
+from .circuit import CircuitBreaker, CircuitOpenError
+from .http import endpoint_timeout, get_with_retry, xero_client
 from .models import XeroAuthState, XeroTenant, XeroToken
 
 logger = logging.getLogger(__name__)
@@ -47,7 +53,7 @@ class AsyncXeroAuthService:
             str: The authorization URL including state parameter
 
         """
-        logger.info(f"Generating authorization URL for user {user.username}")
+        logger.info("Generating authorization URL for user %s", user.username)
         params = {
             "client_id": self.client_id,
             "redirect_uri": self.redirect_uri,
@@ -67,23 +73,34 @@ class AsyncXeroAuthService:
         credentials = f"{self.client_id}:{self.client_secret}"
         encoded_credentials = base64.b64encode(credentials.encode()).decode()
 
-        async with httpx.AsyncClient() as client:
+        breaker = CircuitBreaker("token")
+        await breaker.acheck()
+        async with xero_client() as client:
             logger.debug("Exchanging code for token")
-            response = await client.post(
-                self.token_url,
-                headers={
-                    "Authorization": f"Basic {encoded_credentials}",
-                    "Content-Type": "application/x-www-form-urlencoded",
-                },
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "redirect_uri": self.redirect_uri,
-                },
-            )
+            start = time.monotonic()
+            try:
+                response = await client.post(
+                    self.token_url,
+                    timeout=endpoint_timeout("token"),
+                    headers={
+                        "Authorization": f"Basic {encoded_credentials}",
+                        "Content-Type": "application/x-www-form-urlencoded",
+                    },
+                    data={
+                        "grant_type": "authorization_code",
+                        "code": code,
+                        "redirect_uri": self.redirect_uri,
+                    },
+                )
+            except httpx.TransportError:
+                self._observe_token_request(start, "error")
+                await breaker.arecord_failure()
+                raise
+            self._observe_token_request(start, response.status_code)
+            await breaker.arecord_response(response.status_code)
 
             if response.status_code != 200:
-                logger.error(f"Token exchange failed: {response.text}")
+                logger.error("Token exchange failed: %s", response.text)
                 raise Exception(f"Failed to exchange code for token: {response.text}")
 
             return response.json()
@@ -97,56 +114,128 @@ class AsyncXeroAuthService:
         if not token_data:
             raise Exception("No token found")
 
+        breaker = CircuitBreaker("token")
+        await breaker.acheck()
         try:
             refresh_token = token_data["refresh_token"]
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.config["TOKEN_URL"],
-                    data={
-                        "grant_type": "refresh_token",
-                        "refresh_token": refresh_token,
-                    },
-                    auth=(self.client_id, self.client_secret),
-                )
+            async with xero_client() as client:
+                start = time.monotonic()
+                try:
+                    response = await client.post(
+                        self.config["TOKEN_URL"],
+                        timeout=endpoint_timeout("token"),
+                        data={
+                            "grant_type": "refresh_token",
+                            "refresh_token": refresh_token,
+                        },
+                        auth=(self.client_id, self.client_secret),
+                    )
+                except httpx.TransportError:
+                    self._observe_token_request(start, "error")
+                    await breaker.arecord_failure()
+                    raise
+                self._observe_token_request(start, response.status_code)
+                await breaker.arecord_response(response.status_code)
 
                 if response.status_code != 200:
-                    logger.error(f"Token refresh failed: {response.text}")
+                    xero_token_refreshes.inc(outcome="rejected")
+                    logger.error("Token refresh failed: %s", response.text)
                     user = await User.objects.aget(id=user_id)
                     auth_url = await self.generate_authorization_url(user)
                     raise TokenRefreshError(auth_url)
 
                 new_token_data = response.json()
                 await self.store_token(user_id, new_token_data)
+                xero_token_refreshes.inc(outcome="success")
                 return new_token_data
 
         except httpx.RequestError as e:
-            logger.error(f"Token refresh request failed: {e}")
+            xero_token_refreshes.inc(outcome="error")
+            logger.error("Token refresh request failed: %s", e)
             user = await User.objects.aget(id=user_id)
             auth_url = await self.generate_authorization_url(user)
             raise TokenRefreshError(auth_url)
 
+    @staticmethod
+    def _observe_token_request(start: float, status) -> None:
+        xero_request_duration.observe(
+            time.monotonic() - start, endpoint="token", status=status
+        )
+
     async def store_token(self, user_id: int, token_data: dict[str, Any]) -> None:
         await XeroToken.objects.aupdate_or_create(
             user_id=user_id, defaults={"token": token_data}
         )
 
     async def get_tenant(self, user_id: int, tenant_name: str) -> XeroTenant | None:
-        """Retrieve Xero tenant for the current user."""
-        logger.info(f"Fetching tenants for user {user_id}")
+        """Retrieve Xero tenant for the current user.
+
+        All of a user's tenants are loaded in one query on first use and cached
+        as a name -> tenant map, so repeat lookups don't touch the database.
+        """
+        logger.info("Fetching tenants for user %s", user_id)
         try:
-            return await XeroTenant.objects.filter(
-                user_id=user_id, tenant_name=tenant_name
-            ).afirst()
+            tenants = await self._get_tenant_map(user_id)
+
+            tenant = tenants.get(tenant_name)
+            if tenant is None:
+                # Misses aren't cached, a tenant may have been added since.
+                tenant = await XeroTenant.objects.filter(
+                    user_id=user_id, tenant_name=tenant_name
+                ).afirst()
+                if tenant is not None:
+                    tenants[tenant_name] = tenant
+                    await xero_cache.aset(
+                        await self._tenant_map_key(user_id), tenants, ttl("tenants")
+                    )
+            return tenant
         except Exception as e:
-            logger.error(f"Error fetching tenants for user {user_id}: {str(e)}")
+            logger.error("Error fetching tenants for user %s: %s", user_id, e)
             return None
 
+    async def get_tenants(self, user_id: int) -> list[XeroTenant]:
+        """Retrieve all of the user's Xero tenants."""
+        return list((await self._get_tenant_map(user_id)).values())
+
+    async def _get_tenant_map(self, user_id: int) -> dict[str, XeroTenant]:
+        async def load():
+            tenants = {}
+            queryset = XeroTenant.objects.filter(user_id=user_id).order_by("id")
+            async for tenant in queryset:
+                tenants.setdefault(tenant.tenant_name, tenant)
+            return tenants
+
+        return await xero_cache.aget_or_set(
+            await self._tenant_map_key(user_id), load, ttl("tenants")
+        )
+
+    @staticmethod
+    async def _tenant_map_key(user_id: int) -> str:
+        """The tenant map's key, versioned so invalidation reaches every worker.
+
+        Other workers pick up a new version within ``xero_cache.version_ttl``.
+        """
+        key = user_key(user_id, "tenants")
+        return user_key(user_id, "tenants", await xero_cache.aversion(key))
+
+    async def invalidate_tenant_cache(self, user_id: int) -> None:
+        """Drop the cached tenant map for a user, in every worker."""
+        stale_key = await self._tenant_map_key(user_id)
+        await xero_cache.abump_version(user_key(user_id, "tenants"))
+        await xero_cache.adelete_many([stale_key])
+
     async def get_connections(self, access_token: str) -> list:
-        """Get Xero connections for the current user."""
+        """Get Xero connections for the current user.
+
+        Raises ``CircuitOpenError`` while Xero's connections endpoint is
+        failing, rather than reporting that there are no connections.
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            async with xero_client() as client:
+                response = await get_with_retry(
+                    client,
                     self.connections,
+                    endpoint="connections",
                     headers={
                         "Authorization": f"Bearer {access_token}",
                         "Content-Type": "application/json",
@@ -156,9 +245,11 @@ class AsyncXeroAuthService:
                 if response.status_code == 200:
                     return response.json()
 
-                logger.error(f"Failed to get Xero connections: {response.text}")
+                logger.error("Failed to get Xero connections: %s", response.text)
                 return []
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting Xero connections: {str(e)}")
+            logger.error("Error getting Xero connections: %s", e)
             return []
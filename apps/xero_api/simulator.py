@@ -0,0 +1,316 @@
+"""A local stand-in for the Xero endpoints this project calls.
+
+Serves the token, authorize and connections endpoints plus the Accounting
+API's Accounts and TrialBalance, as a plain ASGI app::
+
+    XERO_SIM_ACCOUNTS=2000 uvicorn apps.xero_api.simulator:app --port 8001
+
+and point the project at it with ``XERO_SIMULATOR_URL=http://localhost:8001``.
+
+Charts of accounts and balances are generated deterministically from the
+seed, tenant id and date, so repeated runs see identical data. Environment
+variables configure the simulator:
+
+``XERO_SIM_TENANTS``
+    Number of connected tenants (default 3).
+``XERO_SIM_ACCOUNTS``
+    Accounts per tenant (default 200).
+``XERO_SIM_SEED``
+    Seed for the generated data (default 0).
+``XERO_SIM_LATENCY`` / ``XERO_SIM_LATENCY_<ENDPOINT>``
+    Response latency in milliseconds, for every endpoint or just one of
+    ``TOKEN``, ``CONNECTIONS``, ``ACCOUNTS`` or ``TRIAL_BALANCE``. One of
+    ``fixed:MS``, ``uniform:LOW,HIGH`` or ``lognormal:MEDIAN,SIGMA``
+    (default ``fixed:0``).
+``XERO_SIM_ERRORS``
+    Injected failures as ``STATUS:RATE`` pairs, e.g. ``429:0.05,503:0.01``.
+    429s carry a ``Retry-After`` of ``XERO_SIM_RETRY_AFTER`` seconds.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import secrets
+import uuid
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlencode
+
+ACCOUNT_TYPES = [
+    "BANK",
+    "CURRENT",
+    "FIXED",
+    "CURRLIAB",
+    "TERMLIAB",
+    "EQUITY",
+    "REVENUE",
+    "DIRECTCOSTS",
+    "EXPENSE",
+    "OVERHEADS",
+]
+
+SECTIONS = {
+    "Revenue": {"REVENUE"},
+    "Expenses": {"DIRECTCOSTS", "EXPENSE", "OVERHEADS"},
+    "Assets": {"BANK", "CURRENT", "FIXED"},
+    "Liabilities": {"CURRLIAB", "TERMLIAB"},
+    "Equity": {"EQUITY"},
+}
+
+
+def parse_latency(spec: str):
+    """Build a sampler of delays, in seconds, from a latency spec."""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        (ms,) = values or [0.0]
+        return lambda rng: ms / 1000
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_errors(spec: str) -> dict[int, float]:
+    errors = {}
+    for pair in filter(None, spec.split(",")):
+        status, _, rate = pair.partition(":")
+        errors[int(status)] = float(rate)
+    return errors
+
+
+@dataclass
+class SimulatorConfig:
+    tenants: int = 3
+    accounts: int = 200
+    seed: int = 0
+    latency: dict[str, str] = field(default_factory=dict)
+    errors: dict[int, float] = field(default_factory=dict)
+    retry_after: int = 1
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> "SimulatorConfig":
+        latency = {"default": environ.get("XERO_SIM_LATENCY", "fixed:0")}
+        for endpoint in ("token", "connections", "accounts", "trial_balance"):
+            if spec := environ.get(f"XERO_SIM_LATENCY_{endpoint.upper()}"):
+                latency[endpoint] = spec
+        return cls(
+            tenants=int(environ.get("XERO_SIM_TENANTS", 3)),
+            accounts=int(environ.get("XERO_SIM_ACCOUNTS", 200)),
+            seed=int(environ.get("XERO_SIM_SEED", 0)),
+            latency=latency,
+            errors=parse_errors(environ.get("XERO_SIM_ERRORS", "")),
+            retry_after=int(environ.get("XERO_SIM_RETRY_AFTER", 1)),
+        )
+
+
+class XeroSimulator:
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.samplers = {
+            endpoint: parse_latency(spec) for endpoint, spec in config.latency.items()
+        }
+        # Latency and failures vary between runs; the data itself does not
+        self.rng = random.Random()
+        self.tenant_ids = [
+            str(
+                uuid.UUID(
+                    int=random.Random(f"{config.seed}:tenant:{i}").getrandbits(128)
+                )
+            )
+            for i in range(config.tenants)
+        ]
+        self._charts: dict[str, list[dict]] = {}
+
+    def chart(self, tenant_id: str) -> list[dict]:
+        """The tenant's chart of accounts, generated once per tenant."""
+        if tenant_id not in self._charts:
+            rng = random.Random(f"{self.config.seed}:{tenant_id}")
+            self._charts[tenant_id] = [
+                {
+                    "AccountID": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "Code": str(100 + i),
+                    "Name": f"{account_type.title()} {i}",
+                    "Type": account_type,
+                    "Status": "ACTIVE",
+                }
+                for i, account_type in enumerate(
+                    rng.choice(ACCOUNT_TYPES) for _ in range(self.config.accounts)
+                )
+            ]
+        return self._charts[tenant_id]
+
+    def trial_balance(self, tenant_id: str, date: str) -> dict:
+        rng = random.Random(f"{self.config.seed}:{tenant_id}:{date}")
+        sections = []
+        for title, types in SECTIONS.items():
+            rows = []
+            for account in self.chart(tenant_id):
+                if account["Type"] not in types:
+                    continue
+                amount = round(rng.uniform(0, 50_000), 2)
+                debit, credit = (amount, 0) if rng.random() < 0.5 else (0, amount)
+                attributes = [{"Value": account["AccountID"], "Id": "account"}]
+                rows.append(
+                    {
+                        "RowType": "Row",
+                        "Cells": [
+                            {
+                                "Value": f"{account['Name']} ({account['Code']})",
+                                "Attributes": attributes,
+                            },
+                            {"Value": "", "Attributes": attributes},
+                            {"Value": "", "Attributes": attributes},
+                            {"Value": f"{debit:.2f}", "Attributes": attributes},
+                            {"Value": f"{credit:.2f}", "Attributes": attributes},
+                        ],
+                    }
+                )
+            rows.append({"RowType": "SummaryRow", "Cells": [{"Value": "Total"}]})
+            sections.append({"RowType": "Section", "Title": title, "Rows": rows})
+
+        header = {
+            "RowType": "Header",
+            "Cells": [
+                {"Value": "Account"},
+                {"Value": "Debit"},
+                {"Value": "Credit"},
+                {"Value": "YTD Debit"},
+                {"Value": "YTD Credit"},
+            ],
+        }
+        return {
+            "Reports": [
+                {
+                    "ReportID": "TrialBalance",
+                    "ReportName": "Trial Balance",
+                    "ReportDate": date,
+                    "Rows": [header, *sections],
+                }
+            ]
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        path = scope["path"]
+        method = scope["method"]
+        query = {
+            key: values[0]
+            for key, values in parse_qs(scope["query_string"].decode()).items()
+        }
+        headers = {
+            key.decode().lower(): value.decode() for key, value in scope["headers"]
+        }
+
+        if method == "POST" and path == "/connect/token":
+            endpoint, handler = "token", self.token
+        elif method == "GET" and path == "/identity/connect/authorize":
+            endpoint, handler = "authorize", self.authorize
+        elif method == "GET" and path == "/connections":
+            endpoint, handler = "connections", self.connections
+        elif method == "GET" and path == "/api.xro/2.0/Accounts":
+            endpoint, handler = "accounts", self.accounts
+        elif method == "GET" and path == "/api.xro/2.0/Reports/TrialBalance":
+            endpoint, handler = "trial_balance", self.trial_balance_endpoint
+        else:
+            await self._send(send, 404, {"Title": "Not Found"})
+            return
+
+        sampler = self.samplers.get(endpoint) or self.samplers.get("default")
+        if sampler is not None and (delay := sampler(self.rng)) > 0:
+            await asyncio.sleep(delay)
+
+        for status, rate in self.config.errors.items():
+            if endpoint != "authorize" and self.rng.random() < rate:
+                extra = {}
+                if status == 429:
+                    extra["retry-after"] = str(self.config.retry_after)
+                await self._send(send, status, {"Title": "Simulated error"}, extra)
+                return
+
+        await handler(send, query, headers)
+
+    async def token(self, send, query, headers):
+        await self._send(
+            send,
+            200,
+            {
+                "access_token": secrets.token_urlsafe(32),
+                "refresh_token": secrets.token_urlsafe(32),
+                "expires_in": 1800,
+                "token_type": "Bearer",
+                "scope": "accounting.reports.read accounting.settings.read",
+            },
+        )
+
+    async def authorize(self, send, query, headers):
+        location = f"{query['redirect_uri']}?" + urlencode(
+            {"code": secrets.token_urlsafe(16), "state": query.get("state", "")}
+        )
+        await self._send(send, 302, {}, {"location": location})
+
+    async def connections(self, send, query, headers):
+        await self._send(
+            send,
+            200,
+            [
+                {
+                    "id": str(uuid.UUID(tenant_id).int ^ 1),
+                    "authEventId": str(uuid.UUID(int=self.rng.getrandbits(128))),
+                    "tenantId": tenant_id,
+                    "tenantType": "ORGANISATION",
+                    "tenantName": f"Simulated Company {i + 1}",
+                }
+                for i, tenant_id in enumerate(self.tenant_ids)
+            ],
+        )
+
+    async def accounts(self, send, query, headers):
+        if (tenant_id := self._tenant(headers)) is None:
+            await self._send(send, 403, {"Title": "Unknown tenant"})
+            return
+        accounts = self.chart(tenant_id)
+        # The project only filters with where=Type=="<TYPE>"
+        if where := query.get("where"):
+            account_type = where.partition("==")[2].strip('"')
+            accounts = [a for a in accounts if a["Type"] == account_type]
+        await self._send(send, 200, {"Accounts": accounts})
+
+    async def trial_balance_endpoint(self, send, query, headers):
+        if (tenant_id := self._tenant(headers)) is None:
+            await self._send(send, 403, {"Title": "Unknown tenant"})
+            return
+        await self._send(send, 200, self.trial_balance(tenant_id, query.get("date")))
+
+    def _tenant(self, headers) -> str | None:
+        tenant_id = headers.get("xero-tenant-id")
+        return tenant_id if tenant_id in self.tenant_ids else None
+
+    @staticmethod
+    async def _send(send, status: int, body, extra_headers=None):
+        content = json.dumps(body).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(content)).encode()),
+            *((k.encode(), v.encode()) for k, v in (extra_headers or {}).items()),
+        ]
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": content})
+
+
+def create_app(config: SimulatorConfig | None = None) -> XeroSimulator:
+    return XeroSimulator(config or SimulatorConfig.from_env())
+
+
+app = create_app()
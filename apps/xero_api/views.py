@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from adrf.views import APIView
+from apps.xero_api.circuit import CircuitOpenError
 from apps.xero_api.models import XeroAuthState, XeroTenant
 from apps.xero_api.service import AsyncXeroAuthService
 from core.authentication import AsyncJWTAuthentication
@@ -41,7 +42,7 @@ class XeroConnectView(APIView):
             )
             return Response({"authorization_url": authorization_url})
         except Exception as e:
-            logger.error(f"Error in Xero connect: {e}")
+            logger.error("Error in Xero connect: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -86,13 +87,13 @@ class XeroCallbackView(APIView):
                 state=received_state
             )
         except XeroAuthState.DoesNotExist:
-            logger.error(f"Invalid state parameter: {received_state}")
+            logger.error("Invalid state parameter: %s", received_state)
             return Response(
                 {"error": "Invalid state parameter"}, status=status.HTTP_400_BAD_REQUEST
             )
 
         user = auth_state.user
-        logger.debug(f"Found auth state for user_id: {user.id}")
+        logger.debug("Found auth state for user_id: %s", user.id)
 
         request.user = user
 
@@ -111,7 +112,7 @@ class XeroCallbackView(APIView):
         try:
             await self.xero_service.store_token(user.id, token_data)
         except Exception:
-            logger.exception(f"Error storing token for user {user.id}")
+            logger.exception("Error storing token for user %s", user.id)
             return Response(
                 {"error": "Failed to store Xero token"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -121,15 +122,22 @@ class XeroCallbackView(APIView):
             connections = await self.xero_service.get_connections(
                 token_data["access_token"]
             )
+        except CircuitOpenError as e:
+            logger.warning("Xero connections unavailable for user %s: %s", user.id, e)
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(e.retry_after)},
+            )
         except Exception:
-            logger.exception(f"Error fetching connections for user {user.id}")
+            logger.exception("Error fetching connections for user %s", user.id)
             return Response(
                 {"error": "Failed to retrieve Xero connections"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
         if not connections:
-            logger.warning(f"No Xero connections found for user {user.id}")
+            logger.warning("No Xero connections found for user %s", user.id)
             return Response(
                 {"error": "No Xero connections found"},
                 status=status.HTTP_404_NOT_FOUND,
@@ -157,9 +165,10 @@ class XeroCallbackView(APIView):
                 unique_fields=["tenant_id", "user"],
                 update_fields=["auth_event_id", "tenant_type", "tenant_name"],
             )
+            await self.xero_service.invalidate_tenant_cache(user.id)
 
         except Exception as e:
-            logger.exception(f"Error storing Xero tenants for user {user.id}: {str(e)}")
+            logger.exception("Error storing Xero tenants for user %s: %s", user.id, e)
             return Response(
                 {"error": "Failed to store Xero tenant information"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
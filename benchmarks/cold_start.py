@@ -0,0 +1,111 @@
+"""How long a new worker takes to start, and how slow its first requests are.
+
+Run from the project root with the usual environment (``.env``)::
+
+    python -m benchmarks.cold_start --runs 5
+
+Starts a single uvicorn worker ``--runs`` times with warm-up off, on, and on
+with a synthetic request (see ``core.warmup``), and times:
+
+- ``ready``: from launching the process until it accepts connections, which
+  is after lifespan start-up and so includes warm-up.
+- ``first``: the first authenticated request for a report's details.
+- ``steady``: the median of the ``--requests`` details requests after it.
+
+Warm-up moves work from ``first`` to ``ready``. The sum is what a rolling
+deploy or a new autoscaled worker costs the first client. Everything runs
+against a throwaway test database.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from benchmarks.workers import Server, seed  # noqa: E402
+
+MODES = {
+    "warm-up off": {"WARMUP": "false"},
+    "warm-up on": {"WARMUP": "true"},
+    "+ request": {"WARMUP": "true", "WARMUP_REQUEST_PATH": "/reports/"},
+}
+
+
+def measure(token: str, report_id: int, env: dict, requests: int) -> dict:
+    headers = {"Authorization": f"Bearer {token}", "Host": "localhost"}
+    path = f"/reports/{report_id}/details/"
+
+    start = time.perf_counter()
+    with Server(1, **env) as url:
+        ready = time.perf_counter() - start
+        with httpx.Client(base_url=url, headers=headers, timeout=30) as client:
+            timings = []
+            for _ in range(requests + 1):
+                request_start = time.perf_counter()
+                client.get(path).raise_for_status()
+                timings.append(time.perf_counter() - request_start)
+
+    return {
+        "ready": ready,
+        "first": timings[0],
+        "steady": statistics.median(timings[1:]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--accounts", type=int, default=1_000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    setup_test_environment()
+    if connection.vendor == "sqlite":
+        # The server is a separate process and needs a database file to share
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            tempfile.gettempdir(), "xeroreports-cold-start.sqlite3"
+        )
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        token, report_id = seed(args.accounts)
+        connection.close()
+        results = {
+            mode: [
+                measure(token, report_id, env, args.requests) for _ in range(args.runs)
+            ]
+            for mode, env in MODES.items()
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    print(f"{'':<12}{'ready ms':>10}{'first ms':>10}{'steady ms':>11}{'total ms':>10}")
+    for mode, runs in results.items():
+        medians = {
+            key: statistics.median(run[key] for run in runs) * 1000
+            for key in ("ready", "first", "steady")
+        }
+        print(
+            f"{mode:<12}{medians['ready']:>10.0f}{medians['first']:>10.1f}"
+            f"{medians['steady']:>11.1f}{medians['ready'] + medians['first']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
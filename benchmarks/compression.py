@@ -0,0 +1,99 @@
+"""Compression size and latency trade-off on representative report payloads.
+
+Run from the project root::
+
+    python -m benchmarks.compression
+
+For each payload, coding and level it prints the compressed size, the time
+to compress, and the estimated time to deliver the body over a slow and a
+fast link (compression time plus transfer time).
+"""
+
+import csv
+import io
+import json
+import random
+import statistics
+import time
+
+from core.compression import COMPRESSORS
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 8, 11)}
+LINKS_MBIT = (10, 100)
+REPEATS = 5
+
+
+def details_payload(accounts: int) -> bytes:
+    rng = random.Random(accounts)
+    return json.dumps(
+        {
+            "id": 1,
+            "period": "2024-01-31",
+            "account_type": "REVENUE",
+            "account_balances": [
+                {
+                    "xero_account_id": f"{rng.getrandbits(128):032x}",
+                    "account_name": f"Account {i} - {rng.choice(['Sales', 'Fees'])}",
+                    "account_balance": f"{rng.uniform(-1e5, 1e5):.2f}",
+                }
+                for i in range(accounts)
+            ],
+        }
+    ).encode()
+
+
+def export_payload(rows: int) -> bytes:
+    rng = random.Random(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["report_id", "period", "xero_account_id", "balance"])
+    for i in range(rows):
+        writer.writerow(
+            [i // 200, "2024-01-31", f"{rng.getrandbits(64):016x}", rng.random()]
+        )
+    return buffer.getvalue().encode()
+
+
+PAYLOADS = {
+    "details, 100 accounts": details_payload(100),
+    "details, 1k accounts": details_payload(1_000),
+    "details, 10k accounts": details_payload(10_000),
+    "csv export, 100k rows": export_payload(100_000),
+}
+
+
+def compress(encoding: str, level: int, data: bytes) -> tuple[int, float]:
+    timings, size = [], 0
+    for _ in range(REPEATS):
+        compressor = COMPRESSORS[encoding](level)
+        start = time.perf_counter()
+        size = len(compressor.compress(data) + compressor.finish())
+        timings.append(time.perf_counter() - start)
+    return size, statistics.median(timings)
+
+
+def transfer_ms(size: int, mbit: int) -> float:
+    return size * 8 / (mbit * 1_000_000) * 1000
+
+
+def main() -> None:
+    header = f"{'payload':<24}{'coding':<10}{'bytes':>12}{'ratio':>8}{'cpu ms':>9}"
+    header += "".join(f"{f'@{mbit}Mb ms':>12}" for mbit in LINKS_MBIT)
+    print(header)
+    for name, data in PAYLOADS.items():
+        rows = [("identity", len(data), 0.0)]
+        for encoding in COMPRESSORS:
+            for level in LEVELS[encoding]:
+                rows.append((f"{encoding}-{level}", *compress(encoding, level, data)))
+        for coding, size, seconds in rows:
+            line = f"{name:<24}{coding:<10}{size:>12,}{len(data) / size:>8.1f}"
+            line += f"{seconds * 1000:>9.1f}"
+            line += "".join(
+                f"{seconds * 1000 + transfer_ms(size, mbit):>12.1f}"
+                for mbit in LINKS_MBIT
+            )
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
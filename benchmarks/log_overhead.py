@@ -0,0 +1,135 @@
+"""Logging cost paid on the event loop per ``generate`` request.
+
+Run from the project root::
+
+    python -m benchmarks.log_overhead
+
+Replays the log calls one ``generate`` request makes (report service, views
+and httpx) against a synchronous ``StreamHandler`` and against
+``core.log.QueueHandler``, with eagerly built f-string messages and with lazy
+%-style ones. Output goes to ``/dev/null`` and to a stream that takes
+``SLOW_WRITE_MS`` per write, like stdout when its reader falls behind.
+
+Only time spent in the calling thread is counted: that is what holds up the
+event loop. Queued records are written afterwards by the listener thread.
+"""
+
+import logging
+import os
+import statistics
+import time
+import uuid
+
+from core.log import JSONFormatter, QueueHandler
+
+REQUESTS = 2_000
+SLOW_WRITE_MS = 0.2
+
+TENANT_ID = str(uuid.uuid4())
+USER_ID = 42
+PERIOD = "2024-01-31"
+URL = "https://api.xero.com/api.xro/2.0/Reports/TrialBalance?date=2024-01-31"
+
+# (logger, level, format, args) for each call a generate request makes
+CALLS = [
+    ("apps.xero_api.service", logging.INFO, "Fetching tenants for user %s", (USER_ID,)),
+    (
+        "apps.reports.service",
+        logging.INFO,
+        "Getting trial balance for tenant %s...",
+        (TENANT_ID,),
+    ),
+    (
+        "apps.reports.service",
+        logging.DEBUG,
+        "Getting accounts for tenant %s...",
+        (TENANT_ID,),
+    ),
+    (
+        "httpx",
+        logging.INFO,
+        'HTTP Request: %s %s "%s %d %s"',
+        ("GET", URL, "HTTP/1.1", 200, "OK"),
+    ),
+    (
+        "httpx",
+        logging.INFO,
+        'HTTP Request: %s %s "%s %d %s"',
+        ("GET", URL, "HTTP/1.1", 200, "OK"),
+    ),
+    (
+        "apps.reports.views",
+        logging.INFO,
+        "Creating report from generated data... \nPeriod: %s",
+        (PERIOD,),
+    ),
+]
+
+
+class SlowStream:
+    """A stream whose writes block, like a pipe nobody is reading fast enough."""
+
+    def write(self, data):
+        time.sleep(SLOW_WRITE_MS / 1000)
+
+    def flush(self):
+        pass
+
+
+def configure(handler: logging.Handler, apps_level: int) -> None:
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    logging.getLogger("apps").setLevel(apps_level)
+
+
+def replay(eager: bool) -> float:
+    """Seconds the calling thread spends logging one request's calls."""
+    start = time.perf_counter()
+    for name, level, message, args in CALLS:
+        logger = logging.getLogger(name)
+        if eager:
+            # What logger.info(f"...") does: build the string before the call
+            logger.log(level, message % args)
+        else:
+            logger.log(level, message, *args)
+    return time.perf_counter() - start
+
+
+def run(handler_name: str, stream, eager: bool, apps_level: int) -> list[float]:
+    if handler_name == "queue":
+        handler = QueueHandler(stream)
+    else:
+        handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    configure(handler, apps_level)
+
+    timings = [replay(eager) for _ in range(REQUESTS)]
+    handler.close()
+    return timings
+
+
+def main() -> None:
+    devnull = open(os.devnull, "w")
+    sinks = {"/dev/null": devnull, "slow stdout": SlowStream()}
+    cases = [
+        ("stream", True, logging.DEBUG, "sync handler, f-strings, apps at DEBUG"),
+        ("stream", False, logging.INFO, "sync handler, lazy, apps at INFO"),
+        ("queue", True, logging.DEBUG, "queue handler, f-strings, apps at DEBUG"),
+        ("queue", False, logging.INFO, "queue handler, lazy, apps at INFO"),
+    ]
+
+    print(f"{'configuration':<42}{'sink':<14}{'p50 us':>9}{'p99 us':>9}")
+    for sink_name, stream in sinks.items():
+        for handler_name, eager, apps_level, label in cases:
+            timings = run(handler_name, stream, eager, apps_level)
+            percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+            print(
+                f"{label:<42}{sink_name:<14}"
+                f"{percentiles[49] * 1e6:>9.1f}{percentiles[98] * 1e6:>9.1f}"
+            )
+    devnull.close()
+
+
+if __name__ == "__main__":
+    main()
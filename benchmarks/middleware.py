@@ -0,0 +1,155 @@
+"""Per-request cost of the session, CSRF, auth and messages middleware on the API.
+
+Run from the project root with the usual environment (``.env``)::
+
+    python -m benchmarks.middleware --requests 500
+
+Sends JWT-authenticated ``retrieve`` requests through the full middleware
+stack (``LEAN_MIDDLEWARE_PATHS`` empty) and through the lean API profile,
+from a client without cookies and from one that also sends a session cookie,
+like a browser logged in to the admin. It reports latency and database
+queries per request. With the full stack, a session cookie costs a session
+read and, because of ``SESSION_SAVE_EVERY_REQUEST``, a write on every call.
+
+Everything runs in process against a throwaway test database.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import SESSION_KEY  # noqa: E402
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.contrib.sessions.backends.db import SessionStore  # noqa: E402
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.reports.models import Report  # noqa: E402
+from core.metrics import db_queries_per_request  # noqa: E402
+
+VIEW = "reports:report-detail"
+
+
+def seed() -> tuple[str, str, int]:
+    """A user's JWT, a logged-in session key for them, and one of their reports."""
+    user = User.objects.create_superuser("benchmark", password="benchmark")
+    report = Report.objects.create(
+        user=user, period=date(2024, 1, 31), account_type="ALL"
+    )
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    token = str(RefreshToken.for_user(user).access_token)
+    return token, session.session_key, report.id
+
+
+def queries_so_far() -> tuple[float, float]:
+    """Total queries and requests recorded for ``VIEW`` so far."""
+    totals = {}
+    for name, labels, value in db_queries_per_request.samples():
+        if labels.get("view") == VIEW and "le" not in labels:
+            totals[name] = value
+    return (
+        totals.get("db_queries_per_request_sum", 0),
+        totals.get("db_queries_per_request_count", 0),
+    )
+
+
+async def measure(app, token: str, cookies: dict, report_id: int, requests: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://localhost",
+        headers={"Authorization": f"Bearer {token}"},
+        cookies=cookies,
+    ) as client:
+        path = f"/reports/{report_id}/"
+        # The first request renders the report and fills the response cache
+        (await client.get(path)).raise_for_status()
+
+        queries, count = queries_so_far()
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get(path)
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+        total_queries, total_count = queries_so_far()
+
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "queries": (total_queries - queries) / (total_count - count),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    # The full stack's session queries would log a query budget warning per request
+    logging.disable(logging.WARNING)
+    setup_test_environment()
+    if connection.vendor == "sqlite":
+        # Requests run on separate threads and connections, which an in-memory
+        # SQLite database fails rather than waits on
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            tempfile.gettempdir(), "xeroreports-middleware.sqlite3"
+        )
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        token, session_key, report_id = seed()
+        clients = {
+            "no cookie": {},
+            "session cookie": {settings.SESSION_COOKIE_NAME: session_key},
+        }
+        results = []
+        for profile, lean_paths in (
+            ("full", []),
+            ("lean", settings.LEAN_MIDDLEWARE_PATHS),
+        ):
+            # Middleware is set up once per handler, with the settings of the time
+            with override_settings(LEAN_MIDDLEWARE_PATHS=lean_paths):
+                app = ASGIHandler()
+            for client, cookies in clients.items():
+                result = asyncio.run(
+                    measure(app, token, cookies, report_id, args.requests)
+                )
+                results.append((profile, client, result))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    print(f"{'profile':<8}{'client':<16}{'p50 ms':>8}{'mean ms':>9}{'queries':>9}")
+    for profile, client, result in results:
+        print(
+            f"{profile:<8}{client:<16}{result['p50_ms']:>8.2f}"
+            f"{result['mean_ms']:>9.2f}{result['queries']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
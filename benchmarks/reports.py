@@ -0,0 +1,385 @@
+"""End-to-end and micro benchmarks for generating and reading reports.
+
+Run from the project root with the usual environment (``.env``)::
+
+    python -m benchmarks.reports --output results.json
+    python -m benchmarks.reports --compare results.json
+
+The ASGI app is driven in process against ``apps.xero_api.simulator``, which
+is served over HTTP on a local port, for charts of 100, 1k and 10k accounts.
+For ``generate``, ``list``, ``retrieve`` and ``details`` it measures
+throughput and p50/p95/p99 latency. Microbenchmarks time trial balance
+parsing, details serialization and bulk inserting a report's balances.
+
+Everything runs against a throwaway test database. Each ``generate`` request
+is for a different period, so its trial balance always comes from the
+simulator while accounts are read through ``xero_cache`` as in production.
+``retrieve`` and ``details`` are served from the rendered response cache
+after their first request, as they would be.
+
+``--output`` writes the results as JSON, together with the commit they were
+measured at. ``--compare`` prints how the current run differs from a saved
+one.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timezone
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.reports.cache import rendered_reports  # noqa: E402
+from apps.reports.models import AccountValue, Report  # noqa: E402
+from apps.reports.serializers import ReportDetailsSerializer  # noqa: E402
+from apps.reports.service import XeroReportService  # noqa: E402
+from apps.xero_api.cache import xero_cache  # noqa: E402
+from apps.xero_api.models import XeroTenant, XeroToken  # noqa: E402
+from apps.xero_api.simulator import SimulatorConfig, create_app  # noqa: E402
+from core.asgi import application  # noqa: E402
+
+SIZES = (100, 1_000, 10_000)
+ACCOUNT_TYPE = "EXPENSE"
+TRIAL_BALANCE_DATE = "2024-01-31"
+
+
+class SimulatorServer:
+    """Serve a Xero simulator on a free local port from a background thread."""
+
+    def __init__(self, simulator):
+        self.server = uvicorn.Server(
+            uvicorn.Config(simulator, port=0, log_level="warning", lifespan="off")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def summarise(name: str, size: int, timings: list[float], **extra) -> dict:
+    """Latency percentiles, in milliseconds, for one benchmark."""
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "name": name,
+        "size": size,
+        "runs": len(timings),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p95_ms": round(percentiles[94] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+        **extra,
+    }
+
+
+def periods(count: int) -> list[str]:
+    """Distinct closed months, most recent first, as ``generate`` expects them."""
+    year, month = 2023, 12
+    result = []
+    for _ in range(count):
+        result.append(date(year, month, 1).strftime("%b-%Y"))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return result
+
+
+async def drive(client, requests, concurrency: int) -> tuple[list[float], float, int]:
+    """Send ``requests`` (method, url, body) ``concurrency`` at a time.
+
+    Returns each request's latency, the wall time taken and the number of
+    responses that were not successful.
+    """
+    queue = list(reversed(requests))
+    timings, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, url, body = queue.pop()
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            timings.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, time.perf_counter() - start, errors
+
+
+async def run_endpoints(size: int, tenant_name: str, args) -> list[dict]:
+    user = await User.objects.aget(username="benchmark")
+    token = str(RefreshToken.for_user(user).access_token)
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=application),
+        base_url="http://testserver",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=None,
+    )
+
+    months = periods(args.warmup + args.requests)
+    report_ids = []
+
+    def request(name: str, i: int) -> tuple[str, str, dict | None]:
+        if name == "generate":
+            body = {
+                "tenant_name": tenant_name,
+                "period": months[i],
+                "account_type": ACCOUNT_TYPE,
+            }
+            return "POST", "/reports/generate/", body
+        if name == "list":
+            return "GET", "/reports/", None
+        suffix = "details/" if name == "details" else ""
+        return "GET", f"/reports/{report_ids[i % len(report_ids)]}/{suffix}", None
+
+    results = []
+    async with client:
+        for name in ("generate", "list", "retrieve", "details"):
+            if name == "retrieve":
+                report_ids += [
+                    report_id
+                    async for report_id in Report.objects.filter(user=user).values_list(
+                        "id", flat=True
+                    )
+                ]
+
+            warmup = [request(name, i) for i in range(args.warmup)]
+            await drive(client, warmup, 1)
+            timings, elapsed, errors = await drive(
+                client,
+                [request(name, i) for i in range(args.warmup, len(months))],
+                args.concurrency,
+            )
+            results.append(
+                summarise(
+                    name,
+                    size,
+                    timings,
+                    concurrency=args.concurrency,
+                    throughput_rps=round(len(timings) / elapsed, 2),
+                    errors=errors,
+                )
+            )
+    return results
+
+
+def time_runs(func, repeats: int) -> list[float]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_micro(size: int, simulator, args) -> list[dict]:
+    tenant_id = simulator.tenant_ids[0]
+    trial_balance = simulator.trial_balance(tenant_id, TRIAL_BALANCE_DATE)
+    balances = XeroReportService._parse_trial_balance(trial_balance)
+    names = {
+        account["AccountID"]: account["Name"] for account in simulator.chart(tenant_id)
+    }
+    user = User.objects.get(username="benchmark")
+    report = Report.objects.create(
+        user=user, period=date(2024, 1, 31), account_type="ALL", account_count=size
+    )
+
+    def account_values(for_report):
+        return [
+            AccountValue(
+                report=for_report,
+                xero_account_id=account_id,
+                account_name=names[account_id],
+                account_balance=round(balance, 2),
+            )
+            for account_id, balance in balances.items()
+        ]
+
+    AccountValue.objects.bulk_create(account_values(report))
+    report = Report.objects.prefetch_related("account_balances").get(id=report.id)
+
+    loop = asyncio.new_event_loop()
+
+    async def details():
+        return await ReportDetailsSerializer(report).adata
+
+    def serialize():
+        JSONRenderer().render(loop.run_until_complete(details()))
+
+    def bulk_insert():
+        with transaction.atomic():
+            scratch = Report.objects.create(
+                user=user, period=date(2024, 1, 31), account_type="ALL"
+            )
+            AccountValue.objects.bulk_create(account_values(scratch))
+            transaction.set_rollback(True)
+
+    results = [
+        summarise(
+            "parse_trial_balance",
+            size,
+            time_runs(
+                lambda: XeroReportService._parse_trial_balance(trial_balance),
+                args.repeats,
+            ),
+        ),
+        summarise("serialize_details", size, time_runs(serialize, args.repeats)),
+        summarise("bulk_insert", size, time_runs(bulk_insert, args.repeats)),
+    ]
+    loop.close()
+    return results
+
+
+def run_size(size: int, args) -> list[dict]:
+    simulator = create_app(SimulatorConfig(tenants=1, accounts=size, seed=size))
+    tenant_name = "Simulated Company 1"
+
+    user = User.objects.create_user("benchmark", password="benchmark")
+    XeroToken.objects.create(user=user, token={"access_token": "benchmark"})
+    XeroTenant.objects.create(
+        user=user,
+        tenant_id=simulator.tenant_ids[0],
+        auth_event_id="benchmark",
+        tenant_type="ORGANISATION",
+        tenant_name=tenant_name,
+    )
+    xero_cache.memory.clear()
+    rendered_reports.memory.clear()
+
+    try:
+        with SimulatorServer(simulator) as url:
+            config = {
+                "BASE_URL": url,
+                "IDENTITY_URL": url,
+                "TOKEN_URL": f"{url}/connect/token",
+                "AUTHORIZE_URL": f"{url}/identity/connect/authorize",
+                "CONNECTIONS_URL": f"{url}/connections",
+            }
+            with override_settings(XERO_API_CONFIG=config):
+                results = asyncio.run(run_endpoints(size, tenant_name, args))
+        results += run_micro(size, simulator, args)
+    finally:
+        user.delete()
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list[dict], baseline: dict | None) -> None:
+    previous = {(r["name"], r["size"]): r for r in (baseline or {}).get("results", [])}
+    header = f"{'benchmark':<22}{'size':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}"
+    header += f"{'p99 ms':>10}"
+    if baseline:
+        header += f"{'p50 vs base':>13}{'p95 vs base':>13}"
+    print(header)
+    for result in results:
+        rps = result.get("throughput_rps")
+        line = f"{result['name']:<22}{result['size']:>7}"
+        line += f"{rps:>9.1f}" if rps is not None else f"{'-':>9}"
+        line += f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+        line += f"{result['p99_ms']:>10.2f}"
+        if (before := previous.get((result["name"], result["size"]))) is not None:
+            for key in ("p50_ms", "p95_ms"):
+                change = (result[key] - before[key]) / before[key] * 100
+                line += f"{change:>+12.1f}%"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=SIZES,
+        help="comma-separated chart sizes, in accounts",
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results to compare against")
+    args = parser.parse_args()
+
+    # Per-request logging would dominate the timings
+    logging.disable(logging.INFO)
+    setup_test_environment()
+    if connection.vendor == "sqlite":
+        # Requests run on separate threads and connections, which an in-memory
+        # SQLite database fails rather than waits on
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            tempfile.gettempdir(), "xeroreports-benchmark.sqlite3"
+        )
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = [result for size in args.sizes for result in run_size(size, args)]
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "database": connection.vendor,
+                    "requests": args.requests,
+                    "concurrency": args.concurrency,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Throughput as the number of uvicorn workers grows.
+
+Run from the project root with the usual environment (``.env``)::
+
+    python -m benchmarks.workers --workers 1,2,4
+
+Serves ``core.asgi:application`` the way ``scripts/serve.sh`` does (uvloop,
+lifespan on, no TLS) with each worker count in turn, and loads it with
+``--clients`` processes keeping ``--concurrency`` requests in flight each, for
+``--duration`` seconds. Requests alternate between listing a user's reports
+and reading the details of a report with ``--accounts`` accounts, which are
+served from the rendered response cache after the first request. The load
+generator shares the host with the server, so leave it enough cores:
+throughput stops scaling once workers and clients together use them all.
+
+Everything runs against a throwaway test database.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.reports.models import AccountValue, Report  # noqa: E402
+from benchmarks.reports import summarise  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(accounts: int) -> tuple[str, int]:
+    """Create a user with a few reports; return their token and a report id."""
+    user = User.objects.create_user("benchmark")
+    reports = [
+        Report.objects.create(
+            user=user, period=date(2024, month, 28), account_type="ALL"
+        )
+        for month in range(1, 13)
+    ]
+    AccountValue.objects.bulk_create(
+        AccountValue(
+            report=reports[0],
+            xero_account_id=f"acc-{i}",
+            account_name=f"Account {i}",
+            account_balance=i,
+        )
+        for i in range(accounts)
+    )
+    return str(RefreshToken.for_user(user).access_token), reports[0].id
+
+
+class Server:
+    """``uvicorn`` with ``workers`` processes, on a free port.
+
+    Ready once the port accepts connections. With one worker that is after
+    lifespan start-up; with more, the supervisor listens before workers start
+    and early requests wait for them.
+    """
+
+    def __init__(self, workers: int, **env):
+        self.workers = workers
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = {
+            **os.environ,
+            # Point the workers at the test database
+            "SQL_DATABASE": connection.settings_dict["NAME"],
+            "SERVER_TIMING": "false",
+            "APPS_LOG_LEVEL": "WARNING",
+            **env,
+        }
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "core.asgi:application",
+                "--port",
+                str(self.port),
+                "--workers",
+                str(workers),
+                "--loop",
+                "uvloop",
+                "--lifespan",
+                "on",
+                "--log-level",
+                "warning",
+                "--no-access-log",
+            ],
+            env=env,
+        )
+
+    def __enter__(self) -> str:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self.url
+            except OSError:
+                time.sleep(0.01)
+        self.process.terminate()
+        raise RuntimeError(f"Server with {self.workers} workers did not start")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=60)
+
+
+async def load(url: str, token: str, report_id: int, concurrency: int, duration):
+    paths = ("/reports/", f"/reports/{report_id}/details/")
+    # The server listens on 127.0.0.1, but only "localhost" is an allowed host
+    headers = {"Authorization": f"Bearer {token}", "Host": "localhost"}
+    limits = httpx.Limits(max_connections=concurrency)
+    timings, errors = [], 0
+    stop = time.monotonic() + duration
+
+    async def worker(client, offset):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            response = await client.get(paths[i % len(paths)])
+            timings.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+            i += 1
+
+    async with httpx.AsyncClient(
+        base_url=url, headers=headers, limits=limits, timeout=30
+    ) as client:
+        await asyncio.gather(*(worker(client, i) for i in range(concurrency)))
+    return timings, errors
+
+
+def run_client(args) -> tuple[list[float], int]:
+    return asyncio.run(load(*args))
+
+
+def run_workers(workers: int, token: str, report_id: int, args) -> dict:
+    with Server(workers) as url:
+        # Fill each worker's caches and connection before measuring
+        asyncio.run(load(url, token, report_id, args.concurrency, 2))
+
+        client_args = [(url, token, report_id, args.concurrency, args.duration)]
+        start = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(args.clients) as pool:
+            results = pool.map(run_client, client_args * args.clients)
+        elapsed = time.perf_counter() - start
+
+    timings = [timing for client_timings, _ in results for timing in client_timings]
+    return summarise(
+        "workers",
+        workers,
+        timings,
+        throughput=round(len(timings) / elapsed, 1),
+        errors=sum(errors for _, errors in results),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="comma-separated worker counts",
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--accounts", type=int, default=1_000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    setup_test_environment()
+    if connection.vendor == "sqlite":
+        # The workers are separate processes and need a database file to share
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            tempfile.gettempdir(), "xeroreports-workers.sqlite3"
+        )
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        token, report_id = seed(args.accounts)
+        connection.close()
+        results = [
+            run_workers(workers, token, report_id, args) for workers in args.workers
+        ]
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    baseline = results[0]["throughput"] / results[0]["size"]
+    print(
+        f"{'workers':>7} {'req/s':>9} {'per worker':>11} {'scaling':>8} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    )
+    for result in results:
+        per_worker = result["throughput"] / result["size"]
+        print(
+            f"{result['size']:>7} {result['throughput']:>9.1f} {per_worker:>11.1f} "
+            f"{per_worker / baseline:>7.0%} {result['p50_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,73 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
+import functools
+import logging
 import os
+import time
 
-from django.core.asgi import get_asgi_application
+_started = time.perf_counter()
+
+from django.core.asgi import get_asgi_application  # noqa: E402
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.xero_api.http import close_client, open_client  # noqa: E402
+from core.metrics import worker_startup_duration  # noqa: E402
+from core.warmup import warm_up  # noqa: E402
+
+worker_startup_duration.set(time.perf_counter() - _started, phase="setup")
+
+logger = logging.getLogger(__name__)
+
+
+class LifespanApplication:
+    """Run start-up and shutdown hooks around an ASGI app for each worker.
+
+    Django's ASGI handler doesn't speak the lifespan protocol, so lifespan
+    events are handled here and everything else is passed through. Startup
+    hooks run in order before the worker accepts requests; a failing hook
+    stops the worker from starting. Shutdown hooks run once the server has
+    drained in-flight requests, and all of them run even if one fails.
+    """
+
+    def __init__(self, app, startup=(), shutdown=()):
+        self.app = app
+        self.startup = list(startup)
+        self.shutdown = list(shutdown)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    for hook in self.startup:
+                        await hook()
+                except Exception as e:
+                    logger.exception("Worker start-up failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for hook in self.shutdown:
+                    try:
+                        await hook()
+                    except Exception:
+                        logger.exception("Worker shutdown hook %r failed", hook)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = LifespanApplication(
+    django_application,
+    startup=[open_client, functools.partial(warm_up, django_application)],
+    shutdown=[close_client],
+)
 
 # Add SSL config if using HTTPS
 ssl_keyfile = "/etc/ssl/private/key.pem"
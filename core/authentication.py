@@ -4,9 +4,15 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.settings import api_settings
 
+from core.metrics import span
+
 
 class AsyncJWTAuthentication(JWTAuthentication):
     async def authenticate(self, request):
+        with span("auth"):
+            return await self._authenticate(request)
+
+    async def _authenticate(self, request):
         header = self.get_header(request)
         if header is None:
             return None
@@ -0,0 +1,305 @@
+import asyncio
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCache:
+    """In-process LRU cache bounded by the total size of its values.
+
+    Callers pass each value's size, in whatever unit the cache is budgeted in
+    (bytes for rendered responses, 1 per entry for parsed data). The least
+    recently used entries are evicted once ``max_size`` would be exceeded.
+    Values larger than the whole budget are not stored. Entries may carry an
+    expiry time, on the ``time.monotonic`` clock, after which they miss.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                self.size -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(
+        self, key: str, value: Any, size: int, expires_at: float = float("inf")
+    ) -> None:
+        if size > self.max_size:
+            return
+        with self._lock:
+            if (previous := self._entries.pop(key, None)) is not None:
+                self.size -= previous[1]
+            while self._entries and self.size + size > self.max_size:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (value, size, expires_at)
+            self.size += size
+
+    def delete_many(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                if (entry := self._entries.pop(key, None)) is not None:
+                    self.size -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_size": self.max_size,
+        }
+
+
+class TieredCache:
+    """Namespaced two-tier cache: a process-local LRU in front of a shared
+    Django cache.
+
+    The shared tier is the ``shared_alias`` entry of ``CACHES`` and is skipped
+    when that alias is not configured. Shared hits are copied into the local
+    tier so repeated reads stay in process. Both tiers honour the entry's
+    timeout.
+
+    Deleting only reaches this process's memory tier. Values other processes
+    must stop serving at once go under a versioned key instead: ``aversion``
+    reads a key's current version from the shared tier, at most every
+    ``version_ttl`` seconds, and ``abump_version`` replaces it, so every
+    process moves to a new key.
+
+    ``aget_or_set`` protects loaders from stampedes. Concurrent misses for a
+    key within a process share one load. Across processes, the first loader
+    takes a short lease in the shared tier that others wait on before loading
+    themselves.
+    """
+
+    lock_timeout = 10
+    lock_poll_interval = 0.05
+    version_ttl = 5
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int,
+        shared_alias: str = "",
+        timeout: int = 300,
+        sizeof: Callable[[Any], int] = lambda value: 1,
+    ):
+        self.namespace = namespace
+        self.memory = LRUCache(max_size)
+        self.shared_alias = shared_alias
+        self.timeout = timeout
+        self.sizeof = sizeof
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        # Futures belong to one event loop, so keep in-flight loads per loop
+        self._inflight: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @property
+    def shared(self):
+        if self.shared_alias and self.shared_alias in settings.CACHES:
+            return caches[self.shared_alias]
+        return None
+
+    def shared_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def aget(self, key: str) -> Any | None:
+        if (value := self.memory.get(key)) is not None:
+            return value
+
+        if (shared := self.shared) is None:
+            return None
+        value = await shared.aget(self.shared_key(key))
+        if value is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        # The shared entry's remaining lifetime is unknown; keep it locally for
+        # at most one full timeout.
+        self._set_memory(key, value, self.timeout)
+        return value
+
+    async def aset(self, key: str, value: Any, timeout: int | None = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+        self._set_memory(key, value, timeout)
+        if (shared := self.shared) is not None:
+            await shared.aset(self.shared_key(key), value, timeout)
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        timeout: int | None = None,
+        refresh: bool = False,
+    ) -> Any:
+        """Return the cached value for ``key``, loading and storing it on a miss.
+
+        ``refresh`` skips the lookup and always reloads. ``None`` results are
+        returned but not cached.
+        """
+        if not refresh and (value := await self.aget(key)) is not None:
+            return value
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        if (future := inflight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The load we were waiting on was cancelled; run our own
+                return await self.aget_or_set(key, loader, timeout, refresh)
+
+        future = inflight[key] = loop.create_future()
+        try:
+            value = await self._load(key, loader, timeout, refresh)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved even if no one else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            inflight.pop(key, None)
+
+    async def _load(self, key, loader, timeout, refresh) -> Any:
+        shared = self.shared
+        lock_key = self.shared_key(f"{key}:lock")
+        leased = False
+        if shared is not None and not refresh:
+            leased = await shared.aadd(lock_key, 1, self.lock_timeout)
+            if not leased and (value := await self._await_shared(key)) is not None:
+                self.coalesced += 1
+                return value
+
+        try:
+            self.loads += 1
+            value = await loader()
+            if value is not None:
+                await self.aset(key, value, timeout)
+            return value
+        finally:
+            if leased:
+                await shared.adelete(lock_key)
+
+    async def _await_shared(self, key: str) -> Any | None:
+        """Wait for another process holding the lease to store ``key``.
+
+        Gives up as soon as the lease is released without a value, e.g. when
+        the other process's load failed, rather than waiting out the lease.
+        """
+        lock_key = self.shared_key(f"{key}:lock")
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            # Checked before the value: the holder stores it before releasing
+            released = not await self.shared.ahas_key(lock_key)
+            if (value := await self.shared.aget(self.shared_key(key))) is not None:
+                self._set_memory(key, value, self.timeout)
+                return value
+            if released:
+                break
+        return None
+
+    def _set_memory(self, key: str, value: Any, timeout: int) -> None:
+        expires_at = time.monotonic() + timeout
+        self.memory.set(key, value, self.sizeof(value), expires_at)
+
+    async def aversion(self, key: str) -> str:
+        """The current version of ``key``, shared by every process.
+
+        Versions are held in the memory tier for ``version_ttl`` seconds, so
+        other processes see a bump within that time. Empty without a shared
+        tier, where there are no other processes' memory tiers to invalidate.
+        """
+        if (shared := self.shared) is None:
+            return ""
+        version_key = f"{key}:version"
+        if (version := self.memory.get(version_key)) is not None:
+            return version
+
+        shared_version_key = self.shared_key(version_key)
+        if (version := await shared.aget(shared_version_key)) is None:
+            await shared.aadd(shared_version_key, uuid.uuid4().hex, None)
+            version = await shared.aget(shared_version_key)
+        self._set_memory(version_key, version, self.version_ttl)
+        return version
+
+    async def abump_version(self, key: str) -> None:
+        if (shared := self.shared) is None:
+            return
+        version_key = f"{key}:version"
+        version = uuid.uuid4().hex
+        await shared.aset(self.shared_key(version_key), version, None)
+        self._set_memory(version_key, version, self.version_ttl)
+
+    def delete_many(self, keys) -> None:
+        keys = list(keys)
+        self.memory.delete_many(keys)
+        if (shared := self.shared) is not None:
+            shared.delete_many([self.shared_key(key) for key in keys])
+
+    async def adelete_many(self, keys) -> None:
+        keys = list(keys)
+        self.memory.delete_many(keys)
+        if (shared := self.shared) is not None:
+            await shared.adelete_many([self.shared_key(key) for key in keys])
+
+    def stats(self) -> dict[str, Any]:
+        shared_lookups = self.shared_hits + self.shared_misses
+        return {
+            "memory": self.memory.stats(),
+            "shared": {
+                "alias": self.shared_alias if self.shared is not None else None,
+                "hits": self.shared_hits,
+                "misses": self.shared_misses,
+                "hit_ratio": (
+                    round(self.shared_hits / shared_lookups, 4)
+                    if shared_lookups
+                    else None
+                ),
+            },
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+        }
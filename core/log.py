@@ -0,0 +1,84 @@
+"""Logging handlers and formatters used by ``LOGGING``.
+
+``QueueHandler`` keeps writes to stdout off the event loop: callers only put
+records on a queue, and a background thread formats and writes them.
+``JSONFormatter`` renders one JSON object per line for log collectors.
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+    | {"message", "asctime", "taskName"}
+)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Write records to ``stream`` from a background thread.
+
+    The message is merged with its arguments in the calling thread, so it
+    reflects them as they were when logged; the formatter then runs in the
+    listener thread. The listener is restarted in forked workers, and
+    closing the handler (as ``logging.shutdown`` does at exit) drains it.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+        os.register_at_fork(after_in_child=self._restart_listener)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Other handlers may still see the original record
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self):
+        # Called by logging.shutdown() at exit; drains the queue first
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+    def _restart_listener(self):
+        # Threads don't survive fork(); the child needs its own listener
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON, including any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.pathname}:{record.lineno}",
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
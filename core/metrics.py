@@ -0,0 +1,401 @@
+"""In-process metrics, exposed in the Prometheus text format at ``/metrics``.
+
+Metrics are plain counters, gauges and histograms kept in this process and
+updated under a lock, cheap enough to leave on under load. Each metric caps
+its number of label combinations at ``max_series``; anything beyond that is
+counted under ``"other"`` so a bad label can't grow memory without bound.
+
+Values are per process. With several workers each scrape sees the worker
+that served it, so scrape workers individually or aggregate with ``sum``.
+"""
+
+import bisect
+import collections
+import threading
+import time
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from rest_framework.renderers import JSONRenderer
+
+OVERFLOW = "other"
+
+# Latency buckets, in seconds, from a cached read to a slow Xero report
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(v))}"' for name, v in labels.items())
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        max_series: int = 200,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        """Label values in order; call with the lock held."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        if key not in self._series and len(self._series) >= self.max_series:
+            key = (OVERFLOW,) * len(self.labelnames)
+        return key
+
+    def samples(self) -> Iterable[tuple[str, dict[str, str], float]]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield f"{self.name}_total", dict(zip(self.labelnames, key)), value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            if (series := self._series.get(key)) is None:
+                # One count per bucket, then +Inf, then the sum
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        for key, values in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), values):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": bound}, cumulative
+            yield f"{self.name}_sum", labels, values[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self.collectors: list[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        """Add metrics built at scrape time from state kept elsewhere."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        families = list(self.metrics.values())
+        for collector in self.collectors:
+            families.extend(collector())
+
+        lines = []
+        for metric in families:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if "le" in labels:
+                    labels = {**labels, "le": _format_value(float(labels["le"]))}
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled"
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by view, method and status class",
+    ("view", "method", "status"),
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Time spent in each database query, by view",
+    ("view",),
+    buckets=QUERY_BUCKETS,
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request",
+    "Database queries made while handling a request, by view",
+    ("view",),
+    buckets=COUNT_BUCKETS,
+)
+serialization_duration = registry.histogram(
+    "serialization_duration_seconds",
+    "Time to render response data as JSON, by view",
+    ("view",),
+)
+db_query_budget_exceeded = registry.counter(
+    "db_query_budget_exceeded",
+    "Requests that ran more database queries than their view's budget, by view",
+    ("view",),
+)
+db_repeated_queries = registry.counter(
+    "db_repeated_queries",
+    "Requests that ran the same SELECT repeatedly, a likely N+1, by view",
+    ("view",),
+)
+worker_startup_duration = registry.gauge(
+    "worker_startup_seconds",
+    "Seconds this worker spent in each start-up phase",
+    ("phase",),
+)
+xero_request_duration = registry.histogram(
+    "xero_request_duration_seconds",
+    "Time for each request to Xero, by endpoint and response status",
+    ("endpoint", "status"),
+)
+xero_token_refreshes = registry.counter(
+    "xero_token_refreshes",
+    "Xero access token refreshes, by outcome",
+    ("outcome",),
+)
+xero_token_expired_retries = registry.counter(
+    "xero_token_expired_retries",
+    "Report generations retried after Xero rejected an expired access token",
+)
+
+
+_caches: dict[str, Any] = {}
+
+
+def track_cache(name: str, cache) -> None:
+    """Export the hit, miss and load counts of a ``TieredCache``."""
+    _caches[name] = cache
+
+
+def _collect_caches() -> Iterable[Metric]:
+    lookups = Counter(
+        "cache_lookups",
+        "Cache lookups, by cache, tier and result",
+        ("cache", "tier", "result"),
+    )
+    loads = Counter(
+        "cache_loads", "Values loaded on a cache miss, by cache", ("cache",)
+    )
+    for name, cache in _caches.items():
+        stats = cache.stats()
+        for tier in ("memory", "shared"):
+            lookups.inc(stats[tier]["hits"], cache=name, tier=tier, result="hit")
+            lookups.inc(stats[tier]["misses"], cache=name, tier=tier, result="miss")
+        loads.inc(stats["loads"], cache=name)
+    return lookups, loads
+
+
+registry.register_collector(_collect_caches)
+
+
+@dataclass
+class RequestMetrics:
+    """What the current request has spent so far, for per-view metrics.
+
+    ``spans`` holds the seconds spent in each named stage of the request, as
+    reported in its ``Server-Timing`` header. Time in a stage entered several
+    times, or concurrently, is summed. ``selects`` counts how often each
+    SELECT statement ran, to spot queries repeated once per row.
+    """
+
+    view: str = "unmatched"
+    queries: int = 0
+    spans: dict[str, float] = field(default_factory=dict)
+    selects: collections.Counter = field(default_factory=collections.Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_span(self, name: str, seconds: float) -> None:
+        # Spans are added from the event loop and from sync_to_async threads
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0) + seconds
+
+    def add_query(self, sql: str, seconds: float) -> None:
+        with self._lock:
+            self.queries += 1
+            self.spans["db"] = self.spans.get("db", 0) + seconds
+            # Batched inserts and updates legitimately repeat; reads shouldn't
+            if sql[:6].upper() == "SELECT":
+                self.selects[sql] += 1
+
+    def repeated_selects(self, threshold: int) -> list[tuple[str, int]]:
+        """SELECT statements run at least ``threshold`` times, most first."""
+        with self._lock:
+            return [
+                (sql, count)
+                for sql, count in self.selects.most_common()
+                if count >= threshold
+            ]
+
+
+current_request: ContextVar[RequestMetrics | None] = ContextVar(
+    "current_request_metrics", default=None
+)
+
+
+def current_view() -> str:
+    request = current_request.get()
+    return request.view if request is not None else "none"
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage of the current request for its ``Server-Timing`` header.
+
+    Does nothing outside a request.
+    """
+    if (request := current_request.get()) is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request.add_span(name, time.perf_counter() - start)
+
+
+@contextmanager
+def track_queries(view: str = "none"):
+    """Count the database queries run inside the block.
+
+    Queries run in ``sync_to_async`` threads are counted too, unlike with
+    Django's ``CaptureQueriesContext``. Requests are tracked by
+    ``MetricsMiddleware``; this is for tests and scripts calling views directly.
+    """
+    metrics = RequestMetrics(view=view)
+    token = current_request.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current_request.reset(token)
+
+
+def observe_query(execute, sql, params, many, context):
+    """Database execute wrapper timing every query against the current view."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        request = current_request.get()
+        if request is not None:
+            request.add_query(sql, elapsed)
+        db_query_duration.observe(
+            elapsed, view=request.view if request is not None else "none"
+        )
+
+
+def install_query_observer(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver adding ``observe_query`` to connections."""
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+class InstrumentedJSONRenderer(JSONRenderer):
+    """JSON renderer recording how long rendering takes for each view."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            elapsed = time.perf_counter() - start
+            if (request := current_request.get()) is not None:
+                request.add_span("render", elapsed)
+            serialization_duration.observe(elapsed, view=current_view())
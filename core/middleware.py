@@ -0,0 +1,310 @@
+import logging
+import random
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import patch_vary_headers
+
+from core.compression import COMPRESSORS
+from core.metrics import (
+    RequestMetrics,
+    current_request,
+    db_queries_per_request,
+    db_query_budget_exceeded,
+    db_repeated_queries,
+    http_request_duration,
+    http_requests_in_flight,
+)
+
+logger = logging.getLogger(__name__)
+
+_accept_encoding_re = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?")
+
+# HTML pages (the browsable API) carry CSRF tokens next to user-controlled
+# content, so they are left uncompressed rather than risk BREACH-style attacks.
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/vnd.apache.arrow.stream",
+    "text/csv",
+    "text/plain",
+)
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Content codings the client accepts, ignoring those with ``q=0``."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        if not (match := _accept_encoding_re.match(part)):
+            continue
+        coding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress responses with the best coding the client accepts.
+
+    Codings are tried in ``COMPRESSION["ENCODINGS"]`` order; brotli is only
+    offered when the ``brotli`` package is installed. Regular responses
+    smaller than ``COMPRESSION["MIN_SIZE"]`` bytes are sent as-is. Streaming
+    responses are compressed chunk by chunk, flushing after each chunk so
+    clients still receive data as it is produced.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = settings.COMPRESSION
+        self.min_size = config["MIN_SIZE"]
+        self.levels = config["LEVELS"]
+        self.encodings = [
+            encoding for encoding in config["ENCODINGS"] if encoding in COMPRESSORS
+        ]
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not self._is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        encoding = next((e for e in self.encodings if e in accepted), None)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async_stream(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = self._compress_stream(
+                    response.streaming_content, encoding
+                )
+            del response["Content-Length"]
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = self.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The body is no longer byte-for-byte what a strong ETag promises
+        if (etag := response.get("ETag", "")).startswith('"'):
+            response.headers["ETag"] = f"W/{etag}"
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        compressor = self._compressor(encoding)
+        return compressor.compress(data) + compressor.finish()
+
+    def _compressor(self, encoding: str):
+        return COMPRESSORS[encoding](self.levels[encoding])
+
+    def _is_compressible(self, response) -> bool:
+        if response.has_header("Content-Encoding"):
+            return False
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        if "no-transform" in response.get("Cache-Control", ""):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress_stream(self, chunks, encoding: str):
+        compressor = self._compressor(encoding)
+        for chunk in chunks:
+            if data := compressor.compress(chunk) + compressor.flush():
+                yield data
+        yield compressor.finish()
+
+    async def _compress_async_stream(self, chunks, encoding: str):
+        compressor = self._compressor(encoding)
+        async for chunk in chunks:
+            if data := compressor.compress(chunk) + compressor.flush():
+                yield data
+        yield compressor.finish()
+
+
+class BrowserOnlyMixin:
+    """Skip a middleware for requests under ``LEAN_MIDDLEWARE_PATHS``.
+
+    The API under those paths authenticates with JWTs and never uses a
+    session, yet the session, CSRF, auth and messages middleware would still
+    load the session (and with ``SESSION_SAVE_EVERY_REQUEST`` write it back)
+    for any client sending a session cookie. Mixed into each of them, API
+    requests go straight past while ``/admin/`` keeps them all.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.lean_paths = tuple(settings.LEAN_MIDDLEWARE_PATHS)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def is_lean(self, request) -> bool:
+        return request.path_info.startswith(self.lean_paths)
+
+
+class BrowserSessionMiddleware(BrowserOnlyMixin, SessionMiddleware):
+    pass
+
+
+class BrowserCsrfViewMiddleware(BrowserOnlyMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if self.is_lean(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class BrowserAuthenticationMiddleware(BrowserOnlyMixin, AuthenticationMiddleware):
+    pass
+
+
+class BrowserMessageMiddleware(BrowserOnlyMixin, MessageMiddleware):
+    pass
+
+
+class MetricsMiddleware:
+    """Record request latency, requests in flight and queries per request.
+
+    Goes first in ``MIDDLEWARE`` so the timings cover every other middleware.
+    The view being served is tracked for the rest of the request, so database
+    queries and rendering can be attributed to it. Streaming responses are
+    timed until their first byte is ready, not until they finish.
+
+    Time spent in each ``core.metrics.span`` is sent back in a
+    ``Server-Timing`` header, unless ``SERVER_TIMING["ENABLED"]`` is off, and
+    logged for a ``SERVER_TIMING["LOG_SAMPLE_RATE"]`` fraction of requests.
+
+    A warning is logged when a request runs more queries than its view's
+    ``QUERY_BUDGETS`` allow, or runs the same SELECT ``QUERY_BUDGETS["REPEATED"]``
+    times or more, which usually means a query per row (N+1).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.SERVER_TIMING["ENABLED"]
+        self.log_sample_rate = settings.SERVER_TIMING["LOG_SAMPLE_RATE"]
+        self.query_budgets = settings.QUERY_BUDGETS
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self._start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, metrics, token, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self._start()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, metrics, token, start)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (metrics := current_request.get()) is not None:
+            metrics.view = request.resolver_match.view_name
+        return None
+
+    @staticmethod
+    def _start():
+        http_requests_in_flight.inc()
+        metrics = RequestMetrics()
+        return metrics, current_request.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, metrics, token, start):
+        elapsed = time.perf_counter() - start
+        current_request.reset(token)
+        http_requests_in_flight.dec()
+        status = f"{response.status_code // 100}xx" if response is not None else "5xx"
+        http_request_duration.observe(
+            elapsed, view=metrics.view, method=request.method, status=status
+        )
+        db_queries_per_request.observe(metrics.queries, view=metrics.view)
+        self._check_queries(request, metrics)
+
+        spans = {**metrics.spans, "total": elapsed}
+        if response is not None and self.server_timing:
+            response.headers["Server-Timing"] = ", ".join(
+                f"{name};dur={seconds * 1000:.1f}" for name, seconds in spans.items()
+            )
+        if self.log_sample_rate and random.random() < self.log_sample_rate:
+            # Also passed as extra fields, which JSONFormatter emits as such
+            timings = {
+                "view": metrics.view,
+                "method": request.method,
+                "status": response.status_code if response is not None else None,
+                "queries": metrics.queries,
+                "spans_ms": {name: round(s * 1000, 1) for name, s in spans.items()},
+            }
+            logger.info(
+                "timing view=%s method=%s status=%s queries=%d %s",
+                metrics.view,
+                request.method,
+                timings["status"] or "-",
+                metrics.queries,
+                " ".join(f"{name}={ms}ms" for name, ms in timings["spans_ms"].items()),
+                extra=timings,
+            )
+
+    def _check_queries(self, request, metrics):
+        budgets = self.query_budgets
+        budget = budgets["VIEWS"].get(metrics.view, budgets["DEFAULT"])
+        if metrics.queries > budget:
+            db_query_budget_exceeded.inc(view=metrics.view)
+            logger.warning(
+                "Query budget exceeded: view=%s method=%s queries=%d budget=%d",
+                metrics.view,
+                request.method,
+                metrics.queries,
+                budget,
+            )
+        if repeated := metrics.repeated_selects(budgets["REPEATED"]):
+            db_repeated_queries.inc(view=metrics.view)
+            for sql, count in repeated:
+                logger.warning(
+                    "Possible N+1 queries: view=%s ran %d times: %s",
+                    metrics.view,
+                    count,
+                    sql,
+                )
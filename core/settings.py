@@ -34,16 +34,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.BrowserSessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.BrowserCsrfViewMiddleware",
+    "core.middleware.BrowserAuthenticationMiddleware",
+    "core.middleware.BrowserMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Paths served without the session, CSRF, auth and messages middleware. Their
+# views authenticate with JWTs and never touch a session; /admin/ keeps them.
+LEAN_MIDDLEWARE_PATHS = env.list(
+    "LEAN_MIDDLEWARE_PATHS", default=["/reports/", "/xero/", "/api/token/"]
+)
+
 ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
@@ -102,6 +110,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.metrics.InstrumentedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -130,6 +142,11 @@ SESSION_COOKIE_SAMESITE = "Lax"
 SESSION_COOKIE_NAME = "xero_sessionid"
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Records are written to stdout from a background thread (core.log), so
+# logging never blocks the event loop. LOG_FORMAT is "json" for one JSON object
+# per line or "verbose" for plain text.
+LOG_FORMAT = env("LOG_FORMAT", default="verbose" if DEBUG else "json")
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -142,11 +159,15 @@ LOGGING = {
             "format": "{levelname} {message}",
             "style": "{",
         },
+        "json": {
+            "()": "core.log.JSONFormatter",
+        },
     },
     "handlers": {
         "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "verbose",
+            "()": "core.log.QueueHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": LOG_FORMAT,
         },
     },
     "loggers": {
@@ -156,7 +177,7 @@ LOGGING = {
         },
         "apps": {
             "handlers": ["console"],
-            "level": "DEBUG",
+            "level": env("APPS_LOG_LEVEL", default="DEBUG" if DEBUG else "INFO"),
             "propagate": False,
         },
     },
@@ -176,3 +197,163 @@ XERO_API_CONFIG = {
     "AUTHORIZE_URL": "https://login.xero.com/identity/connect/authorize",
     "CONNECTIONS_URL": "https://api.xero.com/connections",
 }
+
+# Point every Xero URL at a local simulator (apps.xero_api.simulator) instead,
+# for load and latency testing without a Xero account
+if XERO_SIMULATOR_URL := env("XERO_SIMULATOR_URL", default="").rstrip("/"):
+    XERO_API_CONFIG = {
+        "BASE_URL": XERO_SIMULATOR_URL,
+        "IDENTITY_URL": XERO_SIMULATOR_URL,
+        "TOKEN_URL": f"{XERO_SIMULATOR_URL}/connect/token",
+        "AUTHORIZE_URL": f"{XERO_SIMULATOR_URL}/identity/connect/authorize",
+        "CONNECTIONS_URL": f"{XERO_SIMULATOR_URL}/connections",
+    }
+
+# Maximum concurrent Xero API requests per tenant, per worker process
+XERO_TENANT_CONCURRENCY = env.int("XERO_TENANT_CONCURRENCY", default=5)
+
+# Seconds clients may reuse a report for a closed period before revalidating
+REPORT_CLOSED_PERIOD_MAX_AGE = env.int("REPORT_CLOSED_PERIOD_MAX_AGE", default=86400)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+# Cache shared between worker processes that also survives restarts. Defaults
+# to a local directory; the database backend works too (run
+# ``createcachetable``). Set SHARED_CACHE_BACKEND to an empty value to disable.
+if SHARED_CACHE_BACKEND := env(
+    "SHARED_CACHE_BACKEND",
+    default="django.core.cache.backends.filebased.FileBasedCache",
+):
+    CACHES["shared"] = {
+        "BACKEND": SHARED_CACHE_BACKEND,
+        "LOCATION": env("SHARED_CACHE_LOCATION", default="/var/tmp/xeroreports-cache"),
+    }
+
+# Rendered report bodies: bytes held in each process, and how long entries
+# live in the shared cache when one is configured
+REPORT_RESPONSE_CACHE = {
+    "MAX_BYTES": env.int("REPORT_RESPONSE_CACHE_MAX_BYTES", default=16 * 1024 * 1024),
+    "SHARED_ALIAS": "shared",
+    "TIMEOUT": env.int("REPORT_RESPONSE_CACHE_TIMEOUT", default=3600),
+}
+
+# Response compression: codings in order of preference, per-coding levels
+# (gzip 1-9, brotli quality 0-11) and the smallest body worth compressing
+COMPRESSION = {
+    "ENCODINGS": ["br", "gzip"],
+    "LEVELS": {
+        "gzip": env.int("COMPRESSION_GZIP_LEVEL", default=6),
+        "br": env.int("COMPRESSION_BROTLI_QUALITY", default=4),
+    },
+    "MIN_SIZE": env.int("COMPRESSION_MIN_SIZE", default=1024),
+}
+
+# Xero data cached in front of the API: entries held in each process, and
+# seconds each kind of data is reused for. Trial balances of closed periods
+# rarely change, the current period's are only reused briefly.
+XERO_CACHE = {
+    "MAX_ENTRIES": env.int("XERO_CACHE_MAX_ENTRIES", default=2048),
+    "TTL": {
+        "default": 300,
+        "tenants": env.int("XERO_CACHE_TENANTS_TTL", default=3600),
+        "accounts": env.int("XERO_CACHE_ACCOUNTS_TTL", default=900),
+        "trial_balance": env.int("XERO_CACHE_TRIAL_BALANCE_TTL", default=60),
+        "closed_trial_balance": env.int(
+            "XERO_CACHE_CLOSED_TRIAL_BALANCE_TTL", default=86400
+        ),
+    },
+}
+
+# Retries of idempotent Xero GETs: attempts per request, backoff bounds in
+# seconds, and the overall seconds one report's requests may take
+XERO_RETRY = {
+    "MAX_ATTEMPTS": env.int("XERO_RETRY_MAX_ATTEMPTS", default=4),
+    "BASE_DELAY": env.float("XERO_RETRY_BASE_DELAY", default=0.5),
+    "MAX_DELAY": env.float("XERO_RETRY_MAX_DELAY", default=8.0),
+    "DEADLINE": env.float("XERO_REPORT_DEADLINE", default=30.0),
+}
+
+# Per-endpoint httpx timeouts for Xero, in seconds. Endpoints override phases of
+# "default"; the trial balance is computed on request and can be slow for large
+# ledgers. Every timeout is also clipped to the remaining generation deadline.
+XERO_TIMEOUTS = {
+    "default": {
+        "connect": env.float("XERO_CONNECT_TIMEOUT", default=5.0),
+        "read": env.float("XERO_READ_TIMEOUT", default=20.0),
+        "write": 5.0,
+        "pool": env.float("XERO_POOL_TIMEOUT", default=5.0),
+    },
+    "trial_balance": {
+        "read": env.float("XERO_TRIAL_BALANCE_READ_TIMEOUT", default=45.0),
+    },
+}
+
+# Connections each worker keeps to Xero while serving (see core.asgi): the most
+# open at once, how many idle ones are kept, and seconds an idle one is kept for
+XERO_HTTP_POOL = {
+    "MAX_CONNECTIONS": env.int("XERO_POOL_MAX_CONNECTIONS", default=100),
+    "MAX_KEEPALIVE_CONNECTIONS": env.int("XERO_POOL_MAX_KEEPALIVE", default=20),
+    "KEEPALIVE_EXPIRY": env.float("XERO_POOL_KEEPALIVE_EXPIRY", default=30.0),
+}
+
+# End-to-end seconds for generating, refreshing or snapshotting from Xero,
+# token refresh and retries included
+XERO_GENERATE_TIMEOUT = env.float("XERO_GENERATE_TIMEOUT", default=60.0)
+
+# Circuit breakers around Xero endpoints, per tenant: failures within WINDOW
+# seconds that open a circuit, seconds it stays open before a probe is let
+# through, and how long a probe may take. State is kept in CACHE_ALIAS.
+XERO_CIRCUIT_BREAKER = {
+    "FAILURE_THRESHOLD": env.int("XERO_CIRCUIT_FAILURE_THRESHOLD", default=5),
+    "WINDOW": env.int("XERO_CIRCUIT_WINDOW", default=60),
+    "RESET_TIMEOUT": env.int("XERO_CIRCUIT_RESET_TIMEOUT", default=30),
+    "PROBE_TIMEOUT": 60,
+    "CACHE_ALIAS": "shared",
+}
+
+# /metrics serves Prometheus metrics to clients sending this token as a bearer
+# token. Without one it is only served when DEBUG is on.
+METRICS = {
+    "TOKEN": env("METRICS_TOKEN", default=""),
+}
+
+# Server-Timing header with each request's breakdown (auth, db, Xero calls,
+# ...), and the fraction of requests whose breakdown is also logged
+SERVER_TIMING = {
+    "ENABLED": env.bool("SERVER_TIMING", default=True),
+    "LOG_SAMPLE_RATE": env.float("SERVER_TIMING_LOG_SAMPLE_RATE", default=0.0),
+}
+
+# Work each worker does at start-up, before accepting requests (core.warmup):
+# importing views, building serializers and connecting to the database, then
+# optionally connecting to Xero and sending one GET for REQUEST_PATH (e.g.
+# "/reports/") through the app. An unused Xero connection is only kept for
+# XERO_HTTP_POOL["KEEPALIVE_EXPIRY"] seconds.
+WARMUP = {
+    "ENABLED": env.bool("WARMUP", default=True),
+    "XERO_PRECONNECT": env.bool("WARMUP_XERO_PRECONNECT", default=False),
+    "REQUEST_PATH": env("WARMUP_REQUEST_PATH", default=""),
+}
+
+# Database queries a request may run before a warning is logged: DEFAULT for
+# any view not listed in VIEWS. A SELECT run REPEATED times in one request is
+# logged as a likely N+1 query. Read budgets count the JWT user lookup; the
+# per-view counts themselves are pinned in core/tests/test_query_budgets.py.
+QUERY_BUDGETS = {
+    "DEFAULT": env.int("QUERY_BUDGET", default=10),
+    "REPEATED": env.int("QUERY_BUDGET_REPEATED", default=5),
+    "VIEWS": {
+        "reports:report-list": 2,
+        "reports:report-detail": 2,
+        "reports:report-details": 3,
+        "reports:report-bulk-details": 3,
+        "reports:report-export": 3,
+        "reports:report-export-list": 2,
+        "reports:report-compare": 3,
+        "reports:report-timeseries": 2,
+    },
+}
@@ -1,10 +1,15 @@
 import logging
+from contextlib import contextmanager
 
 import pytest
 from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate
+from django.core.cache import caches
 from django.test.client import RequestFactory
 
+from apps.reports.cache import rendered_reports
+from apps.xero_api.cache import xero_cache
+from core.metrics import track_queries
 from core.tests.factories import UserFactory
 
 
@@ -18,6 +23,45 @@ def setup_logging(caplog):
     return caplog
 
 
+@pytest.fixture(autouse=True)
+def isolated_caches(settings):
+    """Run each test against empty, in-memory cache tiers."""
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "shared": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "shared",
+        },
+    }
+    tiered_caches = (rendered_reports, xero_cache)
+    for cache in tiered_caches:
+        cache.memory.clear()
+    yield
+    for cache in tiered_caches:
+        cache.memory.clear()
+    caches["shared"].clear()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Fail if the block runs more than ``budget`` database queries.
+
+    Counts queries made in ``sync_to_async`` threads too, which
+    ``django_assert_max_num_queries`` misses for async views.
+    """
+
+    @contextmanager
+    def check(budget: int):
+        with track_queries() as metrics:
+            yield metrics
+        assert metrics.queries <= budget, (
+            f"{metrics.queries} queries run, budget is {budget}: "
+            f"{dict(metrics.selects)}"
+        )
+
+    return check
+
+
 @pytest.fixture
 @pytest.mark.asyncio
 async def authenticated_user():
@@ -0,0 +1,49 @@
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+
+from apps.reports.models import Report
+from core.tests.factories import AccountValueFactory, ReportFactory
+
+pytestmark = [pytest.mark.django_db, pytest.mark.asyncio]
+
+
+class TestBackfillReportAggregates:
+    async def test_backfills_reports_without_aggregates(self):
+        report = await ReportFactory.acreate()
+        for balance in ("100.00", "-250.50", "20.25"):
+            await AccountValueFactory.acreate(
+                report=report, account_balance=Decimal(balance)
+            )
+        empty_report = await ReportFactory.acreate()
+
+        out = StringIO()
+        await sync_to_async(call_command)("backfill_report_aggregates", stdout=out)
+
+        await report.arefresh_from_db()
+        assert report.account_count == 3
+        assert report.total_balance == Decimal("-130.25")
+        assert report.debit_total == Decimal("120.25")
+        assert report.credit_total == Decimal("250.50")
+        assert report.max_abs_balance == Decimal("250.50")
+
+        await empty_report.arefresh_from_db()
+        assert empty_report.account_count == 0
+        assert "2 reports" in out.getvalue()
+
+    async def test_skips_reports_with_aggregates_unless_all(self):
+        report = await ReportFactory.acreate(account_count=5)
+        await AccountValueFactory.acreate(report=report)
+
+        await sync_to_async(call_command)(
+            "backfill_report_aggregates", stdout=StringIO()
+        )
+        assert (await Report.objects.aget(id=report.id)).account_count == 5
+
+        await sync_to_async(call_command)(
+            "backfill_report_aggregates", "--all", stdout=StringIO()
+        )
+        assert (await Report.objects.aget(id=report.id)).account_count == 1
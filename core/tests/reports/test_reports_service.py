@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from datetime import date
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -5,7 +6,15 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import httpx
 import pytest
 
-from apps.reports.service import XeroReportService
+from apps.reports.service import (
+    XeroReportService,
+    XeroTimeoutError,
+    XeroUnavailableError,
+    gather_or_cancel,
+    tenant_limiter,
+)
+from apps.xero_api.cache import xero_cache
+from apps.xero_api.models import XeroSnapshot
 from core.tests.factories import XeroTokenFactory
 
 logger = logging.getLogger(__name__)
@@ -122,6 +131,56 @@ class TestXeroReportService:
         assert "c563b607-fb0e-4d06-9ddb-76fdeef20ae3" in result
         assert result["c563b607-fb0e-4d06-9ddb-76fdeef20ae3"] == -10053.96
 
+    async def test_parse_trial_balance_reads_every_row_of_a_section(self):
+        def account_row(account_id, debit, credit):
+            attributes = [{"Value": account_id, "Id": "account"}]
+            return {
+                "RowType": "Row",
+                "Cells": [
+                    {"Value": f"Account {account_id}", "Attributes": attributes},
+                    {"Value": "", "Attributes": attributes},
+                    {"Value": "", "Attributes": attributes},
+                    {"Value": debit, "Attributes": attributes},
+                    {"Value": credit, "Attributes": attributes},
+                ],
+            }
+
+        data = {
+            "Reports": [
+                {
+                    "Rows": [
+                        {"RowType": "Header"},
+                        {
+                            "RowType": "Section",
+                            "Title": "Revenue",
+                            "Rows": [
+                                account_row("acc-1", "", "100.00"),
+                                account_row("acc-2", "25.50", ""),
+                                account_row("acc-3", "10.00", "4.00"),
+                                {
+                                    "RowType": "SummaryRow",
+                                    "Cells": [
+                                        {"Value": "Total"},
+                                        {"Value": ""},
+                                        {"Value": ""},
+                                        {"Value": "35.50"},
+                                        {"Value": "104.00"},
+                                    ],
+                                },
+                            ],
+                        },
+                        {"RowType": "Section", "Title": "Expenses", "Rows": []},
+                    ]
+                }
+            ]
+        }
+
+        assert XeroReportService._parse_trial_balance(data) == {
+            "acc-1": -100.0,
+            "acc-2": 25.5,
+            "acc-3": 6.0,
+        }
+
     async def test_get_accounts(self, service, mock_accounts_response):
         service = await service
 
@@ -182,6 +241,49 @@ class TestXeroReportService:
                     == -10053.96
                 )
 
+    async def test_generate_report_reuses_cached_xero_data(
+        self, service, mock_accounts_response, mock_trial_balance_response
+    ):
+        service = await service
+        service.xero_service = MagicMock()
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "test-token"}
+        )
+
+        def respond(url, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = (
+                mock_accounts_response
+                if "/Accounts" in url
+                else mock_trial_balance_response
+            )
+            return response
+
+        before = xero_cache.stats()
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_client_instance = AsyncMock()
+            mock_client_instance.get.side_effect = respond
+            mock_client.return_value.__aenter__.return_value = mock_client_instance
+
+            first = await service.generate_report(
+                "tenant-123", date(2023, 1, 31), "ASSET"
+            )
+            second = await service.generate_report(
+                "tenant-123", date(2023, 1, 31), "ASSET"
+            )
+            assert first == second
+            assert mock_client_instance.get.await_count == 2
+
+            await service.generate_report(
+                "tenant-123", date(2023, 1, 31), "ASSET", fresh=True
+            )
+            assert mock_client_instance.get.await_count == 4
+
+        stats = xero_cache.stats()
+        assert stats["memory"]["hits"] - before["memory"]["hits"] == 2
+        assert stats["loads"] - before["loads"] == 4
+
     async def test_generate_report_token_expired(
         self,
         service,
@@ -212,3 +314,241 @@ class TestXeroReportService:
                     )
 
                 mock_auth_instance.refresh_token.assert_called_once_with(service.user)
+
+    async def test_generate_report_retries_then_reports_unavailable(self, service):
+        service = await service
+        service.xero_service = MagicMock()
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "test-token"}
+        )
+        unavailable = MagicMock()
+        unavailable.status_code = 503
+        unavailable.headers = {}
+        unavailable.raise_for_status.side_effect = httpx.HTTPError("Unavailable")
+
+        with (
+            patch("httpx.AsyncClient") as mock_client,
+            patch("apps.xero_api.http.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            mock_client_instance = AsyncMock()
+            mock_client_instance.get.return_value = unavailable
+            mock_client.return_value.__aenter__.return_value = mock_client_instance
+
+            with pytest.raises(XeroUnavailableError):
+                await service.generate_report("tenant-123", date(2023, 1, 31), "ASSET")
+
+        # Both requests are attempted XERO_RETRY["MAX_ATTEMPTS"] times
+        assert mock_client_instance.get.await_count == 8
+
+    async def test_capture_snapshot_and_generate_offline(
+        self, service, mock_trial_balance_response
+    ):
+        service = await service
+        accounts_response = {
+            "Accounts": [
+                {
+                    "AccountID": "c563b607-fb0e-4d06-9ddb-76fdeef20ae3",
+                    "Name": "Sales",
+                    "Type": "REVENUE",
+                },
+                {"AccountID": "bank-account", "Name": "Bank", "Type": "BANK"},
+            ]
+        }
+
+        service.xero_service = MagicMock()
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "test-token"}
+        )
+
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_client_instance = AsyncMock()
+
+            acc_response = MagicMock()
+            acc_response.status_code = 200
+            acc_response.json.return_value = accounts_response
+
+            tb_response = MagicMock()
+            tb_response.status_code = 200
+            tb_response.json.return_value = mock_trial_balance_response
+
+            mock_client_instance.get.side_effect = [acc_response, tb_response]
+            mock_client.return_value.__aenter__.return_value = mock_client_instance
+
+            await service.capture_snapshot("tenant-123", date(2023, 1, 31))
+
+            # The full chart of accounts is fetched, unfiltered
+            accounts_url = mock_client_instance.get.call_args_list[0].args[0]
+            assert accounts_url.endswith("/Accounts")
+
+        snapshot = await XeroSnapshot.objects.aget(
+            tenant_id="tenant-123", date=date(2023, 1, 31)
+        )
+        assert snapshot.get_accounts() == accounts_response
+        assert len(snapshot.trial_balance) < len(str(mock_trial_balance_response))
+
+        with patch("httpx.AsyncClient", side_effect=AssertionError("network used")):
+            revenue = await service.generate_report(
+                "tenant-123", date(2023, 1, 31), "REVENUE"
+            )
+            bank = await service.generate_report(
+                "tenant-123", date(2023, 1, 31), "BANK"
+            )
+
+        assert revenue == {
+            "c563b607-fb0e-4d06-9ddb-76fdeef20ae3": {
+                "name": "Sales",
+                "code": "",
+                "balance": -10053.96,
+            }
+        }
+        assert bank == {"bank-account": {"name": "Bank", "code": "", "balance": 0}}
+
+    async def test_generate_fresh_report_recaptures_snapshot(
+        self, service, mock_trial_balance_response
+    ):
+        service = await service
+        accounts_response = {
+            "Accounts": [
+                {
+                    "AccountID": "c563b607-fb0e-4d06-9ddb-76fdeef20ae3",
+                    "Name": "Sales",
+                    "Type": "REVENUE",
+                }
+            ]
+        }
+        await XeroSnapshot.objects.acreate(
+            tenant_id="tenant-456",
+            date=date(2023, 1, 31),
+            accounts=XeroSnapshot.compress({"Accounts": []}),
+            trial_balance=XeroSnapshot.compress({"Reports": [{"Rows": []}]}),
+            fetched_at="2023-02-01T00:00:00Z",
+        )
+
+        service.xero_service = MagicMock()
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "test-token"}
+        )
+
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_client_instance = AsyncMock()
+
+            acc_response = MagicMock()
+            acc_response.status_code = 200
+            acc_response.json.return_value = accounts_response
+
+            tb_response = MagicMock()
+            tb_response.status_code = 200
+            tb_response.json.return_value = mock_trial_balance_response
+
+            mock_client_instance.get.side_effect = [acc_response, tb_response]
+            mock_client.return_value.__aenter__.return_value = mock_client_instance
+
+            revenue = await service.generate_report(
+                "tenant-456", date(2023, 1, 31), "REVENUE", fresh=True
+            )
+
+        assert mock_client_instance.get.await_count == 2
+        assert revenue == {
+            "c563b607-fb0e-4d06-9ddb-76fdeef20ae3": {
+                "name": "Sales",
+                "code": "",
+                "balance": -10053.96,
+            }
+        }
+        snapshot = await XeroSnapshot.objects.aget(
+            tenant_id="tenant-456", date=date(2023, 1, 31)
+        )
+        assert snapshot.get_accounts() == accounts_response
+
+    async def test_generate_reports_fetches_tenants_concurrently(self, service):
+        service = await service
+        service.xero_service = MagicMock()
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "test-token"}
+        )
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def fetch_report(client, tenant_id, to_date, account_type, token):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {f"{tenant_id}-acc": {"name": "Sales", "balance": 1.0}}
+
+        with patch.object(service, "_fetch_report", side_effect=fetch_report):
+            result = await service.generate_reports(
+                ["tenant-1", "tenant-2", "tenant-3"], date(2023, 1, 31), "REVENUE"
+            )
+
+        assert list(result) == ["tenant-1", "tenant-2", "tenant-3"]
+        assert result["tenant-2"] == {"tenant-2-acc": {"name": "Sales", "balance": 1.0}}
+        assert max_in_flight == 3
+
+    async def test_generate_report_times_out_and_cancels_requests(
+        self, service, settings
+    ):
+        service = await service
+        settings.XERO_GENERATE_TIMEOUT = 0.05
+        service.xero_service = MagicMock()
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "test-token"}
+        )
+        cancelled = asyncio.Event()
+
+        async def slow_fetch(*args, **kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with patch.object(service, "_fetch_report", side_effect=slow_fetch):
+            with pytest.raises(XeroTimeoutError):
+                await service.generate_report("tenant-slow", date(2023, 1, 31), "ASSET")
+
+        assert cancelled.is_set()
+
+    async def test_gather_or_cancel_cancels_siblings_on_failure(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def failing():
+            raise ValueError("accounts failed")
+
+        with pytest.raises(ValueError, match="accounts failed"):
+            await gather_or_cancel(slow(), failing())
+
+        assert cancelled.is_set()
+        assert await gather_or_cancel(asyncio.sleep(0, "a"), asyncio.sleep(0, "b")) == [
+            "a",
+            "b",
+        ]
+
+    async def test_tenant_limiter_caps_concurrency_per_tenant(self, settings):
+        settings.XERO_TENANT_CONCURRENCY = 2
+        in_flight = {"tenant-1": 0, "tenant-2": 0}
+        max_in_flight = dict(in_flight)
+
+        async def call(tenant_id):
+            async with tenant_limiter(tenant_id):
+                in_flight[tenant_id] += 1
+                max_in_flight[tenant_id] = max(
+                    max_in_flight[tenant_id], in_flight[tenant_id]
+                )
+                await asyncio.sleep(0.01)
+                in_flight[tenant_id] -= 1
+
+        await asyncio.gather(
+            *(call(tenant_id) for tenant_id in ["tenant-1", "tenant-2"] * 4)
+        )
+
+        assert max_in_flight == {"tenant-1": 2, "tenant-2": 2}
@@ -1,11 +1,20 @@
+import csv
+import io
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from unittest.mock import AsyncMock, patch
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
-from apps.reports.service import XeroReportService
+from apps.reports.cache import rendered_reports
+from apps.reports.models import AccountValue, Report
+from apps.reports.service import XeroReportService, XeroUnavailableError
 from apps.reports.views import ReportViewSet
+from apps.xero_api.circuit import CircuitOpenError
 from apps.xero_api.service import TokenRefreshError
 from core.tests.factories import AccountValueFactory, ReportFactory, XeroTenantFactory
 
@@ -54,6 +63,122 @@ class TestReportViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert "account_balances" in response.data
 
+    async def test_report_details_conditional_get(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user, period=date(2024, 1, 31))
+        view = ReportViewSet.as_view({"get": "details"})
+
+        request = factory.get(f"/api/reports/{report.id}/details/")
+        force_authenticate(request, user=auth_user)
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Cache-Control"] == "private, max-age=86400"
+        assert "Last-Modified" in response
+        etag = response["ETag"]
+
+        request = factory.get(
+            f"/api/reports/{report.id}/details/", HTTP_IF_NONE_MATCH=etag
+        )
+        force_authenticate(request, user=auth_user)
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert not response.data
+
+        # Compressed responses hand out a weak version of the same ETag
+        request = factory.get(
+            f"/api/reports/{report.id}/details/", HTTP_IF_NONE_MATCH=f"W/{etag}"
+        )
+        force_authenticate(request, user=auth_user)
+        response = await view(request, pk=report.id)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        await Report.objects.filter(id=report.id).aupdate(
+            refreshed_at=datetime(2030, 1, 1, tzinfo=timezone.utc),
+            content_hash="changed",
+        )
+        request = factory.get(
+            f"/api/reports/{report.id}/details/", HTTP_IF_NONE_MATCH=etag
+        )
+        force_authenticate(request, user=auth_user)
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    async def test_retrieve_current_period_is_revalidated(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user, period=date.today())
+
+        request = factory.get(f"/api/reports/{report.id}/")
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "retrieve"})
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Cache-Control"] == "private, no-cache"
+
+    async def test_report_details_served_from_cache(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user)
+        await AccountValueFactory.acreate(report=report)
+        view = ReportViewSet.as_view({"get": "details"})
+        hits = rendered_reports.stats()["memory"]["hits"]
+
+        responses = []
+        for _ in range(2):
+            request = factory.get(f"/api/reports/{report.id}/details/")
+            force_authenticate(request, user=auth_user)
+            responses.append(await view(request, pk=report.id))
+
+        first, second = responses
+        first.render()
+        assert second.status_code == status.HTTP_200_OK
+        assert second.content == first.content
+        assert second["ETag"] == first["ETag"]
+        assert second["Content-Type"] == "application/json"
+        stats = rendered_reports.stats()["memory"]
+        assert (stats["hits"] - hits, stats["entries"]) == (1, 1)
+        assert stats["size"] == len(first.content)
+
+    async def test_delete_report_drops_cached_renderings(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user)
+
+        request = factory.get(f"/api/reports/{report.id}/")
+        force_authenticate(request, user=auth_user)
+        await ReportViewSet.as_view({"get": "retrieve"})(request, pk=report.id)
+        assert rendered_reports.stats()["memory"]["entries"] == 1
+
+        request = factory.delete(f"/api/reports/{report.id}/")
+        force_authenticate(request, user=auth_user)
+        response = await ReportViewSet.as_view({"delete": "destroy"})(
+            request, pk=report.id
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert rendered_reports.stats()["memory"]["entries"] == 0
+
+    async def test_cache_stats_requires_staff(self, authenticated_user):
+        auth_user = await authenticated_user
+        view = ReportViewSet.as_view(
+            {"get": "cache_stats"}, **ReportViewSet.cache_stats.kwargs
+        )
+
+        request = factory.get("/api/reports/cache-stats/")
+        force_authenticate(request, user=auth_user)
+        response = await view(request)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        auth_user.is_staff = True
+        request = factory.get("/api/reports/cache-stats/")
+        force_authenticate(request, user=auth_user)
+        response = await view(request)
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) == {"rendered_reports", "xero"}
+
     async def test_generate_report_success(self, authenticated_user, mock_report_data):
         auth_user = await authenticated_user
         tenant = await XeroTenantFactory.acreate(user=auth_user)
@@ -82,6 +207,96 @@ class TestReportViewSet:
 
             assert response.status_code == status.HTTP_201_CREATED
             assert "id" in response.data
+            assert response.data["account_count"] == 1
+            assert response.data["total_balance"] == "100.00"
+
+    async def test_generate_report_stores_aggregates(self, authenticated_user):
+        auth_user = await authenticated_user
+        tenant = await XeroTenantFactory.acreate(user=auth_user)
+        report_data = {
+            "acc-1": {"name": "Sales", "balance": -10053.96},
+            "acc-2": {"name": "Bank", "balance": 2500.5},
+            "acc-3": {"name": "Cash", "balance": 120.25},
+        }
+
+        request = factory.post(
+            "/api/reports/generate/",
+            data={
+                "tenant_name": tenant.tenant_name,
+                "period": "Jan-2023",
+                "account_type": "CURRENT",
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+
+        with patch.object(
+            XeroReportService, "generate_report", new_callable=AsyncMock
+        ) as mock_generate:
+            mock_generate.return_value = report_data
+
+            view = ReportViewSet.as_view({"post": "generate"})
+            response = await view(request)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        report = await Report.objects.aget(id=response.data["id"])
+        assert report.account_count == 3
+        assert report.total_balance == Decimal("-7433.21")
+        assert report.debit_total == Decimal("2620.75")
+        assert report.credit_total == Decimal("10053.96")
+        assert report.max_abs_balance == Decimal("10053.96")
+
+    async def test_generate_report_with_snapshot(
+        self, authenticated_user, mock_report_data
+    ):
+        auth_user = await authenticated_user
+        tenant = await XeroTenantFactory.acreate(user=auth_user)
+
+        request = factory.post(
+            "/api/reports/generate/",
+            data={
+                "tenant_name": tenant.tenant_name,
+                "period": "Jan-2023",
+                "account_type": "CURRENT",
+                "snapshot": True,
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+
+        with patch.multiple(
+            XeroReportService,
+            capture_snapshot=AsyncMock(),
+            generate_report=AsyncMock(return_value=mock_report_data),
+        ):
+            view = ReportViewSet.as_view({"post": "generate"})
+            response = await view(request)
+
+            assert response.status_code == status.HTTP_201_CREATED
+            XeroReportService.capture_snapshot.assert_awaited_once_with(
+                tenant.tenant_id, date(2023, 1, 31)
+            )
+
+    async def test_generate_report_snapshot_of_open_period(self, authenticated_user):
+        auth_user = await authenticated_user
+        tenant = await XeroTenantFactory.acreate(user=auth_user)
+
+        request = factory.post(
+            "/api/reports/generate/",
+            data={
+                "tenant_name": tenant.tenant_name,
+                "period": date.today().strftime("%b-%Y"),
+                "account_type": "CURRENT",
+                "snapshot": True,
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"post": "generate"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "snapshot" in response.data
 
     async def test_generate_report_token_error(self, authenticated_user):
         auth_user = await authenticated_user
@@ -112,6 +327,59 @@ class TestReportViewSet:
             assert response.status_code == status.HTTP_401_UNAUTHORIZED
             assert "authorization_url" in response.data
 
+    async def test_generate_report_xero_unavailable(self, authenticated_user):
+        auth_user = await authenticated_user
+        tenant = await XeroTenantFactory.acreate(user=auth_user)
+
+        request = factory.post(
+            "/api/reports/generate/",
+            data={
+                "tenant_name": tenant.tenant_name,
+                "period": "Jan-2023",
+                "account_type": "CURRENT",
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+
+        with patch.object(
+            XeroReportService,
+            "generate_report",
+            new_callable=AsyncMock,
+            side_effect=XeroUnavailableError("Xero API unavailable for accounts"),
+        ):
+            view = ReportViewSet.as_view({"post": "generate"})
+            response = await view(request)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    async def test_generate_report_circuit_open(self, authenticated_user):
+        auth_user = await authenticated_user
+        tenant = await XeroTenantFactory.acreate(user=auth_user)
+
+        request = factory.post(
+            "/api/reports/generate/",
+            data={
+                "tenant_name": tenant.tenant_name,
+                "period": "Jan-2023",
+                "account_type": "CURRENT",
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+
+        with patch.object(
+            XeroReportService,
+            "generate_report",
+            new_callable=AsyncMock,
+            side_effect=CircuitOpenError("accounts", tenant.tenant_id, 12.4),
+        ):
+            view = ReportViewSet.as_view({"post": "generate"})
+            response = await view(request)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "12"
+
     @patch("apps.reports.views.ReportViewSet.permission_classes", [])
     async def test_generate_report_validation_error(self, authenticated_user):
         factory = APIRequestFactory()
@@ -129,3 +397,499 @@ class TestReportViewSet:
         response.render()
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_compare_reports(self, authenticated_user):
+        auth_user = await authenticated_user
+        january = await ReportFactory.acreate(user=auth_user)
+        february = await ReportFactory.acreate(user=auth_user)
+        for report, balances in (
+            (january, {"acc-1": "100.00", "acc-2": "50.00", "acc-3": "10.00"}),
+            (february, {"acc-1": "150.00", "acc-2": "20.00", "acc-4": "5.00"}),
+        ):
+            for account_id, balance in balances.items():
+                await AccountValueFactory.acreate(
+                    report=report,
+                    xero_account_id=account_id,
+                    account_name=f"Account {account_id}",
+                    account_balance=Decimal(balance),
+                )
+
+        request = factory.get(
+            "/api/reports/compare/", data={"ids": [january.id, february.id]}
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "compare"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [r["id"] for r in response.data["reports"]] == [january.id, february.id]
+
+        accounts = response.data["accounts"]
+        assert [a["xero_account_id"] for a in accounts] == [
+            "acc-1",
+            "acc-2",
+            "acc-3",
+            "acc-4",
+        ]
+        assert accounts[0]["balances"] == ["100.00", "150.00"]
+        assert accounts[0]["delta"] == "50.00"
+        assert accounts[0]["pct_change"] == "50.00"
+        assert accounts[1]["pct_change"] == "-60.00"
+        assert accounts[2]["balances"] == ["10.00", None]
+        assert accounts[3]["pct_change"] is None
+
+    async def test_compare_reports_sort_and_limit(self, authenticated_user):
+        auth_user = await authenticated_user
+        first = await ReportFactory.acreate(user=auth_user)
+        second = await ReportFactory.acreate(user=auth_user)
+        for i in range(5):
+            await AccountValueFactory.acreate(
+                report=first, xero_account_id=f"acc-{i}", account_balance=Decimal(0)
+            )
+            await AccountValueFactory.acreate(
+                report=second, xero_account_id=f"acc-{i}", account_balance=Decimal(i)
+            )
+
+        request = factory.get(
+            "/api/reports/compare/",
+            data={"ids": [first.id, second.id], "sort": "delta", "limit": 2},
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "compare"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [a["delta"] for a in response.data["accounts"]] == ["0.00", "1.00"]
+
+    async def test_compare_reports_of_another_user(self, authenticated_user):
+        auth_user = await authenticated_user
+        own = await ReportFactory.acreate(user=auth_user)
+        other = await ReportFactory.acreate()
+
+        request = factory.get("/api/reports/compare/", data={"ids": [own.id, other.id]})
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "compare"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_compare_consolidated_with_tenant_report(self, authenticated_user):
+        auth_user = await authenticated_user
+        consolidated = await ReportFactory.acreate(
+            user=auth_user, consolidated_by="name"
+        )
+        tenant_report = await ReportFactory.acreate(user=auth_user)
+
+        request = factory.get(
+            "/api/reports/compare/", data={"ids": [consolidated.id, tenant_report.id]}
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "compare"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_compare_requires_two_reports(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user)
+
+        request = factory.get("/api/reports/compare/", data={"ids": [report.id]})
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "compare"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_compare_too_many_reports(self, authenticated_user):
+        auth_user = await authenticated_user
+
+        request = factory.get("/api/reports/compare/", data={"ids": range(1, 14)})
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "compare"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "ids" in response.data
+
+    async def test_account_timeseries(self, authenticated_user):
+        auth_user = await authenticated_user
+        for period, balance in (
+            (date(2024, 3, 31), "30.00"),
+            (date(2024, 1, 31), "10.00"),
+            (date(2024, 2, 29), "20.00"),
+        ):
+            report = await ReportFactory.acreate(user=auth_user, period=period)
+            await AccountValueFactory.acreate(
+                report=report, xero_account_id="acc-1", account_balance=Decimal(balance)
+            )
+            await AccountValueFactory.acreate(report=report, xero_account_id="acc-2")
+
+        other_report = await ReportFactory.acreate(period=date(2024, 1, 31))
+        await AccountValueFactory.acreate(report=other_report, xero_account_id="acc-1")
+        consolidated = await ReportFactory.acreate(
+            user=auth_user, period=date(2024, 2, 29), consolidated_by="name"
+        )
+        await AccountValueFactory.acreate(report=consolidated, xero_account_id="acc-1")
+
+        request = factory.get(
+            "/api/reports/timeseries/",
+            data={"accounts": ["acc-1"], "period_from": "Feb-2024"},
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "timeseries"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 1
+        points = response.data[0]["points"]
+        assert [p["period"] for p in points] == ["2024-02-29", "2024-03-31"]
+        assert [p["account_balance"] for p in points] == ["20.00", "30.00"]
+
+    async def test_account_timeseries_uses_latest_report_per_period(
+        self, authenticated_user
+    ):
+        auth_user = await authenticated_user
+        for created_at, balance in (
+            (datetime(2024, 2, 1, tzinfo=timezone.utc), "10.00"),
+            (datetime(2024, 2, 5, tzinfo=timezone.utc), "15.00"),
+        ):
+            report = await ReportFactory.acreate(
+                user=auth_user, period=date(2024, 1, 31)
+            )
+            await Report.objects.filter(id=report.id).aupdate(created_at=created_at)
+            await AccountValueFactory.acreate(
+                report=report, xero_account_id="acc-1", account_balance=Decimal(balance)
+            )
+
+        request = factory.get("/api/reports/timeseries/", data={"accounts": ["acc-1"]})
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "timeseries"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [p["account_balance"] for p in response.data[0]["points"]] == ["15.00"]
+
+    async def test_account_timeseries_invalid_range(self, authenticated_user):
+        auth_user = await authenticated_user
+
+        request = factory.get(
+            "/api/reports/timeseries/",
+            data={
+                "accounts": ["acc-1"],
+                "period_from": "Mar-2024",
+                "period_to": "Jan-2024",
+            },
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "timeseries"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_export_report_csv(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user, period=date(2024, 1, 31))
+        for account_id, balance in (("acc-2", "-5.50"), ("acc-1", "10.00")):
+            await AccountValueFactory.acreate(
+                report=report,
+                xero_account_id=account_id,
+                account_name=f"Account {account_id}",
+                account_balance=Decimal(balance),
+            )
+
+        request = factory.get(f"/api/reports/{report.id}/export/")
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "export"})
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "text/csv"
+        assert f'filename="report-{report.id}.csv"' in response["Content-Disposition"]
+
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        assert rows[0] == [
+            "report_id",
+            "period",
+            "account_type",
+            "xero_account_id",
+            "account_name",
+            "account_balance",
+        ]
+        assert [row[3:] for row in rows[1:]] == [
+            ["acc-1", "Account acc-1", "10.00"],
+            ["acc-2", "Account acc-2", "-5.50"],
+        ]
+
+    async def test_export_report_of_another_user(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate()
+        await AccountValueFactory.acreate(report=report)
+
+        request = factory.get(f"/api/reports/{report.id}/export/")
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "export"})
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+    async def test_export_reports_columnar(self, authenticated_user, file_format):
+        auth_user = await authenticated_user
+        reports = [
+            await ReportFactory.acreate(
+                user=auth_user, period=date(2024, month, 28), account_type="REVENUE"
+            )
+            for month in (1, 2, 3)
+        ]
+        for report in reports:
+            for i in range(3):
+                await AccountValueFactory.acreate(
+                    report=report, xero_account_id=f"acc-{i}"
+                )
+        await AccountValueFactory.acreate(
+            report=await ReportFactory.acreate(user=auth_user, account_type="EXPENSE")
+        )
+        await AccountValueFactory.acreate(
+            report=await ReportFactory.acreate(
+                user=auth_user,
+                period=date(2024, 3, 28),
+                account_type="REVENUE",
+                consolidated_by="name",
+            )
+        )
+        await AccountValueFactory.acreate()
+
+        request = factory.get(
+            "/api/reports/export/",
+            data={
+                "file_format": file_format,
+                "account_type": "REVENUE",
+                "period_from": "Feb-2024",
+            },
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "export_reports"})
+
+        with patch("apps.reports.export.ROW_GROUP_SIZE", 2):
+            response = await view(request)
+            content = b"".join([chunk async for chunk in response.streaming_content])
+
+        assert response.status_code == status.HTTP_200_OK
+        if file_format == "parquet":
+            parquet_file = pq.ParquetFile(pa.BufferReader(content))
+            assert parquet_file.metadata.num_row_groups == 3
+            table = parquet_file.read()
+        else:
+            table = pa.ipc.open_stream(content).read_all()
+
+        assert table.num_rows == 6
+        assert set(table.column("report_id").to_pylist()) == {
+            reports[1].id,
+            reports[2].id,
+        }
+        assert table.schema.field("account_balance").type == pa.decimal128(12, 2)
+
+    async def test_bulk_details(self, authenticated_user):
+        auth_user = await authenticated_user
+        reports = [await ReportFactory.acreate(user=auth_user) for _ in range(3)]
+        for count, report in enumerate(reports, start=1):
+            for _ in range(count):
+                await AccountValueFactory.acreate(report=report)
+
+        report_ids = [reports[2].id, reports[0].id, reports[1].id]
+        request = factory.get("/api/reports/bulk-details/", data={"ids": report_ids})
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "bulk_details"})
+
+        with patch.object(
+            AccountValue.objects, "filter", side_effect=AssertionError
+        ) as mock_filter:
+            response = await view(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        mock_filter.assert_not_called()
+        assert [r["id"] for r in response.data] == report_ids
+        assert [len(r["account_balances"]) for r in response.data] == [3, 1, 2]
+
+    async def test_bulk_details_of_another_user(self, authenticated_user):
+        auth_user = await authenticated_user
+        own = await ReportFactory.acreate(user=auth_user)
+        other = await ReportFactory.acreate()
+
+        request = factory.get(
+            "/api/reports/bulk-details/", data={"ids": [own.id, other.id]}
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"get": "bulk_details"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_refresh_report_writes_only_changes(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(
+            user=auth_user,
+            period=date(2024, 1, 31),
+            tenant_id="tenant-123",
+            account_type="REVENUE",
+        )
+        for account_id, balance in (("acc-1", "10.00"), ("acc-2", "20.00")):
+            await AccountValueFactory.acreate(
+                report=report,
+                xero_account_id=account_id,
+                account_name=account_id,
+                account_balance=Decimal(balance),
+            )
+        await AccountValueFactory.acreate(report=report, xero_account_id="acc-3")
+        unchanged = await AccountValue.objects.aget(
+            report=report, xero_account_id="acc-1"
+        )
+
+        request = factory.post(f"/api/reports/{report.id}/refresh/", format="json")
+        force_authenticate(request, user=auth_user)
+
+        with patch.object(
+            XeroReportService, "generate_report", new_callable=AsyncMock
+        ) as mock_generate:
+            mock_generate.return_value = {
+                "acc-1": {"name": "acc-1", "balance": 10.0},
+                "acc-2": {"name": "acc-2", "balance": 25.5},
+                "acc-4": {"name": "acc-4", "balance": -4.0},
+            }
+            view = ReportViewSet.as_view({"post": "refresh"})
+            response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        mock_generate.assert_awaited_once_with(
+            tenant_id="tenant-123",
+            to_date=date(2024, 1, 31),
+            account_type="REVENUE",
+            fresh=True,
+        )
+        assert response.data["changes"] == {
+            "created": ["acc-4"],
+            "updated": ["acc-2"],
+            "deleted": ["acc-3"],
+        }
+        assert response.data["report"]["account_count"] == 3
+        assert response.data["report"]["refreshed_at"] is not None
+
+        balances = {
+            account.xero_account_id: account
+            async for account in AccountValue.objects.filter(report=report)
+        }
+        assert set(balances) == {"acc-1", "acc-2", "acc-4"}
+        assert balances["acc-1"].id == unchanged.id
+        assert balances["acc-2"].account_balance == Decimal("25.50")
+
+    async def test_refresh_report_needs_tenant(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(user=auth_user)
+
+        request = factory.post(f"/api/reports/{report.id}/refresh/", format="json")
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"post": "refresh"})
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_refresh_report_of_another_user(self, authenticated_user):
+        auth_user = await authenticated_user
+        report = await ReportFactory.acreate(tenant_id="tenant-123")
+
+        request = factory.post(f"/api/reports/{report.id}/refresh/", format="json")
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"post": "refresh"})
+        response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_refresh_part_of_consolidation(self, authenticated_user):
+        auth_user = await authenticated_user
+        consolidated = await ReportFactory.acreate(
+            user=auth_user, consolidated_by="name"
+        )
+        report = await ReportFactory.acreate(
+            user=auth_user, tenant_id="tenant-123", consolidated_into=consolidated
+        )
+
+        request = factory.post(f"/api/reports/{report.id}/refresh/", format="json")
+        force_authenticate(request, user=auth_user)
+
+        with patch.object(
+            XeroReportService, "generate_report", new_callable=AsyncMock
+        ) as mock_generate:
+            view = ReportViewSet.as_view({"post": "refresh"})
+            response = await view(request, pk=report.id)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        mock_generate.assert_not_awaited()
+
+    async def test_consolidate_reports(self, authenticated_user):
+        auth_user = await authenticated_user
+        uk = await XeroTenantFactory.acreate(user=auth_user, tenant_name="UK")
+        us = await XeroTenantFactory.acreate(user=auth_user, tenant_name="US")
+        await XeroTenantFactory.acreate()
+
+        request = factory.post(
+            "/api/reports/consolidate/",
+            data={
+                "period": "Jan-2024",
+                "account_type": "REVENUE",
+                "consolidate_by": "code",
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+
+        with patch.object(
+            XeroReportService, "generate_reports", new_callable=AsyncMock
+        ) as mock_generate:
+            mock_generate.return_value = {
+                uk.tenant_id: {
+                    "uk-1": {"name": "Sales", "code": "200", "balance": 100.0},
+                    "uk-2": {"name": "Other", "code": "", "balance": 5.0},
+                },
+                us.tenant_id: {
+                    "us-1": {"name": "Sales (US)", "code": "200", "balance": 50.5},
+                },
+            }
+            view = ReportViewSet.as_view({"post": "consolidate"})
+            response = await view(request)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert mock_generate.await_args.args[0] == [uk.tenant_id, us.tenant_id]
+
+        consolidated = response.data["report"]
+        assert consolidated["consolidated_by"] == "code"
+        assert consolidated["total_balance"] == "155.50"
+        balances = {
+            account.xero_account_id: account.account_balance
+            async for account in AccountValue.objects.filter(
+                report_id=consolidated["id"]
+            )
+        }
+        assert balances == {"200": Decimal("150.50"), "Other": Decimal("5.00")}
+
+        tenant_reports = response.data["tenant_reports"]
+        assert [r["tenant_id"] for r in tenant_reports] == [uk.tenant_id, us.tenant_id]
+        assert all(r["consolidated_into"] == consolidated["id"] for r in tenant_reports)
+
+    async def test_consolidate_unknown_tenant(self, authenticated_user):
+        auth_user = await authenticated_user
+
+        request = factory.post(
+            "/api/reports/consolidate/",
+            data={
+                "tenant_names": ["Missing"],
+                "period": "Jan-2024",
+                "account_type": "REVENUE",
+            },
+            format="json",
+        )
+        force_authenticate(request, user=auth_user)
+        view = ReportViewSet.as_view({"post": "consolidate"})
+        response = await view(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,104 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from apps.xero_api import http
+from core.asgi import LifespanApplication, application, django_application
+from core.metrics import worker_startup_duration
+from core.warmup import warm_up
+
+
+async def run_lifespan(app, *events):
+    messages = [{"type": f"lifespan.{event}"} for event in events]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    await app({"type": "lifespan"}, receive, send)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_opens_and_closes_the_xero_pool(settings):
+    settings.WARMUP = {**settings.WARMUP, "ENABLED": False}
+    events, sent = asyncio.Queue(), asyncio.Queue()
+    worker = asyncio.create_task(
+        application({"type": "lifespan"}, events.get, sent.put)
+    )
+
+    await events.put({"type": "lifespan.startup"})
+    assert (await sent.get())["type"] == "lifespan.startup.complete"
+    async with http.xero_client() as client:
+        shared = client
+    async with http.xero_client() as client:
+        assert client is shared
+
+    await events.put({"type": "lifespan.shutdown"})
+    assert (await sent.get())["type"] == "lifespan.shutdown.complete"
+    await worker
+    assert shared.is_closed
+    async with http.xero_client() as client:
+        assert client is not shared
+
+
+@pytest.mark.asyncio
+async def test_failing_startup_hook_stops_the_worker(caplog):
+    async def broken():
+        raise RuntimeError("no pool for you")
+
+    app = LifespanApplication(application, startup=[broken])
+
+    assert await run_lifespan(app, "startup") == ["lifespan.startup.failed"]
+    assert "Worker start-up failed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_runs_every_shutdown_hook():
+    calls = []
+
+    async def broken():
+        calls.append("broken")
+        raise RuntimeError
+
+    async def close():
+        calls.append("close")
+
+    app = LifespanApplication(application, shutdown=[broken, close])
+
+    assert await run_lifespan(app, "startup", "shutdown") == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+    assert calls == ["broken", "close"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+async def test_warm_up_times_each_phase(settings, caplog):
+    settings.WARMUP = {
+        "ENABLED": True,
+        "XERO_PRECONNECT": False,
+        "REQUEST_PATH": "/metrics",
+    }
+    settings.METRICS = {"TOKEN": ""}
+    settings.DEBUG = True
+
+    await warm_up(django_application)
+
+    phases = ("views", "serializers", "database", "request")
+    assert all(worker_startup_duration.value(phase=phase) > 0 for phase in phases)
+    assert "Worker warmed up in" in caplog.text
+    assert "Warm-up request to /metrics returned 200" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_warm_up_can_be_disabled(settings):
+    settings.WARMUP = {"ENABLED": False, "XERO_PRECONNECT": True, "REQUEST_PATH": ""}
+
+    with patch("core.warmup.load_views", side_effect=AssertionError):
+        await warm_up(django_application)
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import caches
+
+from core.cache import LRUCache, TieredCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=10)
+    cache.set("a", b"aaaa", 4)
+    cache.set("b", b"bbbb", 4)
+    assert cache.get("a") == b"aaaa"
+
+    cache.set("c", b"cccc", 4)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["size"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_skips_values_over_budget():
+    cache = LRUCache(max_size=4)
+    cache.set("a", b"aaaaa", 5)
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_size=4)
+    with patch("core.cache.time.monotonic", return_value=100.0):
+        cache.set("a", "value", 1, expires_at=110.0)
+        assert cache.get("a") == "value"
+    with patch("core.cache.time.monotonic", return_value=110.0):
+        assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_fills_memory_from_shared_tier():
+    writer = TieredCache("test", max_size=100, shared_alias="shared", sizeof=len)
+    reader = TieredCache("test", max_size=100, shared_alias="shared", sizeof=len)
+    await writer.aset("key", b"body")
+
+    assert caches["shared"].get("test:key") == b"body"
+    assert await reader.aget("key") == b"body"
+    assert await reader.aget("key") == b"body"
+
+    stats = reader.stats()
+    assert stats["shared"]["hits"] == 1
+    assert stats["memory"]["hits"] == 1
+
+    await writer.adelete_many(["key"])
+    reader.memory.clear()
+    assert await reader.aget("key") is None
+
+
+@pytest.mark.asyncio
+async def test_versions_are_shared_between_processes():
+    first = TieredCache("test", max_size=10, shared_alias="shared")
+    second = TieredCache("test", max_size=10, shared_alias="shared")
+    with patch("core.cache.time.monotonic", return_value=100.0):
+        version = await first.aversion("key")
+        assert version
+        assert await second.aversion("key") == version
+
+        await second.abump_version("key")
+        bumped = await second.aversion("key")
+        assert bumped not in ("", version)
+        # Held in memory: the first process doesn't re-read it straight away
+        caches["shared"].clear()
+        assert await first.aversion("key") == version
+
+    caches["shared"].set("test:key:version", bumped)
+    with patch("core.cache.time.monotonic", return_value=100.0 + first.version_ttl):
+        assert await first.aversion("key") == bumped
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = TieredCache("test", max_size=10, shared_alias="shared")
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"accounts": []}
+
+    results = await asyncio.gather(*(cache.aget_or_set("key", load) for _ in range(5)))
+
+    assert calls == 1
+    assert results == [{"accounts": []}] * 5
+    assert cache.stats()["coalesced"] == 4
+
+    await cache.aget_or_set("key", load, refresh=True)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_raised_to_every_waiter_and_not_cached():
+    cache = TieredCache("test", max_size=10)
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("Xero unavailable")
+
+    results = await asyncio.gather(
+        *(cache.aget_or_set("key", load) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await cache.aget("key") is None
+
+
+@pytest.mark.asyncio
+async def test_waits_for_load_leased_by_another_process():
+    cache = TieredCache("test", max_size=10, shared_alias="shared")
+    cache.lock_poll_interval = 0.01
+    shared = caches["shared"]
+    shared.add("test:key:lock", 1)
+
+    async def other_process():
+        await asyncio.sleep(0.03)
+        shared.set("test:key", "loaded elsewhere")
+
+    async def load():
+        raise AssertionError("loaded twice")
+
+    _, value = await asyncio.gather(other_process(), cache.aget_or_set("key", load))
+
+    assert value == "loaded elsewhere"
+    assert cache.stats()["loads"] == 0
+
+
+@pytest.mark.asyncio
+async def test_loads_promptly_when_lease_holder_fails():
+    leader = TieredCache("test", max_size=10, shared_alias="shared")
+    follower = TieredCache("test", max_size=10, shared_alias="shared")
+    follower.lock_poll_interval = 0.01
+
+    async def failing_load():
+        await asyncio.sleep(0.03)
+        raise ValueError("Xero unavailable")
+
+    async def load():
+        return "loaded here"
+
+    async def follow():
+        # Let the leader take the lease first
+        await asyncio.sleep(0.01)
+        return await follower.aget_or_set("key", load)
+
+    start = time.monotonic()
+    failed, value = await asyncio.gather(
+        leader.aget_or_set("key", failing_load), follow(), return_exceptions=True
+    )
+
+    assert isinstance(failed, ValueError)
+    assert value == "loaded here"
+    assert time.monotonic() - start < follower.lock_timeout / 10
@@ -0,0 +1,46 @@
+import io
+import json
+import logging
+
+from core.log import JSONFormatter, QueueHandler
+
+
+def _record(msg, *args, exc_info=None, **extra):
+    record = logging.LogRecord(
+        "apps.test", logging.INFO, "x.py", 7, msg, args, exc_info
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JSONFormatter().format(_record("Fetched %s", "accounts", tenant="t-1"))
+
+    entry = json.loads(line)
+    assert entry["message"] == "Fetched accounts"
+    assert entry["level"] == "INFO"
+    assert entry["location"] == "x.py:7"
+    assert entry["tenant"] == "t-1"
+
+
+def test_json_formatter_includes_exceptions():
+    try:
+        raise ValueError("bad balance")
+    except ValueError as e:
+        record = _record("Failed", exc_info=(type(e), e, e.__traceback__))
+
+    entry = json.loads(JSONFormatter().format(record))
+    assert "ValueError: bad balance" in entry["exception"]
+
+
+def test_queue_handler_writes_from_background_thread():
+    stream = io.StringIO()
+    handler = QueueHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    args = ["before"]
+
+    handler.handle(_record("State: %s", args))
+    args[0] = "after"
+    handler.close()
+
+    assert stream.getvalue() == "INFO State: ['before']\n"
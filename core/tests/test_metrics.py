@@ -0,0 +1,147 @@
+import json
+
+import httpx
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.xero_api.http import get_with_retry
+from core.log import JSONFormatter
+from core.metrics import (
+    OVERFLOW,
+    Counter,
+    Histogram,
+    RequestMetrics,
+    current_request,
+    db_query_duration,
+    http_request_duration,
+    registry,
+    span,
+    xero_request_duration,
+)
+from core.middleware import MetricsMiddleware
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ("view",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, view="list")
+
+    lines = list(histogram.samples())
+
+    assert [value for _, _, value in lines] == [2, 3, 4, 3.65, 4]
+    assert lines[1] == ("latency_seconds_bucket", {"view": "list", "le": 1}, 3)
+
+
+def test_label_values_beyond_max_series_are_pooled():
+    counter = Counter("calls", "Calls", ("user",), max_series=2)
+    for user in ("a", "b", "c", "d"):
+        counter.inc(user=user)
+
+    assert counter.value(user="a") == 1
+    assert counter.value(user=OVERFLOW) == 2
+    assert len(list(counter.samples())) == 3
+
+
+def test_renders_prometheus_text(client, settings):
+    settings.METRICS = {"TOKEN": "s3cret"}
+
+    response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'cache_lookups_total{cache="xero",tier="memory",result="hit"}' in body
+
+
+def test_requires_token_when_configured(client, settings):
+    settings.METRICS = {"TOKEN": "s3cret"}
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+    assert response.status_code == 200
+
+
+def test_not_served_without_token_unless_debug(client, settings):
+    settings.METRICS = {"TOKEN": ""}
+
+    assert client.get("/metrics").status_code == 404
+    settings.DEBUG = True
+    assert client.get("/metrics").status_code == 200
+
+
+def test_records_requests_by_view(client):
+    labels = {"view": "reports:report-list", "method": "GET", "status": "4xx"}
+    before = http_request_duration.count(**labels)
+
+    assert client.get("/reports/").status_code == 401
+
+    assert http_request_duration.count(**labels) == before + 1
+    assert 'view="reports:report-list"' in registry.render()
+
+
+@pytest.mark.django_db
+def test_attributes_queries_to_the_current_view():
+    connection.ensure_connection()
+    before = db_query_duration.count(view="reports:report-detail")
+    metrics = RequestMetrics(view="reports:report-detail")
+    token = current_request.set(metrics)
+    try:
+        User.objects.count()
+    finally:
+        current_request.reset(token)
+
+    assert metrics.queries == 1
+    assert db_query_duration.count(view="reports:report-detail") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_times_xero_requests_by_status():
+    before = xero_request_duration.count(endpoint="accounts", status="404")
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(404))
+    )
+
+    async with client:
+        await get_with_retry(
+            client,
+            "https://api.xero.com/api.xro/2.0/Accounts",
+            endpoint="accounts",
+            headers={},
+        )
+
+    assert xero_request_duration.count(endpoint="accounts", status="404") == before + 1
+
+
+def test_sends_server_timing_breakdown(client):
+    response = client.get("/reports/")
+
+    names = [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+    assert names[0] == "auth"
+    assert names[-1] == "total"
+
+
+def test_logs_sampled_timings(settings, caplog):
+    settings.SERVER_TIMING = {"ENABLED": False, "LOG_SAMPLE_RATE": 1.0}
+
+    def view(request):
+        with span("xero-accounts"):
+            pass
+        return HttpResponse()
+
+    response = MetricsMiddleware(view)(RequestFactory().get("/"))
+
+    assert not response.has_header("Server-Timing")
+    assert "xero-accounts=" in caplog.text
+    assert "total=" in caplog.text
+
+    record = next(r for r in caplog.records if r.getMessage().startswith("timing"))
+    assert record.status == 200
+    assert record.method == "GET"
+    assert set(record.spans_ms) == {"xero-accounts", "total"}
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["view"] == record.view
+    assert entry["spans_ms"]["total"] >= 0
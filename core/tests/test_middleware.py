@@ -0,0 +1,131 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from core.middleware import CompressionMiddleware, accepted_encodings
+
+factory = RequestFactory()
+
+PAYLOAD = json.dumps(
+    [{"account_id": f"acc-{i}", "balance": f"{i}.00"} for i in range(500)]
+).encode()
+
+
+def _middleware(response):
+    return CompressionMiddleware(lambda request: response)
+
+
+def test_accepted_encodings_ignores_zero_quality():
+    assert accepted_encodings("gzip;q=0, br;q=0.5, identity") == {"br", "identity"}
+
+
+def test_compresses_json_for_gzip_clients():
+    response = HttpResponse(PAYLOAD, content_type="application/json")
+    response["ETag"] = '"1-2-3"'
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+    response = _middleware(response)(request)
+
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Vary"] == "Accept-Encoding"
+    assert response["ETag"] == 'W/"1-2-3"'
+    assert int(response["Content-Length"]) == len(response.content)
+    assert gzip.decompress(response.content) == PAYLOAD
+
+
+def test_leaves_small_or_unaccepted_responses_alone():
+    small = HttpResponse(b"{}", content_type="application/json")
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+    assert not _middleware(small)(request).has_header("Content-Encoding")
+
+    large = HttpResponse(PAYLOAD, content_type="application/json")
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="identity")
+    response = _middleware(large)(request)
+    assert not response.has_header("Content-Encoding")
+    assert response.content == PAYLOAD
+
+
+def test_skips_html():
+    response = HttpResponse(PAYLOAD, content_type="text/html")
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+    assert not _middleware(response)(request).has_header("Content-Encoding")
+
+
+def test_compresses_streaming_response_per_chunk():
+    chunks = [PAYLOAD[:4000], PAYLOAD[4000:]]
+    response = StreamingHttpResponse(iter(chunks), content_type="text/csv")
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+    response = _middleware(response)(request)
+
+    assert response["Content-Encoding"] == "gzip"
+    assert not response.has_header("Content-Length")
+    parts = list(response.streaming_content)
+    decompressor = zlib.decompressobj(31)
+    # Every chunk is flushed, so the first part decodes on its own
+    assert decompressor.decompress(parts[0]) == chunks[0]
+    assert gzip.decompress(b"".join(parts)) == PAYLOAD
+
+
+@pytest.mark.asyncio
+async def test_compresses_async_streaming_response():
+    async def chunks():
+        yield PAYLOAD[:4000]
+        yield PAYLOAD[4000:]
+
+    async def get_response(request):
+        return StreamingHttpResponse(chunks(), content_type="text/csv")
+
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+    response = await CompressionMiddleware(get_response)(request)
+
+    assert response["Content-Encoding"] == "gzip"
+    body = b"".join([part async for part in response.streaming_content])
+    assert gzip.decompress(body) == PAYLOAD
+
+
+def test_prefers_brotli_when_available():
+    brotli = pytest.importorskip("brotli")
+    response = HttpResponse(PAYLOAD, content_type="application/json")
+    request = factory.get("/", HTTP_ACCEPT_ENCODING="gzip, br")
+
+    response = _middleware(response)(request)
+
+    assert response["Content-Encoding"] == "br"
+    assert brotli.decompress(response.content) == PAYLOAD
+
+
+@pytest.mark.django_db
+def test_api_requests_skip_sessions(client, settings):
+    session = SessionStore()
+    session["visited"] = True
+    session.create()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    response = client.get("/reports/")
+
+    assert settings.SESSION_COOKIE_NAME not in response.cookies
+    assert "csrftoken" not in response.cookies
+    assert not hasattr(response.wsgi_request, "session")
+
+
+@pytest.mark.django_db
+def test_admin_keeps_sessions(client, settings):
+    session = SessionStore()
+    session["visited"] = True
+    session.create()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    response = client.get("/admin/login/")
+
+    assert response.status_code == 200
+    assert response.wsgi_request.session["visited"]
+    # SESSION_SAVE_EVERY_REQUEST re-sends the cookie on every admin request
+    assert settings.SESSION_COOKIE_NAME in response.cookies
+    assert "csrftoken" in response.cookies
@@ -0,0 +1,293 @@
+"""Query budgets for every report and Xero view.
+
+Each view runs against several reports with several accounts, so a query
+made once per report or per account shows up as a budget failure.
+"""
+
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.reports.service import XeroReportService
+from apps.reports.views import ReportViewSet
+from apps.xero_api.models import XeroTenant
+from apps.xero_api.service import AsyncXeroAuthService
+from apps.xero_api.views import XeroCallbackView, XeroConnectView
+from core.metrics import db_query_budget_exceeded, db_repeated_queries
+from core.middleware import MetricsMiddleware
+from core.tests.factories import (
+    AccountValueFactory,
+    ReportFactory,
+    XeroAuthStateFactory,
+    XeroTenantFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+factory = APIRequestFactory()
+
+ACCOUNTS = ("acc-1", "acc-2", "acc-3")
+
+
+@pytest.fixture
+@pytest.mark.asyncio
+async def reports(authenticated_user):
+    user = await authenticated_user
+    tenant = await XeroTenantFactory.acreate(user=user)
+    reports = []
+    for month in (1, 2, 3):
+        report = await ReportFactory.acreate(
+            user=user,
+            tenant_id=tenant.tenant_id,
+            period=date(2024, month, 28),
+            account_type="REVENUE",
+        )
+        for account_id in ACCOUNTS:
+            await AccountValueFactory.acreate(report=report, xero_account_id=account_id)
+        reports.append(report)
+    return reports
+
+
+def trial_balance():
+    return {
+        account_id: {"name": account_id, "code": "200", "balance": 10.0}
+        for account_id in ACCOUNTS
+    }
+
+
+async def call(action, method, path, user, data=None, **kwargs):
+    if method == "get":
+        request = factory.get(path, data=data)
+    else:
+        request = factory.post(path, data=data, format="json")
+    force_authenticate(request, user=user)
+    view = ReportViewSet.as_view({method: action})
+    return await view(request, **kwargs)
+
+
+@pytest.mark.asyncio
+class TestReportViewSetQueries:
+    async def test_list(self, reports, assert_max_queries):
+        reports = await reports
+        with assert_max_queries(1):
+            response = await call("list", "get", "/api/reports/", reports[0].user)
+        assert len(response.data) == 3
+
+    async def test_retrieve(self, reports, assert_max_queries):
+        reports = await reports
+        report = reports[0]
+        with assert_max_queries(1):
+            response = await call(
+                "retrieve",
+                "get",
+                f"/api/reports/{report.id}/",
+                report.user,
+                pk=report.id,
+            )
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_details(self, reports, assert_max_queries):
+        reports = await reports
+        report = reports[0]
+        with assert_max_queries(2):
+            response = await call(
+                "details",
+                "get",
+                f"/api/reports/{report.id}/details/",
+                report.user,
+                pk=report.id,
+            )
+        assert len(response.data["account_balances"]) == len(ACCOUNTS)
+
+    async def test_bulk_details(self, reports, assert_max_queries):
+        reports = await reports
+        ids = [report.id for report in reports]
+        with assert_max_queries(2):
+            response = await call(
+                "bulk_details",
+                "get",
+                "/api/reports/bulk-details/",
+                reports[0].user,
+                data={"ids": ids},
+            )
+        assert [len(r["account_balances"]) for r in response.data] == [3, 3, 3]
+
+    async def test_export(self, reports, assert_max_queries):
+        reports = await reports
+        report = reports[0]
+        with assert_max_queries(2):
+            response = await call(
+                "export",
+                "get",
+                f"/api/reports/{report.id}/export/",
+                report.user,
+                pk=report.id,
+            )
+            content = b"".join([chunk async for chunk in response.streaming_content])
+        assert content.count(b"acc-") == len(ACCOUNTS)
+
+    async def test_export_reports(self, reports, assert_max_queries):
+        reports = await reports
+        with assert_max_queries(1):
+            response = await call(
+                "export_reports",
+                "get",
+                "/api/reports/export/",
+                reports[0].user,
+                data={"account_type": "REVENUE", "file_format": "csv"},
+            )
+            content = b"".join([chunk async for chunk in response.streaming_content])
+        assert content.count(b"acc-") == len(reports) * len(ACCOUNTS)
+
+    async def test_compare(self, reports, assert_max_queries):
+        reports = await reports
+        ids = [report.id for report in reports]
+        with assert_max_queries(2):
+            response = await call(
+                "compare",
+                "get",
+                "/api/reports/compare/",
+                reports[0].user,
+                data={"ids": ids},
+            )
+        assert len(response.data["accounts"]) == len(ACCOUNTS)
+
+    async def test_timeseries(self, reports, assert_max_queries):
+        reports = await reports
+        with assert_max_queries(1):
+            response = await call(
+                "timeseries",
+                "get",
+                "/api/reports/timeseries/",
+                reports[0].user,
+                data={"accounts": list(ACCOUNTS)},
+            )
+        assert len(response.data) == len(ACCOUNTS)
+
+    async def test_generate(self, reports, assert_max_queries):
+        reports = await reports
+        user = reports[0].user
+        tenant = await XeroTenant.objects.filter(user=user).afirst()
+        with patch.object(
+            XeroReportService,
+            "generate_report",
+            new_callable=AsyncMock,
+            return_value=trial_balance(),
+        ), assert_max_queries(4):
+            response = await call(
+                "generate",
+                "post",
+                "/api/reports/generate/",
+                user,
+                data={
+                    "tenant_name": tenant.tenant_name,
+                    "period": "Apr-2024",
+                    "account_type": "REVENUE",
+                },
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    async def test_refresh(self, reports, assert_max_queries):
+        reports = await reports
+        report = reports[0]
+        with patch.object(
+            XeroReportService,
+            "generate_report",
+            new_callable=AsyncMock,
+            return_value=trial_balance(),
+        ), assert_max_queries(5):
+            response = await call(
+                "refresh",
+                "post",
+                f"/api/reports/{report.id}/refresh/",
+                report.user,
+                pk=report.id,
+            )
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_consolidate(self, reports, assert_max_queries):
+        reports = await reports
+        user = reports[0].user
+        tenant = await XeroTenant.objects.filter(user=user).afirst()
+        with patch.object(
+            XeroReportService,
+            "generate_reports",
+            new_callable=AsyncMock,
+            return_value={tenant.tenant_id: trial_balance()},
+        ), assert_max_queries(5):
+            response = await call(
+                "consolidate",
+                "post",
+                "/api/reports/consolidate/",
+                user,
+                data={"period": "Apr-2024", "account_type": "REVENUE"},
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    async def test_destroy(self, reports, assert_max_queries):
+        reports = await reports
+        report = reports[0]
+        request = factory.delete(f"/api/reports/{report.id}/")
+        force_authenticate(request, user=report.user)
+        view = ReportViewSet.as_view({"delete": "destroy"})
+        with assert_max_queries(6):
+            response = await view(request, pk=report.id)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.asyncio
+class TestXeroViewQueries:
+    async def test_connect(self, authenticated_user, assert_max_queries):
+        request = factory.get("/api/xero/connect/")
+        force_authenticate(request, user=await authenticated_user)
+        with assert_max_queries(1):
+            response = await XeroConnectView.as_view()(request)
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_callback(self, assert_max_queries):
+        auth_state = await XeroAuthStateFactory.acreate()
+        connections = [
+            {
+                "tenantId": f"tenant-{i}",
+                "authEventId": "event-1",
+                "tenantType": "ORGANISATION",
+                "tenantName": f"Company {i}",
+            }
+            for i in range(3)
+        ]
+        request = factory.get(
+            "/api/xero/callback/", data={"code": "code", "state": auth_state.state}
+        )
+        with patch.multiple(
+            AsyncXeroAuthService,
+            exchange_code_for_token=AsyncMock(
+                return_value={"access_token": "access", "refresh_token": "refresh"}
+            ),
+            get_connections=AsyncMock(return_value=connections),
+        ), assert_max_queries(9):
+            response = await XeroCallbackView.as_view()(request)
+        assert response.status_code == status.HTTP_200_OK
+
+
+def test_warns_when_over_budget(settings, caplog):
+    settings.QUERY_BUDGETS = {"DEFAULT": 1, "REPEATED": 3, "VIEWS": {}}
+
+    def view(request):
+        for _ in range(3):
+            User.objects.filter(pk=1).exists()
+        return HttpResponse()
+
+    before = db_query_budget_exceeded.value(view="unmatched")
+    repeated_before = db_repeated_queries.value(view="unmatched")
+    MetricsMiddleware(view)(RequestFactory().get("/"))
+
+    assert "Query budget exceeded: view=unmatched method=GET queries=3" in caplog.text
+    assert "Possible N+1 queries: view=unmatched ran 3 times" in caplog.text
+    assert db_query_budget_exceeded.value(view="unmatched") == before + 1
+    assert db_repeated_queries.value(view="unmatched") == repeated_before + 1
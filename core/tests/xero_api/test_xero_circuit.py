@@ -0,0 +1,100 @@
+import httpx
+import pytest
+from django.core.cache import caches
+
+from apps.xero_api.circuit import CircuitBreaker, CircuitOpenError
+from apps.xero_api.http import get_with_retry
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(settings):
+    settings.XERO_CIRCUIT_BREAKER = {
+        "FAILURE_THRESHOLD": 3,
+        "WINDOW": 60,
+        "RESET_TIMEOUT": 30,
+        "PROBE_TIMEOUT": 60,
+        "CACHE_ALIAS": "shared",
+    }
+
+
+async def _trip(breaker):
+    for _ in range(3):
+        await breaker.acheck()
+        await breaker.arecord_failure()
+
+
+def _end_cooldown(breaker):
+    caches["shared"].delete(breaker.open_key)
+
+
+async def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("accounts", "tenant-1")
+    await _trip(breaker)
+
+    with pytest.raises(CircuitOpenError) as error:
+        await breaker.acheck()
+    assert 0 < error.value.retry_after <= 30
+
+    # Other tenants and endpoints are unaffected
+    await CircuitBreaker("accounts", "tenant-2").acheck()
+    await CircuitBreaker("trial_balance", "tenant-1").acheck()
+
+
+async def test_client_errors_do_not_count():
+    breaker = CircuitBreaker("accounts", "tenant-1")
+    for _ in range(5):
+        await breaker.acheck()
+        await breaker.arecord_response(404)
+
+    await breaker.acheck()
+
+
+async def test_half_open_allows_one_probe_then_closes():
+    await _trip(CircuitBreaker("accounts", "tenant-1"))
+    _end_cooldown(CircuitBreaker("accounts", "tenant-1"))
+
+    # Breakers in different workers share state through the cache
+    probe = CircuitBreaker("accounts", "tenant-1")
+    other = CircuitBreaker("accounts", "tenant-1")
+    await probe.acheck()
+    with pytest.raises(CircuitOpenError):
+        await other.acheck()
+
+    await probe.arecord_response(200)
+    await other.acheck()
+    assert not other.probing
+
+
+async def test_failed_probe_reopens():
+    breaker = CircuitBreaker("accounts", "tenant-1")
+    await _trip(breaker)
+    _end_cooldown(breaker)
+
+    await breaker.acheck()
+    await breaker.arecord_response(503)
+
+    with pytest.raises(CircuitOpenError):
+        await CircuitBreaker("accounts", "tenant-1").acheck()
+
+
+async def test_open_circuit_skips_the_request():
+    await _trip(CircuitBreaker("accounts", "tenant-1"))
+    requests = []
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: requests.append(request) or httpx.Response(200)
+        )
+    )
+
+    with pytest.raises(CircuitOpenError):
+        await get_with_retry(
+            client,
+            "https://api.xero.com/api.xro/2.0/Accounts",
+            endpoint="accounts",
+            headers={},
+            scope="tenant-1",
+        )
+
+    assert requests == []
@@ -0,0 +1,124 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from apps.xero_api.http import (
+    endpoint_timeout,
+    get_with_retry,
+    request_deadline,
+    retry_counts,
+)
+
+pytestmark = pytest.mark.asyncio
+
+URL = "https://api.xero.com/api.xro/2.0/Accounts"
+
+
+def _client(*outcomes):
+    """A client whose requests produce ``outcomes`` in turn."""
+    outcomes = iter(outcomes)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), calls
+
+
+@pytest.fixture
+def sleep():
+    with patch("apps.xero_api.http.asyncio.sleep", new_callable=AsyncMock) as sleep:
+        yield sleep
+
+
+async def test_retries_server_errors_with_backoff(sleep, settings):
+    settings.XERO_RETRY = {**settings.XERO_RETRY, "BASE_DELAY": 1, "MAX_DELAY": 8}
+    client, calls = _client(
+        httpx.Response(503), httpx.Response(502), httpx.Response(200)
+    )
+    before = retry_counts["accounts", "503"]
+
+    response = await get_with_retry(client, URL, endpoint="accounts", headers={})
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+    first_delay, second_delay = (call.args[0] for call in sleep.await_args_list)
+    assert 0 <= first_delay <= 1
+    assert 0 <= second_delay <= 2
+    assert retry_counts["accounts", "503"] == before + 1
+
+
+async def test_honours_retry_after(sleep):
+    client, _ = _client(
+        httpx.Response(429, headers={"Retry-After": "3"}), httpx.Response(200)
+    )
+
+    response = await get_with_retry(client, URL, endpoint="accounts", headers={})
+
+    assert response.status_code == 200
+    sleep.assert_awaited_once_with(3.0)
+
+
+async def test_does_not_retry_client_errors(sleep):
+    client, calls = _client(httpx.Response(401))
+
+    response = await get_with_retry(client, URL, endpoint="accounts", headers={})
+
+    assert response.status_code == 401
+    assert len(calls) == 1
+    sleep.assert_not_awaited()
+
+
+async def test_stops_at_max_attempts(sleep, settings):
+    settings.XERO_RETRY = {**settings.XERO_RETRY, "MAX_ATTEMPTS": 2}
+    client, calls = _client(httpx.Response(500), httpx.Response(500))
+
+    response = await get_with_retry(client, URL, endpoint="accounts", headers={})
+
+    assert response.status_code == 500
+    assert len(calls) == 2
+
+
+async def test_stops_when_wait_would_pass_deadline(sleep):
+    client, calls = _client(httpx.Response(429, headers={"Retry-After": "60"}))
+    before = retry_counts["accounts", "exhausted"]
+
+    with request_deadline(5):
+        response = await get_with_retry(client, URL, endpoint="accounts", headers={})
+
+    assert response.status_code == 429
+    assert len(calls) == 1
+    sleep.assert_not_awaited()
+    assert retry_counts["accounts", "exhausted"] == before + 1
+
+
+async def test_retries_timeouts_then_raises(sleep, settings):
+    settings.XERO_RETRY = {**settings.XERO_RETRY, "MAX_ATTEMPTS": 2}
+    client, calls = _client(httpx.ReadTimeout("slow"), httpx.ConnectError("down"))
+
+    with pytest.raises(httpx.ConnectError):
+        await get_with_retry(client, URL, endpoint="accounts", headers={})
+
+    assert len(calls) == 2
+    assert sleep.await_count == 1
+
+
+async def test_endpoint_timeouts_override_defaults_and_clip_to_deadline(settings):
+    settings.XERO_TIMEOUTS = {
+        "default": {"connect": 5, "read": 20, "write": 5, "pool": 5},
+        "trial_balance": {"read": 45},
+    }
+
+    assert endpoint_timeout("accounts").read == 20
+    assert endpoint_timeout("trial_balance").read == 45
+    assert endpoint_timeout("trial_balance").connect == 5
+
+    with request_deadline(2):
+        timeout = endpoint_timeout("trial_balance")
+    assert timeout.read <= 2
+    assert timeout.connect <= 2
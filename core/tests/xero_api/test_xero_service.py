@@ -1,13 +1,17 @@
 import base64
 import logging
+import time
 from unittest.mock import patch
 
 import httpx
 import pytest
 
+from apps.xero_api.cache import xero_cache
+from apps.xero_api.circuit import CircuitOpenError
 from apps.xero_api.models import XeroTenant, XeroToken
 from apps.xero_api.service import AsyncXeroAuthService
-from core.tests.factories import UserFactory, XeroTokenFactory
+from core.cache import TieredCache
+from core.tests.factories import UserFactory, XeroTenantFactory, XeroTokenFactory
 
 pytestmark = [pytest.mark.django_db, pytest.mark.asyncio]
 
@@ -116,6 +120,51 @@ class TestAsyncXeroAuthService:
         result = await xero_service.get_tenant(user.id, "Test Org")
         assert result == tenant
 
+    async def test_get_tenant_is_cached_per_user(
+        self, xero_service: AsyncXeroAuthService
+    ):
+        user = await UserFactory.acreate()
+        tenant = await XeroTenantFactory.acreate(user=user, tenant_name="Test Org")
+        await XeroTenantFactory.acreate(user=user, tenant_name="Other Org")
+
+        assert await xero_service.get_tenant(user.id, "Test Org") == tenant
+
+        # Renaming behind the cache's back is not seen until invalidation
+        await XeroTenant.objects.filter(id=tenant.id).aupdate(tenant_name="Renamed")
+        assert await xero_service.get_tenant(user.id, "Test Org") == tenant
+
+        await xero_service.invalidate_tenant_cache(user.id)
+        assert await xero_service.get_tenant(user.id, "Test Org") is None
+        assert await xero_service.get_tenant(user.id, "Renamed") == tenant
+
+    async def test_tenant_cache_invalidation_reaches_other_workers(
+        self, xero_service: AsyncXeroAuthService
+    ):
+        user = await UserFactory.acreate()
+        tenant = await XeroTenantFactory.acreate(user=user, tenant_name="Test Org")
+        assert await xero_service.get_tenant(user.id, "Test Org") == tenant
+
+        # Another worker handles the callback: its memory tier is not this one
+        other_worker = TieredCache("xero", max_size=10, shared_alias="shared")
+        await XeroTenant.objects.filter(id=tenant.id).aupdate(tenant_name="Renamed")
+        with patch("apps.xero_api.service.xero_cache", other_worker):
+            await xero_service.invalidate_tenant_cache(user.id)
+
+        # This worker checks the version again once its copy expires
+        later = time.monotonic() + xero_cache.version_ttl
+        with patch("core.cache.time.monotonic", return_value=later):
+            assert await xero_service.get_tenant(user.id, "Test Org") is None
+            assert await xero_service.get_tenant(user.id, "Renamed") == tenant
+
+    async def test_get_tenant_miss_picks_up_new_tenant(
+        self, xero_service: AsyncXeroAuthService
+    ):
+        user = await UserFactory.acreate()
+        assert await xero_service.get_tenant(user.id, "Test Org") is None
+
+        tenant = await XeroTenantFactory.acreate(user=user, tenant_name="Test Org")
+        assert await xero_service.get_tenant(user.id, "Test Org") == tenant
+
     async def test_get_connections_success(self, xero_service: AsyncXeroAuthService):
         test_connections = [
             {
@@ -155,6 +204,16 @@ class TestAsyncXeroAuthService:
             connections = await xero_service.get_connections("test_token")
             assert connections == []
 
+    async def test_get_connections_circuit_open(
+        self, xero_service: AsyncXeroAuthService
+    ):
+        with patch(
+            "apps.xero_api.service.get_with_retry",
+            side_effect=CircuitOpenError("connections", "global", 30),
+        ):
+            with pytest.raises(CircuitOpenError):
+                await xero_service.get_connections("test_token")
+
     async def test_refresh_token(self, xero_service: AsyncXeroAuthService):
         token = await XeroTokenFactory.acreate()
         user = token.user
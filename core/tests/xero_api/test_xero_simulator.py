@@ -0,0 +1,136 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from apps.reports.service import XeroReportService, XeroUnavailableError
+from apps.xero_api.simulator import SimulatorConfig, create_app, parse_latency
+
+pytestmark = pytest.mark.asyncio
+
+SIMULATOR_URL = "http://xero-sim"
+
+# The service's client is patched below; keep hold of the real one
+AsyncClient = httpx.AsyncClient
+
+
+def _client(app):
+    return AsyncClient(transport=httpx.ASGITransport(app=app), base_url=SIMULATOR_URL)
+
+
+async def _get(app, path, tenant_id=None):
+    headers = {"Xero-tenant-id": tenant_id} if tenant_id else {}
+    async with _client(app) as client:
+        return await client.get(path, headers=headers)
+
+
+async def test_generates_deterministic_charts():
+    config = SimulatorConfig(tenants=2, accounts=50, seed=7)
+    first, second = create_app(config), create_app(config)
+    tenant_id = first.tenant_ids[0]
+
+    accounts = (await _get(first, "/api.xro/2.0/Accounts", tenant_id)).json()
+    again = (await _get(second, "/api.xro/2.0/Accounts", tenant_id)).json()
+
+    assert len(accounts["Accounts"]) == 50
+    assert accounts == again
+    assert first.tenant_ids == second.tenant_ids
+    assert create_app(SimulatorConfig(seed=8)).tenant_ids != first.tenant_ids
+
+
+async def test_filters_accounts_by_type():
+    app = create_app(SimulatorConfig(accounts=100))
+    response = await _get(
+        app, '/api.xro/2.0/Accounts?where=Type=="REVENUE"', app.tenant_ids[0]
+    )
+
+    accounts = response.json()["Accounts"]
+    assert accounts
+    assert {account["Type"] for account in accounts} == {"REVENUE"}
+
+
+async def test_trial_balance_covers_every_account():
+    app = create_app(SimulatorConfig(accounts=100))
+    tenant_id = app.tenant_ids[0]
+    response = await _get(
+        app, "/api.xro/2.0/Reports/TrialBalance?date=2024-01-31", tenant_id
+    )
+
+    balances = XeroReportService._parse_trial_balance(response.json())
+    assert set(balances) == {account["AccountID"] for account in app.chart(tenant_id)}
+
+
+async def test_rejects_unknown_tenants():
+    app = create_app(SimulatorConfig())
+    response = await _get(app, "/api.xro/2.0/Accounts", "not-a-tenant")
+    assert response.status_code == 403
+
+
+async def test_injects_errors():
+    app = create_app(SimulatorConfig(errors={429: 1.0}, retry_after=3))
+    response = await _get(app, "/connections")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+
+async def test_parses_latency_distributions():
+    rng = MagicMock()
+    rng.uniform.return_value = 150
+    assert parse_latency("fixed:250")(rng) == 0.25
+    assert parse_latency("uniform:100,200")(rng) == 0.15
+    with pytest.raises(ValueError):
+        parse_latency("normal:1,2")
+
+
+class TestReportsAgainstSimulator:
+    @pytest.fixture
+    async def service(self, authenticated_user, settings):
+        settings.XERO_API_CONFIG = {
+            **settings.XERO_API_CONFIG,
+            "BASE_URL": SIMULATOR_URL,
+        }
+        request = MagicMock()
+        request.user = await authenticated_user
+        service = XeroReportService(request)
+        service.xero_service.get_token = AsyncMock(
+            return_value={"access_token": "simulated"}
+        )
+        return service
+
+    @staticmethod
+    def _route_to(app):
+        return patch(
+            "apps.reports.service.httpx.AsyncClient",
+            side_effect=lambda **kwargs: _client(app),
+        )
+
+    @pytest.mark.django_db
+    async def test_generates_report(self, service):
+        service = await service
+        app = create_app(SimulatorConfig(accounts=300))
+        tenant_id = app.tenant_ids[0]
+
+        with self._route_to(app):
+            report = await service.generate_report(
+                tenant_id, date(2024, 1, 31), "EXPENSE"
+            )
+
+        expenses = [a for a in app.chart(tenant_id) if a["Type"] == "EXPENSE"]
+        assert set(report) == {account["AccountID"] for account in expenses}
+        assert any(entry["balance"] for entry in report.values())
+
+    @pytest.mark.django_db
+    async def test_surfaces_persistent_outages(self, service, settings):
+        service = await service
+        settings.XERO_RETRY = {**settings.XERO_RETRY, "MAX_ATTEMPTS": 2}
+        app = create_app(SimulatorConfig(errors={503: 1.0}))
+
+        with (
+            self._route_to(app),
+            patch("apps.xero_api.http.asyncio.sleep", new_callable=AsyncMock),
+            pytest.raises(XeroUnavailableError),
+        ):
+            await service.generate_report(
+                app.tenant_ids[1], date(2024, 1, 31), "EXPENSE"
+            )
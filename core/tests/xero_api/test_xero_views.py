@@ -4,6 +4,7 @@ import pytest
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from apps.xero_api.circuit import CircuitOpenError
 from apps.xero_api.models import XeroAuthState, XeroTenant
 from apps.xero_api.service import AsyncXeroAuthService
 from apps.xero_api.views import XeroCallbackView, XeroConnectView
@@ -154,6 +155,67 @@ class TestXeroCallbackView:
             assert tenant.tenant_id == "test123"
             assert tenant.tenant_name == "Test Company"
 
+    async def test_callback_invalidates_tenant_cache(self):
+        user = await UserFactory.acreate()
+        auth_state = await XeroAuthStateFactory.acreate(user=user)
+        await XeroTenantFactory.acreate(
+            user=user, tenant_id="test123", tenant_name="Old Name"
+        )
+
+        service = AsyncXeroAuthService()
+        assert await service.get_tenant(user.id, "Old Name") is not None
+
+        mock_connections = [
+            {
+                "tenantId": "test123",
+                "authEventId": "event123",
+                "tenantType": "ORGANISATION",
+                "tenantName": "New Name",
+            }
+        ]
+
+        factory = APIRequestFactory()
+        request = factory.get(
+            "/api/xero/callback/", data={"code": "test_code", "state": auth_state.state}
+        )
+
+        with patch.multiple(
+            "apps.xero_api.service.AsyncXeroAuthService",
+            exchange_code_for_token=AsyncMock(return_value={"access_token": "t"}),
+            get_connections=AsyncMock(return_value=mock_connections),
+            store_token=AsyncMock(),
+        ):
+            view_callable = XeroCallbackView.as_view()
+            response = await view_callable(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert await service.get_tenant(user.id, "Old Name") is None
+        tenant = await service.get_tenant(user.id, "New Name")
+        assert tenant.tenant_id == "test123"
+
+    async def test_callback_when_connections_circuit_is_open(self):
+        user = await UserFactory.acreate()
+        auth_state = await XeroAuthStateFactory.acreate(user=user)
+
+        factory = APIRequestFactory()
+        request = factory.get(
+            "/api/xero/callback/", data={"code": "test_code", "state": auth_state.state}
+        )
+
+        with patch.multiple(
+            "apps.xero_api.service.AsyncXeroAuthService",
+            exchange_code_for_token=AsyncMock(return_value={"access_token": "t"}),
+            get_connections=AsyncMock(
+                side_effect=CircuitOpenError("connections", "global", 30)
+            ),
+            store_token=AsyncMock(),
+        ):
+            view_callable = XeroCallbackView.as_view()
+            response = await view_callable(request)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "30"
+
     async def test_invalid_state(self):
         user = await UserFactory.acreate()
         await XeroAuthStateFactory.acreate(user=user)
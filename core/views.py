@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import registry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def metrics(request):
+    """This process's metrics, in the Prometheus text format.
+
+    Requires ``Authorization: Bearer <METRICS_TOKEN>``. Without a token the
+    metrics are only served with ``DEBUG`` on; otherwise the endpoint is a 404.
+    """
+    token = settings.METRICS["TOKEN"]
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
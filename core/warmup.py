@@ -0,0 +1,109 @@
+"""Warm a worker up before it accepts requests.
+
+Without this, a new worker's first requests pay for importing the views and
+everything behind them (DRF, adrf, simplejwt), building serializer fields,
+loading the database driver and, optionally, the TLS handshake with Xero.
+``warm_up`` runs at lifespan start-up (see ``core.asgi``) and does that work
+up front, phase by phase, as ``WARMUP`` configures. How long each phase took
+is logged and exported as ``worker_startup_seconds``.
+
+Modules only a few requests need, such as pyarrow for columnar exports, are
+imported where they are used and left out of warm-up.
+"""
+
+import logging
+import time
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver, reverse
+from rest_framework.serializers import Serializer
+
+from apps.xero_api.http import xero_client
+from core.metrics import worker_startup_duration
+
+logger = logging.getLogger(__name__)
+
+
+def load_views() -> None:
+    """Import every view through the URLconf and build its lookup tables."""
+    get_resolver().url_patterns
+    reverse("reports:report-list")
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def build_serializers() -> None:
+    """Build each of our serializers' fields once.
+
+    Model serializers introspect their model the first time, which fills the
+    model's field caches for every later request.
+    """
+    for serializer in _subclasses(Serializer):
+        if serializer.__module__.startswith("apps."):
+            serializer().fields
+
+
+def connect_database() -> None:
+    """Load the database driver and check every database can be reached.
+
+    Requests run on their own threads with their own connections, so the
+    connections opened here are closed again.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+        connection.close()
+
+
+async def connect_xero() -> None:
+    """Open a connection to Xero in the shared pool, TLS handshake included."""
+    try:
+        async with xero_client() as client:
+            await client.head(settings.XERO_API_CONFIG["BASE_URL"], timeout=5)
+    except httpx.HTTPError as e:
+        logger.warning("Could not connect to Xero during warm-up: %s", e)
+
+
+async def send_request(app, path: str) -> None:
+    """Send a GET for ``path`` through ``app``, as a client would."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://localhost"
+    ) as client:
+        response = await client.get(path)
+    logger.debug("Warm-up request to %s returned %s", path, response.status_code)
+
+
+async def warm_up(app) -> None:
+    config = settings.WARMUP
+    if not config["ENABLED"]:
+        return
+
+    phases = [
+        ("views", sync_to_async(load_views)),
+        ("serializers", sync_to_async(build_serializers)),
+        ("database", sync_to_async(connect_database)),
+    ]
+    if config["XERO_PRECONNECT"]:
+        phases.append(("xero", connect_xero))
+    if path := config["REQUEST_PATH"]:
+        phases.append(("request", lambda: send_request(app, path)))
+
+    timings = {}
+    for phase, run in phases:
+        start = time.perf_counter()
+        await run()
+        timings[phase] = time.perf_counter() - start
+        worker_startup_duration.set(timings[phase], phase=phase)
+
+    logger.info(
+        "Worker warmed up in %.0fms: %s",
+        sum(timings.values()) * 1000,
+        " ".join(f"{phase}={s * 1000:.0f}ms" for phase, s in timings.items()),
+    )
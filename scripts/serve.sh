@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# Production server: WEB_CONCURRENCY uvicorn workers (one per CPU by default)
+# on uvloop, without the reloader. On SIGTERM each worker stops accepting
+# connections and gets UVICORN_GRACEFUL_TIMEOUT seconds to finish its requests.
+
+exec uvicorn core.asgi:application \
+    --host 0.0.0.0 \
+    --port "${PORT:-443}" \
+    --workers "${WEB_CONCURRENCY:-$(nproc)}" \
+    --loop uvloop \
+    --lifespan on \
+    --backlog "${UVICORN_BACKLOG:-2048}" \
+    --timeout-keep-alive "${UVICORN_KEEP_ALIVE:-5}" \
+    --timeout-graceful-shutdown "${UVICORN_GRACEFUL_TIMEOUT:-30}" \
+    --no-server-header \
+    --ssl-keyfile /etc/ssl/private/key.pem \
+    --ssl-certfile /etc/ssl/certs/cert.pem \
+    "$@"